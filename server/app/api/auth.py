@@ -1,25 +1,25 @@
+import logging
 from fastapi import APIRouter, HTTPException
-from datetime import datetime
+from pymongo.errors import DuplicateKeyError, PyMongoError
 
 from app.models.schemas import UserCreate, UserLogin
-from app.core.security import hash_password, verify_password, create_token
-from app.db.setup import users_collection
+from app.core.security import password_hasher, create_token
+from app.db.repositories import find_user_by_email, find_user_by_email_or_username, create_user, update_user_password
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 @router.post("/signup", summary="Create new user")
 async def signup(user: UserCreate):
-    if users_collection.find_one({"$or": [{"email": user.email}, {"username": user.username}]}):
+    if await find_user_by_email_or_username(user.email, user.username):
         raise HTTPException(status_code=400, detail="Email or username already registered")
 
-    user_data = {
-        "username": user.username,
-        "email": user.email,
-        "password": hash_password(user.password),
-        "created_at": datetime.utcnow()
-    }
-    result = users_collection.insert_one(user_data)
-    user_id = str(result.inserted_id)
+    try:
+        user_id = await create_user(user.username, user.email, await password_hasher.hash(user.password))
+    except DuplicateKeyError:
+        # Lost a race with a concurrent signup; the unique indexes are the real check
+        raise HTTPException(status_code=400, detail="Email or username already registered")
     
     return {
         "message": "User registered successfully",
@@ -31,9 +31,18 @@ async def signup(user: UserCreate):
 
 @router.post("/login", summary="Login user")
 async def login(user: UserLogin):
-    db_user = users_collection.find_one({"email": user.email})
-    if not db_user or not verify_password(user.password, db_user["password"]):
+    db_user = await find_user_by_email(user.email)
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    valid, new_hash = await password_hasher.verify(user.password, db_user["password"])
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid email or password")
+    if new_hash:
+        # Stored at an old bcrypt cost; the plaintext is only available now, at login
+        try:
+            await update_user_password(db_user["_id"], db_user["password"], new_hash)
+        except PyMongoError as e:
+            logger.warning(f"Password rehash failed for user {db_user['_id']}: {str(e)}")
 
     user_id = str(db_user["_id"])
     return {
@@ -0,0 +1,33 @@
+from typing import Optional
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from app.core.security import token_cache, InvalidToken
+from app.models.schemas import TokenData
+
+# Shared auth dependencies. Tokens are the HS256 JWTs issued by /signup and /login, sent as
+# "Authorization: Bearer <token>".
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+def _unauthorized(detail: str):
+    return HTTPException(status_code=401, detail=detail, headers={"WWW-Authenticate": "Bearer"})
+
+
+async def get_optional_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+) -> Optional[TokenData]:
+    # None for anonymous requests; a token that is present but invalid is still rejected
+    if credentials is None:
+        return None
+    try:
+        return token_cache.verify(credentials.credentials)
+    except InvalidToken:
+        raise _unauthorized("Invalid or expired token")
+
+
+async def get_current_user(user: Optional[TokenData] = Depends(get_optional_user)) -> TokenData:
+    if user is None:
+        raise _unauthorized("Not authenticated")
+    return user
@@ -1,165 +1,280 @@
+import asyncio
+import base64
 import logging
-import requests
-from fastapi import APIRouter, HTTPException
+from collections import deque
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import PyMongoError
 
-from app.core.config import YOUTUBE_API_KEY
-from app.db.setup import lectures_collection
-from app.utils.helpers import parse_duration
+from app.core.config import YOUTUBE_API_KEY, TRANSCRIPT_PREFETCH
+from app.api.dependencies import get_current_user, get_optional_user
+from app.db.repositories import list_user_lecture_summaries, get_user_lecture_videos, save_user_lecture
+from app.models.schemas import TokenData
+from app.utils.helpers import format_duration, ndjson_event, sse_event
+from app.services.youtube_client import youtube_client, YouTubeAPIError
+from app.services.lecture_cache import topic_cache
+from app.services.video_store import video_store
+from app.services.transcript_store import transcript_store
+from app.services.wikipedia_source import wikipedia_cache
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+MAX_LECTURE_VIDEOS = 100
+MAX_SEARCH_PAGES = 4
+MAX_LECTURE_PAGE_SIZE = 50
+
+def _video_from_metadata(doc):
+    return {
+        "videoId": doc["_id"],
+        "title": doc.get("title", "Untitled Video"),
+        "description": doc.get("description", ""),
+        "thumbnails": doc["thumbnail"],
+        "channel": doc.get("channel", "Unknown Channel"),
+        "duration": format_duration(doc["duration_seconds"]),
+        "status": "todo" 
+    }
+
+
+def _youtube_http_exception(e: YouTubeAPIError, topic: str):
+    logger.error(f"YouTube API error for topic '{topic}': {str(e)}")
+    if e.status_code == 403:
+        if e.reason == "quotaExceeded":
+            return HTTPException(status_code=429, detail="YouTube API quota exceeded. Please try again later.")
+        return HTTPException(status_code=403, detail=f"YouTube API access forbidden: {e.reason or 'Reason unknown'}")
+    if e.body:
+        logger.error(f"YouTube API response content: {e.body}")
+    return HTTPException(status_code=503, detail="Failed to fetch videos from YouTube due to an API error. Please try again later.")
+
+
+async def _page_lecture_videos(video_ids, page, usage):
+    # Details come from the video metadata store, which only asks YouTube for unknown or stale
+    # ids and returns just the videos that pass the duration/thumbnail filter
+    try:
+        return await video_store.lecture_videos(video_ids, usage)
+    except YouTubeAPIError as e:
+        logger.error(f"All attempts failed to fetch video details for search page {page}: {str(e)}")
+        return []
+
+
+async def _stream_topic_videos(topic: str, limit: int, usage: dict):
+    # Async generator of accepted video batches, one per search page, in search order.
+    # Detail lookups overlap the next search call, but once the pages in flight could fill
+    # `limit` they are awaited first so no search page is requested that would go unused.
+    pending = deque()  # (detail task, number of ids on that page)
+    seen = set()
+    emitted = 0
+    page_token = None
+    try:
+        for page in range(MAX_SEARCH_PAGES):
+            video_ids, page_token = await youtube_client.search_page(f"{topic} lecture", page_token, usage)
+            if video_ids:
+                pending.append((asyncio.create_task(_page_lecture_videos(video_ids, page, usage)), len(video_ids)))
+            last_page = not page_token or page == MAX_SEARCH_PAGES - 1
+
+            while pending and (last_page or pending[0][0].done() or emitted + sum(n for _, n in pending) >= limit):
+                task, _ = pending.popleft()
+                batch = []
+                for doc in await task:
+                    if doc["_id"] in seen:
+                        continue
+                    seen.add(doc["_id"])
+                    batch.append(_video_from_metadata(doc))
+                    if emitted + len(batch) >= limit:
+                        break
+                emitted += len(batch)
+                if batch:
+                    yield batch
+                if emitted >= limit:
+                    return
+            if last_page:
+                break
+    finally:
+        for task, _ in pending:
+            task.cancel()
+
+
+async def _fetch_topic_videos(topic: str, usage: dict):
+    videos = []
+    async for batch in _stream_topic_videos(topic, MAX_LECTURE_VIDEOS, usage):
+        videos.extend(batch)
+    if not videos:
+        logger.info(f"No videos met filtering criteria for topic: {topic}")
+    return videos
+
+
+async def _record_lecture(user: Optional[TokenData], topic: str, videos: list):
+    # Signed-in users get the lecture added to their history; anonymous requests are not recorded
+    if user is None or not videos:
+        return
+    try:
+        await save_user_lecture(user.user_id, topic, videos)
+    except PyMongoError as e:
+        logger.warning(f"Failed to save lecture '{topic}' for user {user.user_id}: {str(e)}")
+
+
 @router.get("/api/generate-lecture", summary="Generate lecture from YouTube videos based on topic")
-async def generate_lecture_endpoint(topic: str):
+async def generate_lecture_endpoint(topic: str, user: Optional[TokenData] = Depends(get_optional_user)):
     if not YOUTUBE_API_KEY:
         logger.error("YouTube API key not configured.")
         raise HTTPException(status_code=500, detail="YouTube API key not configured") 
 
     try:
-        video_ids = []
-        next_page_token = None
-        
-        for _ in range(4): 
-            search_res = requests.get(
-                "https://www.googleapis.com/youtube/v3/search",
-                params={
-                    "part": "snippet",
-                    "q": f"{topic} lecture",
-                    "type": "video",
-                    "maxResults": 50, 
-                    "key": YOUTUBE_API_KEY,
-                    "pageToken": next_page_token or "",
-                    "relevanceLanguage": "en",
-                    "videoEmbeddable": "true"
-                }
-            )
-            search_res.raise_for_status() 
-            search_data = search_res.json()
-            video_ids.extend(item["id"]["videoId"] for item in search_data.get("items", []))
-            if not (next_page_token := search_data.get("nextPageToken")):
-                break
-        
-        if not video_ids:
-            logger.info(f"No video IDs found from YouTube search for topic: {topic}")
-            return {"videos": []} 
-
-        all_video_details = []
-        chunk_size = 50 
-        for i in range(0, len(video_ids), chunk_size):
-            chunk = video_ids[i:i + chunk_size]
-            for attempt in range(3): 
-                try:
-                    detail_res = requests.get(
-                        "https://www.googleapis.com/youtube/v3/videos",
-                        params={
-                            "part": "contentDetails,snippet",
-                            "id": ",".join(chunk),
-                            "key": YOUTUBE_API_KEY
-                        }
-                    )
-                    detail_res.raise_for_status()
-                    all_video_details.extend(detail_res.json().get("items", []))
-                    break 
-                except requests.exceptions.RequestException as e: 
-                    logger.warning(f"Attempt {attempt+1} failed to fetch video details for chunk {i//chunk_size}: {str(e)}")
-                    if attempt == 2:
-                        logger.error(f"All attempts failed to fetch video details for chunk {i//chunk_size}.")
-                except Exception as e: 
-                    logger.error(f"An unexpected error occurred during video detail fetch (chunk {i//chunk_size}, attempt {attempt+1}): {str(e)}")
-                    if attempt == 2:
-                         logger.error(f"All attempts failed (unexpected error) for video details for chunk {i//chunk_size}.")
-
-        videos = []
-        for item in all_video_details:
-            try:
-                video_id = item["id"] 
-                snippet = item.get("snippet", {})
-                content_details = item.get("contentDetails", {})
-                
-                iso_duration = content_details.get("duration")
-                if not iso_duration: 
-                    logger.warning(f"Video {video_id} skipped: missing duration.")
-                    continue
-                
-                readable_duration, total_seconds = parse_duration(iso_duration)
-                if not readable_duration: 
-                    logger.debug(f"Video {video_id} skipped: duration {iso_duration} ({total_seconds}s) is less than 4 minutes.")
-                    continue 
-                
-                thumbnails = snippet.get("thumbnails", {})
-                thumbnail = (thumbnails.get("high", {}).get("url") or
-                             thumbnails.get("medium", {}).get("url") or
-                             thumbnails.get("default", {}).get("url"))
-                if not thumbnail:
-                    logger.warning(f"Video {video_id} skipped: missing thumbnail.")
-                    continue
-                
-                videos.append({
-                    "videoId": video_id,
-                    "title": snippet.get("title", "Untitled Video"),
-                    "description": snippet.get("description", ""),
-                    "thumbnails": thumbnail,
-                    "channel": snippet.get("channelTitle", "Unknown Channel"),
-                    "duration": readable_duration,
-                    "status": "todo" 
-                })
-                
-                if len(videos) >= 100: 
-                    break
-                    
-            except KeyError as e: 
-                logger.error(f"Error processing video item (KeyError: {str(e)}): {item.get('id', 'Unknown ID')}")
-                continue
-            except Exception as e: 
-                logger.error(f"Error processing video item {item.get('id', 'Unknown ID')}: {str(e)}")
-                continue
-        
-        if not videos:
-            logger.info(f"No videos met filtering criteria for topic: {topic}")
-        
-        return {"videos": videos} 
-
-    except requests.exceptions.HTTPError as e: 
-        logger.error(f"YouTube API HTTP error for topic '{topic}': {str(e)}")
-        if e.response is not None:
-            if e.response.status_code == 403: 
-                error_details = e.response.json().get("error", {}).get("errors", [{}])[0].get("reason")
-                if error_details == "quotaExceeded":
-                    raise HTTPException(status_code=429, detail="YouTube API quota exceeded. Please try again later.")
-                raise HTTPException(status_code=403, detail=f"YouTube API access forbidden: {error_details or 'Reason unknown'}")   
-            logger.error(f"YouTube API response content: {e.response.text}")
-        raise HTTPException(status_code=503, detail="Failed to fetch videos from YouTube due to an API error. Please try again later.")
+        videos = await topic_cache.get(topic, _fetch_topic_videos)
+        wikipedia_cache.prefetch([topic])  # questions about this lecture will need it
+        if TRANSCRIPT_PREFETCH:
+            transcript_store.prefetch([video["videoId"] for video in videos])
+        await _record_lecture(user, topic, videos)
+        # Copies so per-response "status" edits never leak into the cached entry
+        return {"videos": [dict(video) for video in videos]}
+
+    except YouTubeAPIError as e: 
+        raise _youtube_http_exception(e, topic)
     except Exception as e:
         logger.error(f"General API error for topic '{topic}': {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch videos. An unexpected error occurred.")
 
-@router.get("/user/lectures", summary="Get lectures for a specific user")
-async def get_user_lectures_endpoint(user_id: str):
+
+async def _single_batch(videos):
+    if videos:
+        yield videos
+
+
+@router.get("/api/generate-lecture/stream", summary="Stream lecture videos as they are accepted (NDJSON or SSE)")
+async def generate_lecture_stream_endpoint(
+    topic: str,
+    limit: int = Query(MAX_LECTURE_VIDEOS, ge=1, le=MAX_LECTURE_VIDEOS),
+    stream_format: str = Query("ndjson", alias="format", pattern="^(ndjson|sse)$"),
+    user: Optional[TokenData] = Depends(get_optional_user),
+):
+    # Emits one "video" event per accepted video, then "done" (or "error" if YouTube fails
+    # mid-stream). Errors before the first video are returned as normal HTTP errors.
+    if not YOUTUBE_API_KEY:
+        logger.error("YouTube API key not configured.")
+        raise HTTPException(status_code=500, detail="YouTube API key not configured") 
+
+    encode = sse_event if stream_format == "sse" else ndjson_event
+    cached = await topic_cache.lookup(topic, _fetch_topic_videos)
+    if cached is not None:
+        source = "cache"
+        batches = _single_batch([dict(video) for video in cached[:limit]])
+    else:
+        # Concurrent streams (and get() calls) for the same cold topic share one upstream fetch
+        source, batches = topic_cache.stream(topic, limit, _stream_topic_videos, MAX_LECTURE_VIDEOS)
+
+    try:
+        first_batch = await batches.__anext__()
+    except StopAsyncIteration:
+        first_batch = []
+    except YouTubeAPIError as e:
+        raise _youtube_http_exception(e, topic)
+
+    async def body():
+        collected = list(first_batch)
+        try:
+            for video in first_batch:
+                yield encode("video", video)
+            async for batch in batches:
+                collected.extend(batch)
+                for video in batch:
+                    yield encode("video", video)
+            wikipedia_cache.prefetch([topic])
+            if TRANSCRIPT_PREFETCH:
+                transcript_store.prefetch([video["videoId"] for video in collected])
+            await _record_lecture(user, topic, collected)
+            yield encode("done", {"count": len(collected), "source": source})
+        except YouTubeAPIError as e:
+            error = _youtube_http_exception(e, topic)
+            yield encode("error", {"status": error.status_code, "detail": error.detail})
+        finally:
+            await batches.aclose()  # the last reader to leave cancels the upstream fetch
+
+    media_type = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.get("/api/generate-lecture/cache-stats", summary="Topic result cache counters")
+async def lecture_cache_stats_endpoint():
+    return {**topic_cache.stats(), "video_metadata": video_store.stats(), "youtube_quota_used": youtube_client.quota_used}
+
+def _encode_cursor(lecture):
+    raw = f"{lecture['created_at'].isoformat()}|{lecture['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str):
     try:
-        # Optional: Validate user_id format and existence
-        # try:
-        #     query_user_id_obj = ObjectId(user_id)
-        # except InvalidId:
-        #     raise HTTPException(status_code=400, detail="Invalid user_id format.")
-        # if not users_collection.find_one({"_id": query_user_id_obj}):
-        #      raise HTTPException(status_code=404, detail=f"User with id {user_id} not found.")
-
-        user_lectures = list(lectures_collection.find(
-            {"user_id": user_id}, # Use the provided user_id string
-            {"_id": 0, "topic": 1, "created_at": 1, "videos": 1} 
-        ).sort("created_at", -1).limit(10))
-        
-        for lecture in user_lectures:
-            if isinstance(lecture.get("created_at"), datetime):
-                lecture["created_at"] = lecture["created_at"].isoformat()
-        
-        if not user_lectures:
-            logger.info(f"No lectures found for user_id: {user_id}")
-        
-        return {"lectures": user_lectures}
-    except HTTPException:
-        raise
+        created_at, lecture_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), ObjectId(lecture_id)
+    except (ValueError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+
+def _lecture_summary(lecture):
+    return {
+        "id": str(lecture["_id"]),
+        "topic": lecture.get("topic"),
+        "created_at": lecture["created_at"].isoformat(),  # always a date: see list_user_lecture_summaries
+        "video_count": lecture.get("video_count", 0),
+        "progress": lecture.get("progress", {}),
+    }
+
+
+@router.get("/user/lectures", summary="Get lectures for the signed-in user, newest first")
+async def get_user_lectures_endpoint(
+    user: TokenData = Depends(get_current_user),
+    limit: int = Query(10, ge=1, le=MAX_LECTURE_PAGE_SIZE),
+    cursor: Optional[str] = None,
+):
+    # Summaries only (topic, date, video count, progress counts); videos come from
+    # /user/lectures/{lecture_id}/videos. Pass next_cursor back as `cursor` for the next page.
+    # The user comes from the verified bearer token, never from the query string
+    user_id = user.user_id
+    before = _decode_cursor(cursor) if cursor else None
+    try:
+        user_lectures = await list_user_lecture_summaries(user_id, limit=limit + 1, before=before)
     except Exception as e:
         logger.error(f"Failed to retrieve lectures for user {user_id}: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Could not retrieve user lectures.")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Could not retrieve user lectures.")
+
+    # One extra row tells us whether another page exists without a count query
+    page, has_more = user_lectures[:limit], len(user_lectures) > limit
+    if not page and not cursor:
+        logger.info(f"No lectures found for user_id: {user_id}")
+    return {
+        "lectures": [_lecture_summary(lecture) for lecture in page],
+        "next_cursor": _encode_cursor(page[-1]) if has_more else None,
+    }
+
+
+@router.get("/user/lectures/{lecture_id}/videos", summary="Get one page of a saved lecture's videos")
+async def get_user_lecture_videos_endpoint(
+    lecture_id: str,
+    user: TokenData = Depends(get_current_user),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=MAX_LECTURE_VIDEOS),
+):
+    try:
+        lecture_object_id = ObjectId(lecture_id)
+    except InvalidId:
+        raise HTTPException(status_code=404, detail="Lecture not found.")
+    try:
+        lecture = await get_user_lecture_videos(user.user_id, lecture_object_id, offset=offset, limit=limit)
+    except Exception as e:
+        logger.error(f"Failed to retrieve videos of lecture {lecture_id} for user {user.user_id}: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Could not retrieve lecture videos.")
+    if lecture is None:
+        raise HTTPException(status_code=404, detail="Lecture not found.")
+
+    next_offset = offset + len(lecture["videos"])
+    return {
+        "id": lecture_id,
+        "topic": lecture.get("topic"),
+        "video_count": lecture["video_count"],
+        "videos": lecture["videos"],
+        "next_offset": next_offset if next_offset < lecture["video_count"] else None,
+    }
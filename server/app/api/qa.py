@@ -1,69 +1,176 @@
 import logging
-import wikipedia
-import google.generativeai as genai
+import time
 from google.api_core.exceptions import ResourceExhausted
 from fastapi import APIRouter, HTTPException
-from youtube_transcript_api import YouTubeTranscriptApi
+from fastapi.responses import StreamingResponse
 
-from app.core.config import GEMINI_API_KEY
+from app.services.transcript_store import transcript_store, TranscriptUnavailable
+from app.services.answer_context import gather_context, build_prompt
+from app.services.gemini_client import gemini_client
+from app.services.answer_cache import answer_cache
+from app.services.wikipedia_source import wikipedia_cache
+from app.utils.helpers import sse_event
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+def _passage_times(passages):
+    return [{"start": p["start"], "end": p["end"]} for p in passages]
+
+
+async def _answer_question(videoId: str, topic: str, question: str):
+    context = await gather_context(videoId, topic, question)
+    prompt = build_prompt(videoId, topic, question, context)
+
+    try:
+        answer = await gemini_client.generate(prompt)
+    except ResourceExhausted as e:
+        logger.warning(f"Gemini API quota exceeded: {str(e)}")
+        raise HTTPException(status_code=429, detail="Gemini API quota exceeded. Please wait and try again.")
+    except Exception as e:
+        logger.error(f"Error during Gemini content generation: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to generate answer from AI model.")
+    return {
+        "answer": answer,
+        "passages": _passage_times(context["passages"]),
+        "sources": context["sources"],
+        "versions": context["versions"],
+    }
+
+
 @router.get("/generate-answer", summary="Generate answer based on video transcript and Wikipedia")
 async def generate_answer_endpoint(videoId: str, topic: str, question: str):
+    if not gemini_client.configured:
+        logger.error("Gemini API key not configured.")
+        raise HTTPException(status_code=500, detail="Generative AI service not configured.")
+
     try:
-        transcript_list = YouTubeTranscriptApi.get_transcript(videoId)
-        transcript_text = " ".join([t['text'] for t in transcript_list])
+        # Identical (or, if enabled, near-identical) questions are answered from the cache, and
+        # concurrent ones wait for the same model call
+        entry, cache_status = await answer_cache.get_or_compute(
+            videoId, topic, question, lambda: _answer_question(videoId, topic, question)
+        )
+        return {
+            "answer": entry["answer"],
+            "passages": entry["passages"],
+            "sources": entry["sources"],
+            "cache": cache_status,
+        }
 
-        wikipedia_content = ""
-        try:
+    except HTTPException:
+        raise
+    except TranscriptUnavailable as e:
+        logger.warning(f"Could not retrieve transcript for videoId {videoId}: {str(e)}")
+        raise HTTPException(status_code=404, detail=f"Transcript not available for video {videoId}. It might be disabled or the video doesn't exist.")
+    except Exception as e:
+        logger.error(f"Answer generation failed for videoId {videoId}, topic '{topic}': {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to generate answer due to an internal error.")
+
+
+def _elapsed_ms(since):
+    return round((time.perf_counter() - since) * 1000, 1)
+
+
+def _entry_context(entry):
+    return {"passages": entry["passages"], "sources": entry["sources"]}
 
-            wikipedia.set_user_agent("IntellectAi/1.0 (Intellect@Ai.com; IntellectAi.com)")
-            wikipedia_content = wikipedia.summary(topic, sentences=5, auto_suggest=False)
-        except wikipedia.exceptions.PageError:
-            logger.info(f"Wikipedia page not found for topic: {topic}")
-            wikipedia_content = "No relevant Wikipedia page found for the topic."
-        except wikipedia.exceptions.DisambiguationError as e:
-            options = e.options[:3] 
-            logger.info(f"Wikipedia topic '{topic}' is ambiguous. Options: {options}")
-            wikipedia_content = f"The topic '{topic}' is ambiguous. Possible matches: {', '.join(options)}. Please be more specific."
-        except wikipedia.exceptions.WikipediaException as e:
-            logger.warning(f"Wikipedia lookup error for topic '{topic}': {str(e)}")
-            wikipedia_content = "Could not retrieve information from Wikipedia due to an error."
-        except Exception as e:
-            logger.error(f"Unexpected error during Wikipedia lookup for topic '{topic}': {str(e)}", exc_info=True)
-            wikipedia_content = "An unexpected error occurred while fetching Wikipedia content."
 
+async def _replay_answer(entry):
+    # A finished answer as one stream: no model call, so there is no time to first token
+    yield "context", _entry_context(entry)
+    yield "token", {"text": entry["answer"]}
+    yield "done", {"context_ms": None, "ttft_ms": None}
 
-        if not GEMINI_API_KEY:
-            logger.error("Gemini API key not configured.")
-            raise HTTPException(status_code=500, detail="Generative AI service not configured.")
 
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel("gemini-1.5-flash")
+async def _stream_answer(videoId: str, topic: str, question: str):
+    # Shared by every concurrent stream of the same question: ("context", ...), then ("token", ...)
+    # per text chunk, then ("done", timings) once the full answer is cached. ttft_ms is measured from
+    # the model call; context_ms is the transcript/Wikipedia gathering before it.
+    start = time.perf_counter()
+    context = await gather_context(videoId, topic, question)
+    context_ms = _elapsed_ms(start)
+    passages = _passage_times(context["passages"])
+    yield "context", {"passages": passages, "sources": context["sources"]}
 
-        max_transcript_chars = 20000 
-        prompt = (
-            f"Based on the following information, please answer the question: '{question}'.\n\n"
-            f"From YouTube Video Transcript (Topic: {topic}, Video ID: {videoId}):\n\"\"\"\n{transcript_text[:max_transcript_chars]}\n\"\"\"\n\n"
-            f"From Wikipedia (Topic: {topic}):\n\"\"\"\n{wikipedia_content}\n\"\"\"\n\n"
-            "Provide a concise and direct answer to the question. If the information is insufficient, state that."
+    prompt = build_prompt(videoId, topic, question, context)
+    model_start = time.perf_counter()
+    tokens = gemini_client.stream(prompt)
+    ttft_ms = None
+    answer = []
+    try:
+        async for text in tokens:
+            if ttft_ms is None:
+                ttft_ms = _elapsed_ms(model_start)
+            answer.append(text)
+            yield "token", {"text": text}
+    finally:
+        await tokens.aclose()  # also runs when the last reader leaves and this is cancelled
+
+    # Only a fully streamed answer is cached
+    answer_cache.store(videoId, topic, question, {
+        "answer": "".join(answer).strip(),
+        "passages": passages,
+        "sources": context["sources"],
+        "versions": context["versions"],
+    })
+    yield "done", {"context_ms": context_ms, "ttft_ms": ttft_ms}
+
+
+@router.get("/generate-answer/stream", summary="Stream the generated answer as server-sent events")
+async def generate_answer_stream_endpoint(videoId: str, topic: str, question: str):
+    # Events: "context" (passages + source status), then "token" per text chunk, then "done"
+    # or "error". Concurrent identical questions share one model stream. A client that
+    # disconnects has its response cancelled (StreamingResponse watches for the disconnect);
+    # once every reader of a stream has gone, the model stream is closed so it stops generating.
+    if not gemini_client.configured:
+        logger.error("Gemini API key not configured.")
+        raise HTTPException(status_code=500, detail="Generative AI service not configured.")
+
+    start = time.perf_counter()
+    cached, cache_status = answer_cache.lookup(videoId, topic, question)
+    if cached is not None:
+        events = _replay_answer(cached)
+    else:
+        cache_status, events = answer_cache.stream(
+            videoId, topic, question, lambda: _stream_answer(videoId, topic, question), _replay_answer
         )
 
+    # Errors before the context event (no transcript, nothing gathered) are normal HTTP errors
+    try:
+        _, first_context = await events.__anext__()
+    except TranscriptUnavailable as e:
+        await events.aclose()
+        logger.warning(f"Could not retrieve transcript for videoId {videoId}: {str(e)}")
+        raise HTTPException(status_code=404, detail=f"Transcript not available for video {videoId}. It might be disabled or the video doesn't exist.")
+    except Exception as e:
+        await events.aclose()
+        logger.error(f"Answer context failed for videoId {videoId}, topic '{topic}': {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to generate answer due to an internal error.")
+
+    async def body():
         try:
-            response = model.generate_content(prompt)
-            return {"answer": response.text.strip()}
+            yield sse_event("context", {**first_context, "cache": cache_status})
+            async for event, data in events:
+                if event == "done":
+                    data = {**data, "total_ms": _elapsed_ms(start)}
+                yield sse_event(event, data)
         except ResourceExhausted as e:
             logger.warning(f"Gemini API quota exceeded: {str(e)}")
-            raise HTTPException(status_code=429, detail="Gemini API quota exceeded. Please wait and try again.")
+            yield sse_event("error", {"status": 429, "detail": "Gemini API quota exceeded. Please wait and try again."})
         except Exception as e:
             logger.error(f"Error during Gemini content generation: {str(e)}", exc_info=True)
-            raise HTTPException(status_code=500, detail="Failed to generate answer from AI model.")
+            yield sse_event("error", {"status": 500, "detail": "Failed to generate answer from AI model."})
+        finally:
+            await events.aclose()
 
-    except YouTubeTranscriptApi.CouldNotRetrieveTranscript as e:
-        logger.warning(f"Could not retrieve transcript for videoId {videoId}: {str(e)}")
-        raise HTTPException(status_code=404, detail=f"Transcript not available for video {videoId}. It might be disabled or the video doesn't exist.")
-    except Exception as e:
-        logger.error(f"Answer generation failed for videoId {videoId}, topic '{topic}': {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Failed to generate answer due to an internal error.")
\ No newline at end of file
+    return StreamingResponse(body(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.get("/generate-answer/metrics", summary="Answer generation counters and time-to-first-token")
+async def answer_metrics_endpoint():
+    return {"generation": gemini_client.stats()}
+
+
+@router.get("/generate-answer/cache-stats", summary="Transcript store and answer cache counters")
+async def answer_cache_stats_endpoint():
+    return {"transcripts": transcript_store.stats(), "wikipedia": wikipedia_cache.stats(), "answers": answer_cache.stats()}
@@ -1,131 +1,284 @@
+import asyncio
 import logging
-import base64
-from io import BytesIO
-from fastapi import APIRouter, HTTPException
-from PIL import Image
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, Request, UploadFile, File, Form, Query
 import numpy as np
-from deepface import DeepFace
 
-from app.services.heart_metrics import HeartMetricsCalculator
+from app.core.config import (
+    FACE_TRACKING_ENABLED,
+    STREAM_WINDOW_SECONDS,
+    STREAM_MIN_SECONDS,
+    HR_ESTIMATOR,
+    RPPG_METHOD,
+    STRESS_MAX_BODY_BYTES,
+    STRESS_MAX_FRAMES,
+)
+from app.api.dependencies import get_optional_user
+from app.models.schemas import TokenData
+from app.services.heart_metrics import StreamingHeartMetrics, ESTIMATORS, RPPG_METHODS, make_calculator, pulse_signal
+from app.services.frame_pipeline import frame_pipeline, decode_data_url, decode_image_bytes, forehead_rgb_mean
+from app.services.face_localizer import get_face_localizer
+from app.services.face_tracker import FaceTracker
+from app.services.frame_ingest import FrameStreamError, parse_fps, parse_frame_stream, rgb_means_from_frames
+from app.services.stress_jobs import stress_job_queue, QueueFullError
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+def _metrics_response(avg_hr, sdnn, rmssd, bsi, lf_hf_ratio):
+    return {
+        "avg_heart_rate": avg_hr if not np.isnan(avg_hr) else 0,
+        "sdnn": sdnn if not np.isnan(sdnn) else 0,
+        "rmssd": rmssd if not np.isnan(rmssd) else 0,
+        "bsi": bsi if not np.isnan(bsi) else 0,
+        "lf_hf_ratio": lf_hf_ratio if not np.isnan(lf_hf_ratio) else 0
+    }
+
+
+def _analysis_options(estimator, rppg):
+    estimator = estimator or HR_ESTIMATOR
+    rppg = rppg or RPPG_METHOD
+    if estimator not in ESTIMATORS:
+        raise HTTPException(status_code=400, detail=f"Unknown estimator '{estimator}'. Choose one of: {', '.join(ESTIMATORS)}")
+    if rppg not in RPPG_METHODS:
+        raise HTTPException(status_code=400, detail=f"Unknown rppg method '{rppg}'. Choose one of: {', '.join(RPPG_METHODS)}")
+    return estimator, rppg
+
+
+MIN_VALID_FRAMES = 30
+
+
+def _check_frame_count(count):
+    if count > STRESS_MAX_FRAMES:
+        raise HTTPException(status_code=400, detail=f"Too many frames: at most {STRESS_MAX_FRAMES} per request.")
+
+
+async def _read_body(request: Request, limit: int) -> bytes:
+    # Rejects oversized uploads from Content-Length before reading, and stops reading a
+    # chunked body (no Content-Length) as soon as it passes the limit
+    too_large = HTTPException(status_code=413, detail=f"Request body exceeds {limit} bytes.")
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > limit:
+        raise too_large
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise too_large
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def _estimate_stress(rgb_means, fps, estimator, rppg):
+    if len(rgb_means) < MIN_VALID_FRAMES:
+        logger.error(f"Insufficient valid frames for analysis: {len(rgb_means)} collected, need {MIN_VALID_FRAMES}.")
+        return {"error": f"Insufficient valid frames ({len(rgb_means)} collected). Ensure clear, stable face view."}
+
+    logger.info(f"Proceeding to HeartMetricsCalculator with {len(rgb_means)} valid intensity frames at {fps} FPS ({estimator}, {rppg}).")
+    calculator = make_calculator(estimator, fps)
+    intensity_signal = pulse_signal(rgb_means, rppg, fps)
+    avg_hr, sdnn, rmssd, bsi, lf_hf_ratio = calculator.estimate_from_signal(intensity_signal)
+    
+    logger.info(f"Analysis results: HR:{avg_hr}, SDNN:{sdnn}, RMSSD:{rmssd}, BSI:{bsi}, LF/HF:{lf_hf_ratio}")
+
+    return _metrics_response(avg_hr, sdnn, rmssd, bsi, lf_hf_ratio)
+
+
+async def _analyze_encoded_frames(frames, fps, estimator, rppg):
+    frame_results = await frame_pipeline.run(frames)
+    rgb_means = np.array([rgb_mean for rgb_mean in frame_results if rgb_mean is not None]).reshape(-1, 3)
+    logger.info(f"Processed {len(frames)} frames, {len(rgb_means)} with a valid forehead ROI.")
+    return _estimate_stress(rgb_means, fps, estimator, rppg)
+
+
+def _parse_json_request(data: dict):
+    frames = data.get('frames', [])
+    if not frames: # Basic validation
+        raise HTTPException(status_code=400, detail="No frames provided for analysis.")
+    if not isinstance(frames, list) or not all(isinstance(f, str) for f in frames):
+         raise HTTPException(status_code=400, detail="Frames must be a list of strings (data URLs).")
+    _check_frame_count(len(frames))
+
+    try:
+        fps = parse_fps(data.get('fps'))
+    except FrameStreamError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    estimator, rppg = _analysis_options(data.get('estimator'), data.get('rppg'))
+    return frames, fps, estimator, rppg
+
+
 @router.post("/analyze-stress", summary="Analyze stress from video frames")
 async def analyze_stress_endpoint(data: dict): 
     try:
-        frames = data.get('frames', [])
-        if not frames: # Basic validation
+        frames, fps, estimator, rppg = _parse_json_request(data)
+        return await _analyze_encoded_frames(frames, fps, estimator, rppg)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Overall stress analysis error: {str(e)}", exc_info=True)
+        return {"error": "Failed to process stress analysis due to an unexpected internal server error."}
+
+
+@router.post("/analyze-stress/upload", summary="Analyze stress from multipart-uploaded JPEG frames")
+async def analyze_stress_upload_endpoint(
+    frames: List[UploadFile] = File(...),
+    fps: Optional[str] = Form(None),  # validated by parse_fps, like the other endpoints
+    estimator: str = Form(None),
+    rppg: str = Form(None)
+):
+    try:
+        if not frames:
             raise HTTPException(status_code=400, detail="No frames provided for analysis.")
-        if not isinstance(frames, list) or not all(isinstance(f, str) for f in frames):
-             raise HTTPException(status_code=400, detail="Frames must be a list of strings (data URLs).")
+        _check_frame_count(len(frames))
+        try:
+            fps = parse_fps(fps)
+        except FrameStreamError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        estimator, rppg = _analysis_options(estimator, rppg)
 
+        frame_bytes = [await frame.read() for frame in frames]
+        return await _analyze_encoded_frames(frame_bytes, fps, estimator, rppg)
 
-        intensity_values = []
-        processed_frame_count = 0
-        
-        for i, frame_data_url in enumerate(frames):
-            logger.debug(f"Processing frame {i+1}/{len(frames)}")
-            if not isinstance(frame_data_url, str) or ',' not in frame_data_url:
-                logger.warning(f"Frame {i+1}: Invalid data URL format. Skipping.")
-                continue
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Overall stress analysis error: {str(e)}", exc_info=True)
+        return {"error": "Failed to process stress analysis due to an unexpected internal server error."}
 
-            try:
-                header, encoded = frame_data_url.split(',', 1)
-                image_data = base64.b64decode(encoded)
-                image = Image.open(BytesIO(image_data)).convert('RGB')
-
-                try:
-                    face_analysis_results = DeepFace.analyze(
-                        img_path=np.array(image),
-                        actions=['emotion'], 
-                        detector_backend='ssd', 
-                        silent=True,
-                        enforce_detection=False
-                    )
-                    
-                    if not face_analysis_results or not isinstance(face_analysis_results, list) or not face_analysis_results[0].get('region'):
-                        logger.warning(f"Frame {i+1}: No face detected or region missing. Skipping. Result: {face_analysis_results}")
-                        continue
-
-                    if len(face_analysis_results) > 1:
-                        logger.warning(f"Frame {i+1}: Multiple faces ({len(face_analysis_results)}) detected. Using the first one.")
-                        # For now, process the first one. Consider skipping or specific logic for multiple faces.
-                    
-                    face_analysis = face_analysis_results[0]
-
-                    box = face_analysis.get('region')
-                    if not box or not all(k in box for k in ['x', 'y', 'w', 'h']):
-                        logger.warning(f"Frame {i+1}: Face detected but region data is incomplete. Skipping. Box: {box}")
-                        continue
-                    
-                    x, y, w, h = box['x'], box['y'], box['w'], box['h']
-                    logger.info(f"Frame {i+1}: Detected face at x:{x}, y:{y}, w:{w}, h:{h}")
-
-                    if w <= 0 or h <= 0:
-                        logger.warning(f"Frame {i+1}: Invalid face region dimensions. w:{w}, h:{h}. Skipping.")
-                        continue
-
-                    roi_y1 = y + (h // 8)
-                    roi_y2 = y + (h // 4)
-                    roi_x1 = x + (w // 3)
-                    roi_x2 = x + w - (w // 3)
-
-                    if not (roi_x1 < roi_x2 and roi_y1 < roi_y2):
-                        logger.warning(f"Frame {i+1}: Invalid forehead ROI. Box: {box}, ROI:({roi_x1},{roi_y1},{roi_x2},{roi_y2}). Skipping.")
-                        continue
-                    
-                    logger.info(f"Frame {i+1}: Forehead ROI x1:{roi_x1}, y1:{roi_y1}, x2:{roi_x2}, y2:{roi_y2}")
-
-                    forehead = image.crop((int(roi_x1), int(roi_y1), int(roi_x2), int(roi_y2)))
-                    
-                    if forehead.size[0] == 0 or forehead.size[1] == 0:
-                        logger.warning(f"Frame {i+1}: Cropped forehead empty. Image: {image.size}, Crop: ({roi_x1},{roi_y1},{roi_x2},{roi_y2}). Skipping.")
-                        continue
-
-                    forehead_array = np.array(forehead)
-                    if forehead_array.ndim < 3 or forehead_array.shape[2] < 2:
-                        logger.warning(f"Frame {i+1}: Forehead array shape {forehead_array.shape} unexpected. Skipping.")
-                        continue
-                    
-                    green_channel_intensity = forehead_array[..., 1]
-                    intensity_values.append(green_channel_intensity)
-                    processed_frame_count += 1
-                    logger.info(f"Frame {i+1}: Added green channel. Total valid intensities: {len(intensity_values)}")
-
-                except ValueError as ve:
-                    logger.warning(f"Frame {i+1}: ValueError in face analysis (no face?). Error: {ve}. Skipping.")
-                    continue
-                except Exception as face_error:
-                    logger.error(f"Frame {i+1}: Error in face/forehead processing. Error: {face_error}", exc_info=True)
-                    continue
 
-            except Exception as frame_error:
-                logger.error(f"Frame {i+1}: General error processing frame. Error: {frame_error}", exc_info=True)
-                continue
-        
-        MIN_VALID_FRAMES = 30 
-        if len(intensity_values) < MIN_VALID_FRAMES:
-            logger.error(f"Insufficient valid frames for analysis: {len(intensity_values)} collected, need {MIN_VALID_FRAMES}.")
-            return {"error": f"Insufficient valid frames ({len(intensity_values)} collected). Ensure clear, stable face view."}
-
-        logger.info(f"Proceeding to HeartMetricsCalculator with {len(intensity_values)} valid intensity frames.")
-        calculator = HeartMetricsCalculator(fps=10) # Assuming 10 FPS from frontend
-        avg_hr, sdnn, rmssd, bsi, lf_hf_ratio = calculator.estimate_heart_rate(intensity_values)
-        
-        logger.info(f"Analysis results: HR:{avg_hr}, SDNN:{sdnn}, RMSSD:{rmssd}, BSI:{bsi}, LF/HF:{lf_hf_ratio}")
-
-        return {
-            "avg_heart_rate": avg_hr if not np.isnan(avg_hr) else 0,
-            "sdnn": sdnn if not np.isnan(sdnn) else 0,
-            "rmssd": rmssd if not np.isnan(rmssd) else 0,
-            "bsi": bsi if not np.isnan(bsi) else 0,
-            "lf_hf_ratio": lf_hf_ratio if not np.isnan(lf_hf_ratio) else 0
-        }
+@router.post("/analyze-stress/binary", summary="Analyze stress from a length-prefixed binary frame stream")
+async def analyze_stress_binary_endpoint(request: Request):
+    # Format is documented in app.services.frame_ingest
+    try:
+        body = await _read_body(request, STRESS_MAX_BODY_BYTES)
+        try:
+            header, frames = parse_frame_stream(body, max_frames=STRESS_MAX_FRAMES)
+        except FrameStreamError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if len(frames) == 0:
+            raise HTTPException(status_code=400, detail="No frames provided for analysis.")
+        estimator, rppg = _analysis_options(header.get("estimator"), header.get("rppg"))
+
+        if header["format"] == "rgb":
+            rgb_means = rgb_means_from_frames(frames)
+            logger.info(f"Received {len(rgb_means)} pre-cropped rgb frames.")
+            return _estimate_stress(rgb_means, header["fps"], estimator, rppg)
+
+        return await _analyze_encoded_frames(frames, header["fps"], estimator, rppg)
 
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Overall stress analysis error: {str(e)}", exc_info=True)
-        return {"error": "Failed to process stress analysis due to an unexpected internal server error."}
\ No newline at end of file
+        return {"error": "Failed to process stress analysis due to an unexpected internal server error."}
+
+
+@router.post("/analyze-stress/jobs", status_code=202, summary="Queue a stress analysis and return a job id")
+async def submit_stress_job_endpoint(data: dict, request: Request, user: Optional[TokenData] = Depends(get_optional_user)):
+    frames, fps, estimator, rppg = _parse_json_request(data)
+    # Fairness key is the verified user, else the client address; never a body field, since a
+    # client-chosen id could dodge the per-user cap or burn another user's slots
+    if user is not None:
+        user_id = f"user:{user.user_id}"
+    else:
+        user_id = f"ip:{request.client.host}" if request.client else "ip:unknown"
+
+    try:
+        job = await stress_job_queue.submit(user_id, lambda: _analyze_encoded_frames(frames, fps, estimator, rppg))
+    except QueueFullError as e:
+        logger.warning(f"Stress job rejected for user {user_id}: {str(e)} Retry after {e.retry_after}s.")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+    return {"job_id": job.id, "status": job.status, "queue_position": stress_job_queue.queue_position(job)}
+
+
+@router.get("/analyze-stress/jobs/metrics", summary="Stress job queue depth and timing metrics")
+async def stress_job_metrics_endpoint():
+    return stress_job_queue.metrics()
+
+
+@router.get("/analyze-stress/jobs/{job_id}", summary="Poll (or long-poll with wait) for a stress analysis result")
+async def get_stress_job_endpoint(job_id: str, wait: float = Query(0, ge=0, le=30)):
+    job = stress_job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Stress job {job_id} not found or expired.")
+
+    if wait and not job.done.is_set():
+        try:
+            await asyncio.wait_for(job.done.wait(), timeout=wait)
+        except asyncio.TimeoutError:
+            pass
+
+    response = job.to_dict()
+    if job.status == "queued":
+        response["queue_position"] = stress_job_queue.queue_position(job)
+    return response
+
+
+def _stream_frame_mean(i, message, face_detector):
+    if message.get("bytes") is not None:
+        rgb_frame = decode_image_bytes(message["bytes"])
+    elif message.get("text") and ',' in message["text"]:
+        rgb_frame = decode_data_url(message["text"])
+    else:
+        logger.warning(f"Stream frame {i+1}: Expected binary image or data URL. Skipping.")
+        return None
+    return forehead_rgb_mean(i, rgb_frame, face_detector)
+
+
+@router.websocket("/ws/stress")
+async def stress_stream_endpoint(websocket: WebSocket, fps: int = 10, estimator: str = None, rppg: str = None):
+    # Client sends one frame per message (binary JPEG/PNG or a data URL string); the server
+    # answers with a metrics update every calculator step once enough signal has been buffered.
+    await websocket.accept()
+    try:
+        fps = parse_fps(fps)
+        estimator, rppg = _analysis_options(estimator, rppg)
+    except FrameStreamError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=e.detail)
+        return
+    face_detector = get_face_localizer()
+    if FACE_TRACKING_ENABLED:
+        face_detector = FaceTracker(face_detector)
+    metrics = StreamingHeartMetrics(
+        fps=fps, window_seconds=STREAM_WINDOW_SECONDS, min_seconds=STREAM_MIN_SECONDS, estimator=estimator, rppg=rppg
+    )
+    frame_index = 0
+    valid_frames = 0
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+
+            try:
+                rgb_mean = await asyncio.to_thread(_stream_frame_mean, frame_index, message, face_detector)
+            except Exception as frame_error:
+                logger.error(f"Stream frame {frame_index+1}: Error processing frame. Error: {frame_error}", exc_info=True)
+                rgb_mean = None
+            frame_index += 1
+            if rgb_mean is None:
+                continue
+
+            valid_frames += 1
+            result = metrics.push(rgb_mean)
+            if result is not None:
+                await websocket.send_json({
+                    "type": "metrics",
+                    "frames": frame_index,
+                    "valid_frames": valid_frames,
+                    **_metrics_response(*result)
+                })
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Stress stream error: {str(e)}", exc_info=True)
+        await websocket.close(code=1011)
+    finally:
+        logger.info(f"Stress stream closed after {frame_index} frames ({valid_frames} valid).")
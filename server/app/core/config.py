@@ -9,6 +9,111 @@ JWT_SECRET = os.getenv("JWT_SECRET")
 ALGORITHM = "HS256" 
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24
 
+# Auth: password hashing
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))  # cost factor; stored hashes at another cost are rehashed on login
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))  # bcrypt calls running at once
+
+# Auth: verified-token cache
+AUTH_TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_TOKEN_CACHE_MAX_ENTRIES", 4096))  # decoded tokens kept until their exp
+
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-PORT = int(os.getenv("PORT", 8000))
\ No newline at end of file
+PORT = int(os.getenv("PORT", 8000))
+
+# Stress analysis: face localisation
+FACE_DETECTOR_BACKEND = os.getenv("FACE_DETECTOR_BACKEND", "deepface")  # deepface | yunet | haar
+DEEPFACE_DETECTOR = os.getenv("DEEPFACE_DETECTOR", "ssd")
+YUNET_MODEL_PATH = os.getenv("YUNET_MODEL_PATH", "models/face_detection_yunet_2023mar.onnx")
+FACE_DETECTION_MIN_CONFIDENCE = float(os.getenv("FACE_DETECTION_MIN_CONFIDENCE", 0.6))
+
+# Stress analysis: face tracking between detector keyframes
+FACE_TRACKING_ENABLED = os.getenv("FACE_TRACKING_ENABLED", "true").lower() == "true"
+FACE_REDETECT_INTERVAL = int(os.getenv("FACE_REDETECT_INTERVAL", 15))  # frames between forced re-detections
+FACE_TRACK_MIN_SCORE = float(os.getenv("FACE_TRACK_MIN_SCORE", 0.7))  # template match score below this forces re-detection
+FACE_TRACK_DOWNSCALE = float(os.getenv("FACE_TRACK_DOWNSCALE", 0.5))
+
+# Stress analysis: frame processing executor
+STRESS_POOL_SIZE = int(os.getenv("STRESS_POOL_SIZE", 2))  # worker processes; 0 runs frames on a thread in-process
+STRESS_BATCH_SIZE = int(os.getenv("STRESS_BATCH_SIZE", 25))  # contiguous frames handed to a worker per task
+STRESS_POOL_START_METHOD = os.getenv("STRESS_POOL_START_METHOD", "spawn")
+
+# Stress analysis: request limits
+STRESS_MAX_BODY_BYTES = int(os.getenv("STRESS_MAX_BODY_BYTES", 64 * 1024 * 1024))  # /analyze-stress/binary, checked before buffering
+STRESS_MAX_FRAMES = int(os.getenv("STRESS_MAX_FRAMES", 3600))  # frames per request (a minute at 60 fps)
+
+# Stress analysis: /ws/stress streaming sessions
+STREAM_WINDOW_SECONDS = float(os.getenv("STREAM_WINDOW_SECONDS", 30))  # ring buffer length
+STREAM_MIN_SECONDS = float(os.getenv("STREAM_MIN_SECONDS", 5))  # signal needed before the first update
+
+# Stress analysis: default heart-rate engine, overridable per request
+HR_ESTIMATOR = os.getenv("HR_ESTIMATOR", "peaks")  # peaks | welch
+RPPG_METHOD = os.getenv("RPPG_METHOD", "green")  # green | chrom | pos
+
+# Stress analysis: background job queue
+STRESS_JOB_WORKERS = int(os.getenv("STRESS_JOB_WORKERS", 2))  # analyses running at once
+STRESS_JOB_MAX_QUEUE = int(os.getenv("STRESS_JOB_MAX_QUEUE", 20))  # queued jobs across all users before 429
+STRESS_JOB_MAX_PER_USER = int(os.getenv("STRESS_JOB_MAX_PER_USER", 2))  # queued + running jobs per user
+STRESS_JOB_RESULT_TTL = int(os.getenv("STRESS_JOB_RESULT_TTL", 600))  # seconds finished results stay pollable
+
+# Model preloading / warm-up
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "true").lower() == "true"  # load + warm in the app lifespan
+PRELOAD_BEFORE_FORK = os.getenv("PRELOAD_BEFORE_FORK", "false").lower() == "true"  # load at import, for gunicorn --preload
+
+# YouTube Data API client
+YOUTUBE_API_BASE_URL = os.getenv("YOUTUBE_API_BASE_URL", "https://www.googleapis.com/youtube/v3")
+YOUTUBE_TIMEOUT_SECONDS = float(os.getenv("YOUTUBE_TIMEOUT_SECONDS", 10))
+YOUTUBE_MAX_RETRIES = int(os.getenv("YOUTUBE_MAX_RETRIES", 3))
+YOUTUBE_MAX_CONNECTIONS = int(os.getenv("YOUTUBE_MAX_CONNECTIONS", 20))
+
+# Lecture generation: topic result cache
+LECTURE_CACHE_TTL = int(os.getenv("LECTURE_CACHE_TTL", 6 * 3600))  # seconds a topic result is served as fresh
+LECTURE_CACHE_STALE_TTL = int(os.getenv("LECTURE_CACHE_STALE_TTL", 24 * 3600))  # further seconds served stale while refreshing
+LECTURE_CACHE_MAX_ENTRIES = int(os.getenv("LECTURE_CACHE_MAX_ENTRIES", 256))  # in-process LRU size
+
+# Lecture generation: per-video metadata store
+VIDEO_METADATA_TTL = int(os.getenv("VIDEO_METADATA_TTL", 7 * 24 * 3600))  # seconds before a video's details are re-fetched
+
+# Q&A: transcript store
+TRANSCRIPT_CACHE_MAX_ENTRIES = int(os.getenv("TRANSCRIPT_CACHE_MAX_ENTRIES", 128))  # decoded transcripts kept in process
+TRANSCRIPT_CACHE_TTL = int(os.getenv("TRANSCRIPT_CACHE_TTL", 7 * 24 * 3600))
+TRANSCRIPT_NEGATIVE_TTL = int(os.getenv("TRANSCRIPT_NEGATIVE_TTL", 6 * 3600))  # how long "no transcript" is remembered
+TRANSCRIPT_PREFETCH = os.getenv("TRANSCRIPT_PREFETCH", "false").lower() == "true"  # warm transcripts after /api/generate-lecture
+TRANSCRIPT_PREFETCH_MAX_VIDEOS = int(os.getenv("TRANSCRIPT_PREFETCH_MAX_VIDEOS", 100))  # per lecture, in playlist order
+TRANSCRIPT_PREFETCH_CONCURRENCY = int(os.getenv("TRANSCRIPT_PREFETCH_CONCURRENCY", 4))
+
+# Q&A: transcript passage retrieval
+PASSAGE_CHUNK_CHARS = int(os.getenv("PASSAGE_CHUNK_CHARS", 800))  # transcript characters per indexed passage
+PASSAGE_INDEX_MAX_ENTRIES = int(os.getenv("PASSAGE_INDEX_MAX_ENTRIES", 64))  # per-video indexes kept in process
+QA_CONTEXT_TOKEN_BUDGET = int(os.getenv("QA_CONTEXT_TOKEN_BUDGET", 2000))  # transcript tokens sent to the model
+QA_TOP_K_PASSAGES = int(os.getenv("QA_TOP_K_PASSAGES", 8))
+
+# Q&A: source deadlines and answer model
+QA_TRANSCRIPT_TIMEOUT = float(os.getenv("QA_TRANSCRIPT_TIMEOUT", 8))  # seconds before answering without the transcript
+QA_WIKIPEDIA_TIMEOUT = float(os.getenv("QA_WIKIPEDIA_TIMEOUT", 3))  # seconds before answering without Wikipedia
+QA_GENERATION_TIMEOUT = float(os.getenv("QA_GENERATION_TIMEOUT", 60))
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+
+# Q&A: answer cache
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", 24 * 3600))
+ANSWER_CACHE_DEGRADED_TTL = int(os.getenv("ANSWER_CACHE_DEGRADED_TTL", 300))  # answers built without a source (timeout/error)
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 2048))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", 0))  # cosine threshold for near-duplicate questions; 0 disables
+
+# Q&A: Wikipedia summary cache
+WIKIPEDIA_CACHE_TTL = int(os.getenv("WIKIPEDIA_CACHE_TTL", 7 * 24 * 3600))
+WIKIPEDIA_NEGATIVE_TTL = int(os.getenv("WIKIPEDIA_NEGATIVE_TTL", 24 * 3600))  # page not found
+WIKIPEDIA_DISAMBIGUATION_TTL = int(os.getenv("WIKIPEDIA_DISAMBIGUATION_TTL", 3 * 24 * 3600))
+WIKIPEDIA_CACHE_MAX_ENTRIES = int(os.getenv("WIKIPEDIA_CACHE_MAX_ENTRIES", 512))
+WIKIPEDIA_WARM_TOPICS = int(os.getenv("WIKIPEDIA_WARM_TOPICS", 50))  # recent lecture topics warmed at startup
+
+# MongoDB connection
+MONGO_BACKEND = os.getenv("MONGO_BACKEND", "mongodb")  # mongodb | memory (in-process mongomock, no server needed)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 50))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 60000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 10000))
+MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "primary")  # primary | primaryPreferred | secondaryPreferred | nearest
+MONGO_ENSURE_INDEXES = os.getenv("MONGO_ENSURE_INDEXES", "true").lower() == "true"  # create indexes at startup
+MONGO_CHECK_QUERY_PLANS = os.getenv("MONGO_CHECK_QUERY_PLANS", "false").lower() == "true"  # log an error if a hot query collection-scans
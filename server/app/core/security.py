@@ -1,13 +1,28 @@
+import asyncio
+import hashlib
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from jose import jwt 
+from jose import jwt, JWTError
 from passlib.context import CryptContext
 
-from app.core.config import JWT_SECRET, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.core.config import (
+    JWT_SECRET,
+    ALGORITHM,
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    BCRYPT_ROUNDS,
+    PASSWORD_HASH_WORKERS,
+    AUTH_TOKEN_CACHE_MAX_ENTRIES,
+)
+from app.models.schemas import TokenData
+from app.services.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# deprecated="auto" + an explicit cost: hashes made at any other cost report needs_update,
+# so verify_and_update hands back a rehash at the current cost
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -15,6 +30,57 @@ def hash_password(password: str) -> str:
 def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
+def verify_and_update_password(plain: str, hashed: str):
+    # (valid, new_hash); new_hash is None unless the stored hash should be replaced
+    return pwd_context.verify_and_update(plain, hashed)
+
+
+class PasswordHasher:
+    # bcrypt is deliberately slow CPU work, so it runs on its own small thread pool instead of
+    # the event loop (the bcrypt backend releases the GIL while hashing). The pool size caps how
+    # many hashes run at once; a login burst queues here rather than stalling every other request.
+
+    def __init__(self, workers=PASSWORD_HASH_WORKERS):
+        self.workers = max(1, workers)
+        self._executor = None
+        self.counters = {"hashed": 0, "verified": 0, "rehashed": 0, "pending": 0}
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, fn, *args):
+        self.counters["pending"] += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.counters["pending"] -= 1
+
+    async def hash(self, password: str) -> str:
+        self.counters["hashed"] += 1
+        return await self._run(hash_password, password)
+
+    async def verify(self, plain: str, hashed: str):
+        self.counters["verified"] += 1
+        valid, new_hash = await self._run(verify_and_update_password, plain, hashed)
+        if new_hash:
+            self.counters["rehashed"] += 1
+        return valid, new_hash
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self):
+        return {**self.counters, "workers": self.workers, "rounds": BCRYPT_ROUNDS}
+
+
+password_hasher = PasswordHasher()
+
+
 def create_token(data: dict, expires_delta: timedelta = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -24,3 +90,56 @@ def create_token(data: dict, expires_delta: timedelta = None) -> str:
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, JWT_SECRET, algorithm=ALGORITHM)
     return encoded_jwt
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def decode_token(token: str) -> dict:
+    # Verifies signature and exp; raises InvalidToken for anything unusable
+    try:
+        claims = jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM])
+    except JWTError as e:
+        raise InvalidToken(str(e))
+    if not claims.get("sub") or "exp" not in claims:
+        raise InvalidToken("Token is missing the sub or exp claim")
+    return claims
+
+
+class VerifiedTokenCache:
+    # Decoded claims keyed by a hash of the token (the raw token never sits in memory as a key),
+    # each kept only until the token's own exp. A hit skips the HMAC check and JSON parsing;
+    # an expired token falls out of the cache and fails verification on the next request.
+
+    def __init__(self, max_entries=AUTH_TOKEN_CACHE_MAX_ENTRIES):
+        self.memory = TTLCache(maxsize=max_entries)
+        self.counters = {"hits": 0, "misses": 0, "rejected": 0}
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def verify(self, token: str) -> TokenData:
+        key = self._key(token)
+        state, user, _ = self.memory.get(key)
+        if state != "miss":
+            self.counters["hits"] += 1
+            return user
+        self.counters["misses"] += 1
+        try:
+            claims = decode_token(token)
+        except InvalidToken:
+            self.counters["rejected"] += 1
+            raise
+        user = TokenData(user_id=str(claims["sub"]), email=claims.get("email"))
+        remaining = claims["exp"] - time.time()
+        if remaining > 0:
+            self.memory.set(key, user, ttl=remaining)
+        return user
+
+    def stats(self):
+        return {**self.counters, "entries": len(self.memory)}
+
+
+token_cache = VerifiedTokenCache()
@@ -0,0 +1,145 @@
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from app.db.mongo import mongo
+
+logger = logging.getLogger(__name__)
+
+# Every index the app relies on, created at startup. create_index is a no-op when an identical
+# index already exists, so this is safe to run on every boot and from every worker.
+INDEXES = [
+    # login looks users up by email; signup checks email/username and relies on these for uniqueness
+    ("users", [("email", ASCENDING)], {"name": "email_unique", "unique": True}),
+    ("users", [("username", ASCENDING)], {"name": "username_unique", "unique": True}),
+    # /user/lectures: filter on user_id, newest first, keyset-paginated with _id as the tie-breaker
+    ("lectures", [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], {"name": "user_id_created_at_id"}),
+    # cache collections expire documents at their expires_at
+    ("lecture_topic_cache", [("expires_at", ASCENDING)], {"name": "expires_at_ttl", "expireAfterSeconds": 0}),
+    ("transcripts", [("expires_at", ASCENDING)], {"name": "expires_at_ttl", "expireAfterSeconds": 0}),
+    ("wikipedia_summaries", [("expires_at", ASCENDING)], {"name": "expires_at_ttl", "expireAfterSeconds": 0}),
+]
+
+# Indexes replaced by an entry above, dropped at startup if still present
+OBSOLETE_INDEXES = [
+    ("lectures", "user_id_created_at"),
+]
+
+PLAN_CHECK_TIME = datetime(2024, 1, 1)
+
+# The queries behind login, signup and /user/lectures (see app.db.repositories), as
+# (description, collection, filter, sort). None of them may need a collection scan.
+HOT_QUERIES = [
+    ("login: user by email", "users", {"email": "plan-check@example.com"}, None),
+    ("signup: email or username taken", "users",
+     {"$or": [{"email": "plan-check@example.com"}, {"username": "plan-check"}]}, None),
+    ("user lectures, newest first", "lectures", {"user_id": "plan-check", "created_at": {"$type": "date"}},
+     [("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ("user lectures, next page", "lectures",
+     {"user_id": "plan-check", "created_at": {"$type": "date", "$lte": PLAN_CHECK_TIME},
+      "$or": [{"created_at": {"$lt": PLAN_CHECK_TIME}}, {"_id": {"$lt": ObjectId("0" * 24)}}]},
+     [("created_at", DESCENDING), ("_id", DESCENDING)]),
+]
+
+
+class QueryPlanError(Exception):
+    pass
+
+
+async def _report_duplicates(collection, field):
+    # A unique index cannot be built over existing duplicates (signup used to be racy)
+    pipeline = [
+        {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": 10},
+    ]
+    duplicates = [doc["_id"] async for doc in collection.aggregate(pipeline)]
+    if duplicates:
+        logger.error(f"Cannot create unique index on {collection.name}.{field}; duplicate values include: {duplicates}")
+
+
+async def ensure_indexes(db):
+    created = []
+    for collection_name, keys, options in INDEXES:
+        collection = db[collection_name]
+        try:
+            created.append(f"{collection_name}.{await collection.create_index(keys, **options)}")
+        except OperationFailure as e:
+            if e.code == 11000 and options.get("unique"):  # duplicate key
+                await _report_duplicates(collection, keys[0][0])
+            else:
+                logger.error(f"Failed to create index {options['name']} on {collection_name}: {str(e)}")
+    for collection_name, index_name in OBSOLETE_INDEXES:
+        try:
+            await db[collection_name].drop_index(index_name)
+            logger.info(f"Dropped obsolete index {collection_name}.{index_name}")
+        except OperationFailure as e:
+            if e.code != 27:  # IndexNotFound: already gone
+                logger.error(f"Failed to drop index {index_name} on {collection_name}: {str(e)}")
+    logger.info(f"Indexes ensured: {', '.join(created)}")
+    return created
+
+
+def _stages(plan):
+    # Every stage name in an explain() plan tree (classic and slot-based engine layouts)
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _stages(item)
+
+
+async def check_query_plans(db):
+    # Raises QueryPlanError listing every hot query whose winning plan contains a COLLSCAN
+    failures = []
+    for description, collection_name, query, sort in HOT_QUERIES:
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.limit(10).explain()
+        stages = set(_stages(explain["queryPlanner"]["winningPlan"]))
+        if "COLLSCAN" in stages:
+            failures.append(f"{description} ({collection_name}: {query}) uses COLLSCAN")
+        else:
+            logger.info(f"Query plan OK for {description}: {sorted(stages)}")
+    if failures:
+        raise QueryPlanError("; ".join(failures))
+
+
+async def migrate(check_plans=False):
+    db = mongo.db
+    await ensure_indexes(db)
+    if check_plans and mongo.backend != "memory":  # mongomock has no query planner
+        await check_query_plans(db)
+
+
+def main():
+    # python -m app.db.migrations [--check-plans]; exits non-zero if a hot query collection-scans
+    parser = argparse.ArgumentParser(description="Create indexes and verify query plans")
+    parser.add_argument("--check-plans", action="store_true", help="fail if a hot query's plan shows a COLLSCAN")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    async def run():
+        await mongo.connect()
+        try:
+            await migrate(check_plans=args.check_plans)
+        finally:
+            mongo.close()
+
+    try:
+        asyncio.run(run())
+    except QueryPlanError as e:
+        logger.error(f"Query plan check failed: {str(e)}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
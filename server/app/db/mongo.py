@@ -0,0 +1,59 @@
+import logging
+
+from app.core.config import MONGO_URI, DB_NAME, MONGO_BACKEND
+from app.db.setup import CLIENT_OPTIONS
+
+logger = logging.getLogger(__name__)
+
+
+class MongoDatabase:
+    # Async driver client, created in the app lifespan (not at import) so it binds to the
+    # running event loop. MONGO_BACKEND=memory swaps in mongomock-motor, which needs no server
+    # and starts from an empty store on every connect() (used by the tests; see
+    # requirements-dev.txt).
+
+    def __init__(self, uri=MONGO_URI, db_name=DB_NAME, backend=MONGO_BACKEND, options=None):
+        self.uri = uri
+        self.db_name = db_name
+        self.backend = backend
+        self.options = options or CLIENT_OPTIONS
+        self.client = None
+        self._db = None
+
+    def _create_client(self):
+        if self.backend == "memory":
+            try:
+                from mongomock_motor import AsyncMongoMockClient
+            except ImportError:
+                raise RuntimeError("MONGO_BACKEND=memory requires the mongomock-motor package")
+            return AsyncMongoMockClient()
+        from motor.motor_asyncio import AsyncIOMotorClient
+        return AsyncIOMotorClient(self.uri, **self.options)
+
+    async def connect(self):
+        if self.client is not None:
+            return
+        self.client = self._create_client()
+        self._db = self.client[self.db_name]
+        if self.backend != "memory":
+            try:
+                await self.client.admin.command("ping")
+                logger.info(f"Connected to MongoDB database '{self.db_name}' (max pool {self.options['maxPoolSize']}).")
+            except Exception as e:
+                # Not fatal: the driver keeps retrying and requests fail individually until it is back
+                logger.error(f"MongoDB ping failed at startup: {str(e)}")
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+            self._db = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            raise RuntimeError("MongoDB client not initialised; mongo.connect() runs in the app lifespan")
+        return self._db
+
+
+mongo = MongoDatabase()
@@ -0,0 +1,120 @@
+from datetime import datetime
+
+from app.db.mongo import mongo
+
+# Async data access for users and lectures. Handlers call these instead of touching
+# collections, so queries (and the indexes they rely on) live in one place.
+
+
+def users():
+    return mongo.db["users"]
+
+
+def lectures():
+    return mongo.db["lectures"]
+
+
+# Cache collections, on the same async client. Each cache service in app.services owns its
+# queries; these are looked up per call because mongo.db only exists once the lifespan connects.
+
+def lecture_topic_cache():
+    return mongo.db["lecture_topic_cache"]
+
+
+def video_metadata():
+    return mongo.db["video_metadata"]
+
+
+def transcripts():
+    return mongo.db["transcripts"]
+
+
+def wikipedia_summaries():
+    return mongo.db["wikipedia_summaries"]
+
+
+# Users
+
+async def find_user_by_email(email: str):
+    return await users().find_one({"email": email})
+
+
+async def find_user_by_email_or_username(email: str, username: str):
+    return await users().find_one({"$or": [{"email": email}, {"username": username}]}, {"_id": 1})
+
+
+async def create_user(username: str, email: str, password_hash: str) -> str:
+    result = await users().insert_one({
+        "username": username,
+        "email": email,
+        "password": password_hash,
+        "created_at": datetime.utcnow(),
+    })
+    return str(result.inserted_id)
+
+
+async def update_user_password(user_id, old_hash: str, new_hash: str) -> bool:
+    # Conditional on the old hash so a rehash never overwrites a password changed meanwhile
+    result = await users().update_one({"_id": user_id, "password": old_hash}, {"$set": {"password": new_hash}})
+    return result.modified_count == 1
+
+
+# Lectures
+
+async def save_user_lecture(user_id: str, topic: str, videos: list) -> str:
+    result = await lectures().insert_one({
+        "user_id": user_id,
+        "topic": topic,
+        "videos": videos,
+        "created_at": datetime.utcnow(),
+    })
+    return str(result.inserted_id)
+
+
+LECTURE_VIDEO_STATUSES = ("todo", "inprogress", "done")
+
+
+def _video_count(status=None):
+    videos = {"$ifNull": ["$videos", []]}
+    if status is None:
+        return {"$size": videos}
+    return {"$size": {"$filter": {"input": videos, "as": "video", "cond": {"$eq": ["$$video.status", status]}}}}
+
+
+async def list_user_lecture_summaries(user_id: str, limit: int = 10, before=None):
+    # Newest first, keyset-paginated on (created_at, _id): `before` is the (created_at, _id)
+    # of the last lecture on the previous page. Served by the user_id_created_at_id index, and
+    # the videos arrays are reduced to counts inside the server instead of being sent back.
+    # Keyset order needs a real date; legacy rows with a string or missing created_at are skipped
+    query = {"user_id": user_id, "created_at": {"$type": "date"}}
+    if before is not None:
+        created_at, lecture_id = before
+        query["created_at"]["$lte"] = created_at
+        query["$or"] = [{"created_at": {"$lt": created_at}}, {"_id": {"$lt": lecture_id}}]
+    pipeline = [
+        {"$match": query},
+        {"$sort": {"created_at": -1, "_id": -1}},
+        {"$limit": limit},
+        {"$project": {
+            "topic": 1,
+            "created_at": 1,
+            "video_count": _video_count(),
+            "progress": {status: _video_count(status) for status in LECTURE_VIDEO_STATUSES},
+        }},
+    ]
+    return await lectures().aggregate(pipeline).to_list(length=limit)
+
+
+async def get_user_lecture_videos(user_id: str, lecture_id, offset: int = 0, limit: int = 20):
+    # One page of a lecture's videos, or None if the lecture is not this user's
+    pipeline = [
+        {"$match": {"_id": lecture_id, "user_id": user_id}},
+        {"$project": {
+            "topic": 1,
+            "created_at": 1,
+            "video_count": _video_count(),
+            "videos": {"$slice": [{"$ifNull": ["$videos", []]}, offset, limit]},
+        }},
+    ]
+    docs = await lectures().aggregate(pipeline).to_list(length=1)
+    return docs[0] if docs else None
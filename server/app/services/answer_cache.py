@@ -0,0 +1,191 @@
+import math
+import re
+import time
+from collections import Counter
+
+from app.core.config import ANSWER_CACHE_TTL, ANSWER_CACHE_DEGRADED_TTL, ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_SIMILARITY
+from app.services.cache import TTLCache, SingleFlight, StreamFlight
+from app.services.passage_index import tokenize
+from app.services.transcript_store import transcript_store
+from app.services.wikipedia_source import wikipedia_cache
+from app.utils.helpers import normalize_topic
+
+
+def normalize_question(question):
+    return " ".join(re.sub(r"[^\w\s]", " ", question.lower()).split())
+
+
+def question_vector(question):
+    # Bag-of-words term vector; a lightweight stand-in for a sentence embedding
+    return Counter(tokenize(question))
+
+
+def cosine(a, b):
+    if not a or not b:
+        return 0.0
+    dot = sum(count * b.get(term, 0) for term, count in a.items())
+    return dot / (math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values())))
+
+
+class AnswerCache:
+    # Generated answers keyed by (videoId, normalised topic, normalised question). Each entry
+    # records the transcript/Wikipedia versions it was built from; a lookup that finds a newer
+    # version loaded for the same video or topic drops the entry. Concurrent identical questions share
+    # one model call, whether they come through get_or_compute() or stream(). With `similarity` > 0, a miss also checks earlier questions about the
+    # same video and topic whose term vectors are at least that cosine-similar.
+
+    def __init__(self, max_entries=ANSWER_CACHE_MAX_ENTRIES, ttl=ANSWER_CACHE_TTL,
+                 degraded_ttl=ANSWER_CACHE_DEGRADED_TTL, similarity=ANSWER_CACHE_SIMILARITY):
+        self.memory = TTLCache(maxsize=max_entries, ttl=ttl)
+        self.ttl = ttl
+        self.degraded_ttl = degraded_ttl
+        self.similarity = similarity
+        self.flights = SingleFlight()
+        self.streams = {}  # key -> StreamFlight for streamed answers in progress
+        self._questions = {}  # (videoId, topic) -> {normalised question: term vector}
+        self.counters = {"hits": 0, "similar_hits": 0, "misses": 0, "coalesced": 0, "invalidated": 0}
+
+    @staticmethod
+    def _key(video_id, topic, question):
+        return video_id, normalize_topic(topic), normalize_question(question)
+
+    def _current_versions(self, video_id, topic):
+        # None means "not known in this process", which never invalidates
+        return {"transcript": transcript_store.version(video_id), "wikipedia": wikipedia_cache.version(topic)}
+
+    def _is_current(self, entry):
+        current = self._current_versions(entry["video_id"], entry["topic"])
+        for source, recorded in entry["versions"].items():
+            if recorded and current.get(source) and current[source] != recorded:
+                return False
+        return True
+
+    def _prune(self):
+        # Drops vectors whose answers were evicted or expired, and the scopes left empty
+        for scope, questions in list(self._questions.items()):
+            for question in list(questions):
+                if self.memory.get((*scope, question))[0] == "miss":
+                    del questions[question]
+            if not questions:
+                del self._questions[scope]
+
+    def _similar(self, key):
+        scope, question = key[:2], key[2]
+        vector = question_vector(question)
+        questions = self._questions.get(scope)
+        if not questions:
+            return None
+        best, best_score = None, self.similarity
+        for other, other_vector in list(questions.items()):
+            if self.memory.get((*scope, other))[0] == "miss":
+                del questions[other]
+                continue
+            score = cosine(vector, other_vector)
+            if score >= best_score:
+                best, best_score = (*scope, other), score
+        if not questions:
+            del self._questions[scope]
+        return best
+
+    def lookup(self, video_id, topic, question):
+        # (entry, "hit" | "similar") or (None, "miss")
+        key = self._key(video_id, topic, question)
+        status = "hit"
+        state, entry, _ = self.memory.get(key)
+        if state == "miss" and self.similarity > 0:
+            similar_key = self._similar(key)
+            if similar_key:
+                key, status = similar_key, "similar"
+                state, entry, _ = self.memory.get(key)
+        if state == "miss":
+            return None, "miss"
+        if not self._is_current(entry):
+            self.memory.pop(key)
+            self.counters["invalidated"] += 1
+            return None, "miss"
+        self.counters["hits" if status == "hit" else "similar_hits"] += 1
+        return entry, status
+
+    def store(self, video_id, topic, question, result):
+        # Answers built while a source was degraded are only kept briefly
+        complete = all(status == "ok" for status in result["sources"].values())
+        key = self._key(video_id, topic, question)
+        entry = {**result, "video_id": video_id, "topic": topic, "created_at": time.time()}
+        self.memory.set(key, entry, ttl=self.ttl if complete else self.degraded_ttl)
+        if self.similarity > 0:
+            if key[:2] not in self._questions and len(self._questions) >= self.memory.maxsize:
+                self._prune()  # scopes never looked up again would otherwise accumulate
+            self._questions.setdefault(key[:2], {})[key[2]] = question_vector(key[2])
+        return entry
+
+    async def _compute(self, video_id, topic, question, compute):
+        return self.store(video_id, topic, question, await compute())
+
+    async def get_or_compute(self, video_id, topic, question, compute):
+        # `compute()` is awaited once per distinct question and must return a dict with
+        # "answer", "sources" and "versions"; returns (entry, "hit" | "similar" | "miss" | "coalesced")
+        entry, status = self.lookup(video_id, topic, question)
+        if entry is not None:
+            return entry, status
+        key = self._key(video_id, topic, question)
+        flight = self.streams.get(key)
+        if flight is not None:
+            self.counters["coalesced"] += 1
+            try:
+                async for _ in flight.read():
+                    pass
+            except Exception:
+                pass  # the streaming request reports its own failure; compute below instead
+            else:
+                state, entry, _ = self.memory.get(key)  # stored by the stream before it finished
+                if state != "miss":
+                    return entry, "coalesced"
+        status = "coalesced" if self.flights.in_flight(key) else "miss"
+        self.counters["coalesced" if status == "coalesced" else "misses"] += 1
+        entry = await self.flights.do(key, lambda: self._compute(video_id, topic, question, compute))
+        return entry, status
+
+    async def _joined_compute(self, key, replay):
+        async for event in replay(await self.flights.wait(key)):
+            yield event
+
+    def stream(self, video_id, topic, question, produce, replay):
+        # Streaming counterpart of get_or_compute(), for after lookup() missed. Returns
+        # (status, events): "miss" for the request that calls `produce()`, an async generator of
+        # events that must store() the answer once it is complete, or "coalesced" for one that
+        # joins it and first replays the events already sent. A request arriving while
+        # get_or_compute() is working on the question gets `replay(entry)` once that finishes.
+        key = self._key(video_id, topic, question)
+        flight = self.streams.get(key)
+        if flight is not None:
+            self.counters["coalesced"] += 1
+            return "coalesced", flight.read()
+        if self.flights.in_flight(key):
+            self.counters["coalesced"] += 1
+            return "coalesced", self._joined_compute(key, replay)
+        self.counters["misses"] += 1
+        flight = StreamFlight(produce())
+        self.streams[key] = flight
+
+        def _done(_):
+            if self.streams.get(key) is flight:
+                del self.streams[key]
+
+        flight.task.add_done_callback(_done)
+        return "miss", flight.read()
+
+    def invalidate(self, video_id=None, topic=None):
+        topic = normalize_topic(topic) if topic is not None else None
+        removed = 0
+        for key in self.memory.keys():
+            if (video_id is None or key[0] == video_id) and (topic is None or key[1] == topic):
+                self.memory.pop(key)
+                removed += 1
+        self.counters["invalidated"] += removed
+        return removed
+
+    def stats(self):
+        return {**self.counters, "entries": len(self.memory), "similarity_threshold": self.similarity}
+
+
+answer_cache = AnswerCache()
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+
+from app.core.config import QA_TRANSCRIPT_TIMEOUT, QA_WIKIPEDIA_TIMEOUT
+from app.services.transcript_store import transcript_store, TranscriptUnavailable
+from app.services.passage_index import passage_indexes, select_passages
+from app.services.wikipedia_source import wikipedia_cache, summary_version
+from app.utils.helpers import format_duration
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPT_FALLBACK = "The video transcript could not be retrieved in time."
+WIKIPEDIA_FALLBACK = "Wikipedia could not be reached in time."
+
+
+async def _with_deadline(source, awaitable, timeout, fallback):
+    # (value, status): a slow or failing source degrades to its fallback instead of adding latency.
+    # TranscriptUnavailable is an answer about the video, not a failure, so it propagates.
+    try:
+        return await asyncio.wait_for(awaitable, timeout), "ok"
+    except asyncio.TimeoutError:
+        logger.warning(f"{source} missed its {timeout:.1f}s deadline; answering without it.")
+        return fallback, "timeout"
+    except TranscriptUnavailable:
+        raise
+    except Exception as e:
+        logger.error(f"{source} lookup failed; answering without it: {str(e)}")
+        return fallback, "error"
+
+
+async def _transcript_passages(video_id, question, topic):
+    segments = await transcript_store.get(video_id)
+    # Only the transcript passages most relevant to the question go into the prompt
+    index = await passage_indexes.get(video_id, segments)
+    return select_passages(index, f"{question} {topic}")
+
+
+async def gather_context(video_id, topic, question):
+    # Transcript and Wikipedia are fetched at the same time, each under its own deadline
+    wikipedia_task = asyncio.create_task(
+        _with_deadline("Wikipedia", wikipedia_cache.get(topic), QA_WIKIPEDIA_TIMEOUT, {"kind": "error", "text": WIKIPEDIA_FALLBACK})
+    )
+    try:
+        passages, transcript_status = await _with_deadline(
+            "Transcript", _transcript_passages(video_id, question, topic), QA_TRANSCRIPT_TIMEOUT, []
+        )
+    except BaseException:
+        wikipedia_task.cancel()
+        raise
+    wikipedia_entry, wikipedia_status = await wikipedia_task
+    wikipedia_content = wikipedia_entry["text"]
+    if wikipedia_entry["kind"] == "error" and wikipedia_status == "ok":
+        wikipedia_status = "error"  # lookup errors are reported in the text and never cached
+
+    if transcript_status != "ok":
+        transcript_text = TRANSCRIPT_FALLBACK
+    else:
+        transcript_text = "\n".join(f"[{format_duration(int(p['start']))}] {p['text']}" for p in passages)
+    return {
+        "passages": passages,
+        "transcript": transcript_text,
+        "wikipedia": wikipedia_content,
+        "sources": {"transcript": transcript_status, "wikipedia": wikipedia_status},
+        # What the answer was built from, so cached answers can be invalidated when a source changes
+        "versions": {
+            "transcript": transcript_store.version(video_id) if transcript_status == "ok" else None,
+            "wikipedia": summary_version(wikipedia_content) if wikipedia_status == "ok" else None,
+        },
+    }
+
+
+def build_prompt(video_id, topic, question, context):
+    return (
+        f"Based on the following information, please answer the question: '{question}'.\n\n"
+        f"From YouTube Video Transcript excerpts, prefixed with their timestamps (Topic: {topic}, Video ID: {video_id}):\n\"\"\"\n{context['transcript']}\n\"\"\"\n\n"
+        f"From Wikipedia (Topic: {topic}):\n\"\"\"\n{context['wikipedia']}\n\"\"\"\n\n"
+        "Provide a concise and direct answer to the question. If the information is insufficient, state that."
+    )
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    # In-process LRU with a per-entry expiry. Entries past their expiry are kept until
+    # `stale_ttl` more seconds pass so callers can serve them while revalidating.
+
+    def __init__(self, maxsize=256, ttl=3600, stale_ttl=0):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()  # key -> (value, stored_at, ttl)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.get(key)[0] != "miss"
+
+    def get(self, key):
+        # Returns (state, value, stored_at) where state is "fresh", "stale" or "miss"
+        entry = self._entries.get(key)
+        if entry is None:
+            return "miss", None, None
+        value, stored_at, ttl = entry
+        age = time.time() - stored_at
+        if age > ttl + self.stale_ttl:
+            del self._entries[key]
+            return "miss", None, None
+        self._entries.move_to_end(key)
+        return ("fresh" if age <= ttl else "stale"), value, stored_at
+
+    def set(self, key, value, stored_at=None, ttl=None):
+        self._entries[key] = (value, stored_at if stored_at is not None else time.time(), self.ttl if ttl is None else ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def keys(self):
+        return list(self._entries)
+
+    def pop(self, key, default=None):
+        entry = self._entries.pop(key, None)
+        return entry[0] if entry else default
+
+    def clear(self):
+        self._entries.clear()
+
+
+class SingleFlight:
+    # Coalesces concurrent calls for the same key onto one in-flight coroutine.
+
+    def __init__(self):
+        self._inflight = {}
+
+    def in_flight(self, key):
+        return key in self._inflight
+
+    async def wait(self, key):
+        # Joins the flight for `key`, which must be in flight
+        return await asyncio.shield(self._inflight[key])
+
+    async def do(self, key, fn):
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(fn())
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: a cancelled caller must not cancel the shared fetch for everyone else
+        return await asyncio.shield(future)
+
+    def spawn(self, key, fn):
+        # Fire-and-forget variant for background refreshes; joins an existing flight if any
+        if key in self._inflight:
+            return self._inflight[key]
+        future = asyncio.ensure_future(fn())
+        self._inflight[key] = future
+
+        def _done(f):
+            self._inflight.pop(key, None)
+            if not f.cancelled() and f.exception() is not None:
+                logger.warning(f"Background refresh for '{key}' failed: {f.exception()}")
+
+        future.add_done_callback(_done)
+        return future
+
+
+class StreamFlight:
+    # One producer (an async generator of batches) read by any number of consumers; readers
+    # that join late first replay the batches already produced. The producer runs as its own
+    # task, so a reader going away does not cut it short for the others. It is cancelled only
+    # once every reader has gone.
+
+    def __init__(self, source):
+        self.batches = []
+        self.error = None
+        self.finished = False
+        self.readers = 0
+        self._changed = asyncio.Event()
+        self.task = asyncio.ensure_future(self._run(source))
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _run(self, source):
+        try:
+            async for batch in source:
+                self.batches.append(batch)
+                self._notify()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished = True
+            self._notify()
+
+    async def read(self):
+        self.readers += 1
+        position = 0
+        try:
+            while True:
+                if position < len(self.batches):
+                    position += 1
+                    yield self.batches[position - 1]
+                elif self.finished:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                else:
+                    await self._changed.wait()
+        finally:
+            self.readers -= 1
+            if not self.readers and not self.finished:
+                self.task.cancel()
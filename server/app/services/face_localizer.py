@@ -0,0 +1,138 @@
+import logging
+import os
+import threading
+import numpy as np
+
+from app.core.config import (
+    FACE_DETECTOR_BACKEND,
+    DEEPFACE_DETECTOR,
+    YUNET_MODEL_PATH,
+    FACE_DETECTION_MIN_CONFIDENCE,
+)
+
+logger = logging.getLogger(__name__)
+
+# Face boxes are (x, y, w, h) tuples in pixel coordinates of the RGB frame,
+# largest-confidence first.
+
+
+class FaceLocalizer:
+    name = "base"
+
+    def detect(self, rgb_frame: np.ndarray) -> list:
+        raise NotImplementedError
+
+    def warm_up(self):
+        self.detect(np.zeros((240, 320, 3), dtype=np.uint8))
+
+
+class DeepFaceLocalizer(FaceLocalizer):
+    # Runs only DeepFace's detector stage; no emotion/age/gender model is touched.
+    name = "deepface"
+
+    def __init__(self, detector_backend=DEEPFACE_DETECTOR, min_confidence=FACE_DETECTION_MIN_CONFIDENCE):
+        from deepface import DeepFace
+        self._deepface = DeepFace
+        self.detector_backend = detector_backend
+        self.min_confidence = min_confidence
+
+    def detect(self, rgb_frame):
+        # DeepFace expects BGR like cv2.imread
+        faces = self._deepface.extract_faces(
+            img_path=np.ascontiguousarray(rgb_frame[..., ::-1]),
+            detector_backend=self.detector_backend,
+            enforce_detection=False,
+            align=False,
+        )
+        boxes = []
+        for face in faces or []:
+            area = face.get("facial_area") or {}
+            confidence = face.get("confidence") or 0
+            # With enforce_detection=False DeepFace returns the whole frame at confidence 0 when nothing is found
+            if confidence <= self.min_confidence or not all(k in area for k in ("x", "y", "w", "h")):
+                continue
+            boxes.append((confidence, (int(area["x"]), int(area["y"]), int(area["w"]), int(area["h"]))))
+        boxes.sort(key=lambda b: b[0], reverse=True)
+        return [box for _, box in boxes]
+
+
+YUNET_MODEL_URL = "https://github.com/opencv/opencv_zoo/tree/main/models/face_detection_yunet"
+
+
+class YuNetLocalizer(FaceLocalizer):
+    name = "yunet"
+
+    def __init__(self, model_path=YUNET_MODEL_PATH, min_confidence=FACE_DETECTION_MIN_CONFIDENCE):
+        if not os.path.isfile(model_path):
+            # cv2 would otherwise fail with an opaque error from inside the DNN loader
+            raise FileNotFoundError(
+                f"YuNet model not found at '{model_path}'. Download face_detection_yunet_2023mar.onnx "
+                f"from {YUNET_MODEL_URL} and point YUNET_MODEL_PATH at it."
+            )
+        import cv2
+        self._cv2 = cv2
+        self._detector = cv2.FaceDetectorYN.create(model_path, "", (320, 320), min_confidence)
+        self._input_size = None
+
+    def detect(self, rgb_frame):
+        h, w = rgb_frame.shape[:2]
+        if self._input_size != (w, h):
+            self._detector.setInputSize((w, h))
+            self._input_size = (w, h)
+        bgr = self._cv2.cvtColor(rgb_frame, self._cv2.COLOR_RGB2BGR)
+        _, faces = self._detector.detect(bgr)
+        if faces is None:
+            return []
+        faces = sorted(faces, key=lambda f: f[-1], reverse=True)
+        return [(int(f[0]), int(f[1]), int(f[2]), int(f[3])) for f in faces]
+
+
+class HaarCascadeLocalizer(FaceLocalizer):
+    name = "haar"
+
+    def __init__(self, scale_factor=1.1, min_neighbors=5, min_size=(60, 60)):
+        import cv2
+        self._cv2 = cv2
+        self._cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+        if self._cascade.empty():
+            raise RuntimeError("Could not load OpenCV Haar cascade for frontal faces.")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+
+    def detect(self, rgb_frame):
+        gray = self._cv2.cvtColor(rgb_frame, self._cv2.COLOR_RGB2GRAY)
+        faces = self._cascade.detectMultiScale(
+            gray, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors, minSize=self.min_size
+        )
+        # Haar gives no score; prefer the biggest face
+        faces = sorted((tuple(int(v) for v in f) for f in faces), key=lambda f: f[2] * f[3], reverse=True)
+        return faces
+
+
+LOCALIZER_BACKENDS = {
+    DeepFaceLocalizer.name: DeepFaceLocalizer,
+    YuNetLocalizer.name: YuNetLocalizer,
+    HaarCascadeLocalizer.name: HaarCascadeLocalizer,
+}
+
+_localizers = {}
+_localizers_lock = threading.Lock()
+
+
+def get_face_localizer(backend: str = None) -> FaceLocalizer:
+    backend = (backend or FACE_DETECTOR_BACKEND).lower()
+    if backend not in LOCALIZER_BACKENDS:
+        raise ValueError(f"Unknown face detector backend '{backend}'. Choose one of: {', '.join(LOCALIZER_BACKENDS)}")
+    if backend not in _localizers:
+        with _localizers_lock:
+            if backend not in _localizers:
+                logger.info(f"Loading face localizer backend: {backend}")
+                try:
+                    _localizers[backend] = LOCALIZER_BACKENDS[backend]()
+                except FileNotFoundError as e:
+                    if backend != YuNetLocalizer.name:
+                        raise
+                    logger.warning(f"{str(e)} Falling back to the Haar cascade localizer.")
+                    _localizers[backend] = HaarCascadeLocalizer()
+    return _localizers[backend]
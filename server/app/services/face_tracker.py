@@ -0,0 +1,91 @@
+import logging
+import cv2
+import numpy as np
+
+from app.core.config import FACE_REDETECT_INTERVAL, FACE_TRACK_MIN_SCORE, FACE_TRACK_DOWNSCALE
+from app.services.face_localizer import FaceLocalizer
+
+logger = logging.getLogger(__name__)
+
+
+class FaceTracker:
+    # Detects on keyframes and carries the box forward with template matching on a
+    # downscaled grayscale frame. One instance per capture session: it holds state.
+
+    def __init__(self, localizer: FaceLocalizer, redetect_interval=FACE_REDETECT_INTERVAL,
+                 min_score=FACE_TRACK_MIN_SCORE, downscale=FACE_TRACK_DOWNSCALE, search_margin=0.5):
+        self.localizer = localizer
+        self.redetect_interval = max(1, redetect_interval)
+        self.min_score = min_score
+        self.downscale = downscale if 0 < downscale <= 1 else 1.0
+        self.search_margin = search_margin
+
+        self.box = None
+        self._template = None
+        self._frames_since_detect = 0
+        self.detections = 0
+        self.tracked = 0
+
+    def reset(self):
+        self.box = None
+        self._template = None
+        self._frames_since_detect = 0
+
+    def _small_gray(self, rgb_frame):
+        gray = cv2.cvtColor(rgb_frame, cv2.COLOR_RGB2GRAY)
+        if self.downscale == 1.0:
+            return gray
+        return cv2.resize(gray, None, fx=self.downscale, fy=self.downscale, interpolation=cv2.INTER_AREA)
+
+    def _scaled(self, box):
+        return tuple(int(round(v * self.downscale)) for v in box)
+
+    def _redetect(self, rgb_frame, small):
+        self.detections += 1
+        boxes = self.localizer.detect(rgb_frame)
+        if not boxes:
+            self.reset()
+            return []
+
+        self.box = boxes[0]
+        sx, sy, sw, sh = self._scaled(self.box)
+        sx, sy = max(sx, 0), max(sy, 0)
+        template = small[sy:sy + sh, sx:sx + sw]
+        self._template = template if template.shape[0] >= 4 and template.shape[1] >= 4 else None
+        self._frames_since_detect = 0
+        return boxes
+
+    def _track(self, small):
+        th, tw = self._template.shape
+        sx, sy, _, _ = self._scaled(self.box)
+        sx, sy = max(sx, 0), max(sy, 0)
+        mx, my = int(tw * self.search_margin), int(th * self.search_margin)
+        x1, y1 = max(sx - mx, 0), max(sy - my, 0)
+        x2, y2 = min(sx + tw + mx, small.shape[1]), min(sy + th + my, small.shape[0])
+        search = small[y1:y2, x1:x2]
+        if search.shape[0] < th or search.shape[1] < tw:
+            return None
+
+        scores = cv2.matchTemplate(search, self._template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (lx, ly) = cv2.minMaxLoc(scores)
+        if not np.isfinite(score) or score < self.min_score:
+            logger.debug(f"FaceTracker: match score {score:.2f} below {self.min_score}, re-detecting.")
+            return None
+
+        _, _, w, h = self.box
+        return (int(round((x1 + lx) / self.downscale)), int(round((y1 + ly) / self.downscale)), w, h)
+
+    def detect(self, rgb_frame: np.ndarray) -> list:
+        small = self._small_gray(rgb_frame)
+
+        if self.box is None or self._template is None or self._frames_since_detect >= self.redetect_interval:
+            return self._redetect(rgb_frame, small)
+
+        tracked_box = self._track(small)
+        if tracked_box is None:
+            return self._redetect(rgb_frame, small)
+
+        self.box = tracked_box
+        self._frames_since_detect += 1
+        self.tracked += 1
+        return [tracked_box]
@@ -0,0 +1,94 @@
+import json
+import struct
+import numpy as np
+
+# Binary frame stream accepted by POST /analyze-stress/binary (Content-Type: application/octet-stream):
+#
+#   uint32 BE header length | UTF-8 JSON header | frames...
+#
+# Header: {"fps": 10, "format": "jpeg"} or {"fps": 10, "format": "rgb", "width": W, "height": H}
+#   jpeg: each frame is uint32 BE length followed by that many bytes of JPEG/PNG data
+#   rgb:  frames are pre-cropped forehead ROIs, W*H*3 uint8 bytes each, back to back, no prefix
+
+_LENGTH = struct.Struct(">I")
+FRAME_FORMATS = ("jpeg", "rgb")
+MIN_FPS, MAX_FPS = 1, 60
+
+
+class FrameStreamError(ValueError):
+    pass
+
+
+def parse_fps(value, default=10):
+    try:
+        fps = int(value) if value is not None else default
+    except (TypeError, ValueError):
+        raise FrameStreamError(f"fps must be an integer, got {value!r}")
+    if not MIN_FPS <= fps <= MAX_FPS:
+        raise FrameStreamError(f"fps must be between {MIN_FPS} and {MAX_FPS}, got {fps}")
+    return fps
+
+
+def parse_frame_stream(body: bytes, max_frames=None):
+    # Returns (header, frames). Frames are memoryview slices of `body` for jpeg and a
+    # (n, H, W, 3) uint8 view of `body` for rgb; neither copies the request buffer.
+    # More than `max_frames` frames is an error.
+    view = memoryview(body)
+    if len(view) < _LENGTH.size:
+        raise FrameStreamError("Stream too short for header length.")
+    (header_len,) = _LENGTH.unpack_from(view, 0)
+    offset = _LENGTH.size + header_len
+    if offset > len(view):
+        raise FrameStreamError("Header length exceeds stream size.")
+    try:
+        header = json.loads(bytes(view[_LENGTH.size:offset]).decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise FrameStreamError(f"Invalid JSON header: {e}")
+    if not isinstance(header, dict):
+        raise FrameStreamError("Header must be a JSON object.")
+
+    header["fps"] = parse_fps(header.get("fps"))
+    frame_format = header.setdefault("format", "jpeg")
+    if frame_format not in FRAME_FORMATS:
+        raise FrameStreamError(f"Unknown frame format '{frame_format}'. Expected one of: {', '.join(FRAME_FORMATS)}")
+
+    if frame_format == "rgb":
+        frames = _parse_rgb_frames(header, body, offset)
+        _check_frame_count(len(frames), max_frames)
+        return header, frames
+
+    frames = []
+    while offset < len(view):
+        if offset + _LENGTH.size > len(view):
+            raise FrameStreamError(f"Truncated length prefix for frame {len(frames)+1}.")
+        (frame_len,) = _LENGTH.unpack_from(view, offset)
+        offset += _LENGTH.size
+        if offset + frame_len > len(view):
+            raise FrameStreamError(f"Frame {len(frames)+1} is truncated.")
+        frames.append(view[offset:offset + frame_len])
+        _check_frame_count(len(frames), max_frames)
+        offset += frame_len
+    return header, frames
+
+
+def _check_frame_count(count, max_frames):
+    if max_frames is not None and count > max_frames:
+        raise FrameStreamError(f"Too many frames: at most {max_frames} per request.")
+
+
+def _parse_rgb_frames(header, body, offset):
+    try:
+        width, height = int(header["width"]), int(header["height"])
+    except (KeyError, TypeError, ValueError):
+        raise FrameStreamError("rgb format requires integer 'width' and 'height' in the header.")
+    if width <= 0 or height <= 0:
+        raise FrameStreamError(f"Invalid rgb frame size {width}x{height}.")
+    frame_size = width * height * 3
+    payload = len(body) - offset
+    if payload % frame_size:
+        raise FrameStreamError(f"rgb payload of {payload} bytes is not a whole number of {width}x{height} frames.")
+    return np.frombuffer(body, dtype=np.uint8, offset=offset).reshape(-1, height, width, 3)
+
+
+def rgb_means_from_frames(rgb_frames: np.ndarray) -> np.ndarray:
+    return rgb_frames.mean(axis=(1, 2))
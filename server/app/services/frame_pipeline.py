@@ -0,0 +1,166 @@
+import asyncio
+import base64
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+import numpy as np
+from PIL import Image
+
+from app.core.config import (
+    FACE_TRACKING_ENABLED,
+    STRESS_POOL_SIZE,
+    STRESS_BATCH_SIZE,
+    STRESS_POOL_START_METHOD,
+)
+from app.services.face_localizer import get_face_localizer
+from app.services.face_tracker import FaceTracker
+
+logger = logging.getLogger(__name__)
+
+
+def decode_image_bytes(image_data) -> np.ndarray:
+    return np.asarray(Image.open(BytesIO(image_data)).convert('RGB'))
+
+
+def decode_data_url(frame_data_url: str) -> np.ndarray:
+    header, encoded = frame_data_url.split(',', 1)
+    return decode_image_bytes(base64.b64decode(encoded))
+
+
+def extract_forehead(i, rgb_frame, face_detector):
+    try:
+        face_boxes = face_detector.detect(rgb_frame)
+    except ValueError as ve:
+        logger.warning(f"Frame {i+1}: ValueError in face detection (no face?). Error: {ve}. Skipping.")
+        return None
+
+    if not face_boxes:
+        logger.warning(f"Frame {i+1}: No face detected. Skipping.")
+        return None
+
+    if len(face_boxes) > 1:
+        logger.warning(f"Frame {i+1}: Multiple faces ({len(face_boxes)}) detected. Using the first one.")
+        # For now, process the first one. Consider skipping or specific logic for multiple faces.
+
+    box = face_boxes[0]
+    x, y, w, h = box
+    logger.debug(f"Frame {i+1}: Detected face at x:{x}, y:{y}, w:{w}, h:{h}")
+
+    if w <= 0 or h <= 0:
+        logger.warning(f"Frame {i+1}: Invalid face region dimensions. w:{w}, h:{h}. Skipping.")
+        return None
+
+    roi_y1 = max(y + (h // 8), 0)
+    roi_y2 = min(y + (h // 4), rgb_frame.shape[0])
+    roi_x1 = max(x + (w // 3), 0)
+    roi_x2 = min(x + w - (w // 3), rgb_frame.shape[1])
+
+    if not (roi_x1 < roi_x2 and roi_y1 < roi_y2):
+        logger.warning(f"Frame {i+1}: Invalid forehead ROI. Box: {box}, ROI:({roi_x1},{roi_y1},{roi_x2},{roi_y2}). Skipping.")
+        return None
+
+    forehead_array = rgb_frame[roi_y1:roi_y2, roi_x1:roi_x2]
+    if forehead_array.ndim < 3 or forehead_array.shape[2] < 3:
+        logger.warning(f"Frame {i+1}: Forehead array shape {forehead_array.shape} unexpected. Skipping.")
+        return None
+
+    return forehead_array
+
+
+def forehead_rgb_mean(i, rgb_frame, face_detector):
+    forehead = extract_forehead(i, rgb_frame, face_detector)
+    if forehead is None or forehead.size == 0:
+        return None
+    return tuple(float(forehead[..., c].mean()) for c in range(3))
+
+
+def process_frame_chunk(start_index: int, frames: list) -> list:
+    # Runs inside a pool worker. The chunk is contiguous so the tracker can carry the face box
+    # across it; each chunk starts on a keyframe.
+    face_detector = get_face_localizer()
+    if FACE_TRACKING_ENABLED:
+        face_detector = FaceTracker(face_detector)
+
+    results = []
+    for i, frame in enumerate(frames, start=start_index):
+        if isinstance(frame, (bytes, bytearray, memoryview)):
+            decode = decode_image_bytes
+        elif isinstance(frame, str) and ',' in frame:
+            decode = decode_data_url
+        else:
+            logger.warning(f"Frame {i+1}: Invalid data URL format. Skipping.")
+            results.append(None)
+            continue
+        try:
+            rgb_frame = decode(frame)
+            results.append(forehead_rgb_mean(i, rgb_frame, face_detector))
+        except Exception as frame_error:
+            logger.error(f"Frame {i+1}: General error processing frame. Error: {frame_error}", exc_info=True)
+            results.append(None)
+    return results
+
+
+def _worker_ready():
+    return True
+
+
+def _init_worker():
+    logging.basicConfig(level=logging.INFO)
+    localizer = get_face_localizer()
+    localizer.warm_up()
+    logger.info(f"Stress worker ready with face localizer '{localizer.name}'.")
+
+
+class FramePipeline:
+
+    def __init__(self, pool_size=STRESS_POOL_SIZE, batch_size=STRESS_BATCH_SIZE, start_method=STRESS_POOL_START_METHOD):
+        self.pool_size = max(0, pool_size)
+        self.batch_size = max(1, batch_size)
+        self.start_method = start_method
+        self._executor = None
+
+    def _get_executor(self):
+        if self.pool_size == 0:
+            return None  # default thread executor of the running loop
+        if self._executor is None:
+            logger.info(f"Starting stress frame pool: {self.pool_size} workers, batch size {self.batch_size}.")
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.pool_size,
+                mp_context=multiprocessing.get_context(self.start_method),
+                initializer=_init_worker,
+            )
+        return self._executor
+
+    async def run(self, frames: list) -> list:
+        # Returns one entry per input frame, in frame order: the forehead (R, G, B) mean or None.
+        # Frames are data URL strings or encoded image bytes (memoryviews are copied to bytes
+        # only when they have to be pickled to a worker process).
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        tasks = []
+        for start in range(0, len(frames), self.batch_size):
+            chunk = frames[start:start + self.batch_size]
+            if executor is not None:
+                chunk = [bytes(f) if isinstance(f, memoryview) else f for f in chunk]
+            tasks.append(loop.run_in_executor(executor, process_frame_chunk, start, chunk))
+        results = []
+        for chunk_result in await asyncio.gather(*tasks):
+            results.extend(chunk_result)
+        return results
+
+    async def warm_up(self):
+        # Start every worker now so their initializers (model load) run before the first request
+        executor = self._get_executor()
+        if executor is None:
+            return
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(executor, _worker_ready) for _ in range(self.pool_size)])
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+frame_pipeline = FramePipeline()
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import time
+from collections import deque
+import google.generativeai as genai
+
+from app.core.config import GEMINI_API_KEY, GEMINI_MODEL, QA_GENERATION_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+
+class GeminiClient:
+    # The SDK is configured and the model built once per process (in the app lifespan)
+    # instead of on every question.
+
+    def __init__(self, api_key=GEMINI_API_KEY, model_name=GEMINI_MODEL, timeout=QA_GENERATION_TIMEOUT):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.timeout = timeout
+        self._model = None
+        self.counters = {"streams": 0, "completed": 0, "cancelled": 0, "failed": 0}
+        self._ttft = deque(maxlen=500)  # seconds, most recent streams
+
+    @property
+    def configured(self):
+        return bool(self.api_key)
+
+    def start(self):
+        if self._model is None and self.configured:
+            genai.configure(api_key=self.api_key)
+            self._model = genai.GenerativeModel(self.model_name)
+            logger.info(f"Gemini model {self.model_name} initialised.")
+        return self._model
+
+    @property
+    def model(self):
+        return self._model or self.start()
+
+    async def generate(self, prompt):
+        response = await self.model.generate_content_async(prompt, request_options={"timeout": self.timeout})
+        return response.text.strip()
+
+    async def stream(self, prompt):
+        # Async generator of answer text chunks as the model produces them. Closing it (or
+        # cancelling the consumer) abandons the underlying streaming call.
+        self.counters["streams"] += 1
+        start = time.perf_counter()
+        first_token = True
+        try:
+            response = await self.model.generate_content_async(prompt, stream=True, request_options={"timeout": self.timeout})
+            async for chunk in response:
+                try:
+                    text = chunk.text
+                except ValueError:  # chunks without text parts, e.g. the final finish_reason chunk
+                    continue
+                if not text:
+                    continue
+                if first_token:
+                    self._ttft.append(time.perf_counter() - start)
+                    first_token = False
+                yield text
+            self.counters["completed"] += 1
+        except (asyncio.CancelledError, GeneratorExit):
+            self.counters["cancelled"] += 1
+            raise
+        except Exception:
+            self.counters["failed"] += 1
+            raise
+
+    def stats(self):
+        samples = sorted(self._ttft)
+
+        def percentile_ms(q):
+            return round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 1) if samples else None
+
+        return {**self.counters, "ttft_ms_p50": percentile_ms(0.5), "ttft_ms_p95": percentile_ms(0.95), "ttft_samples": len(samples)}
+
+
+gemini_client = GeminiClient()
@@ -1,10 +1,30 @@
 import logging
+from collections import deque
+from functools import lru_cache
 import numpy as np
-from scipy.signal import find_peaks, detrend, butter, filtfilt
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import find_peaks, detrend, butter, filtfilt, welch
 from scipy.fftpack import fft, fftfreq
 
 logger = logging.getLogger(__name__)
 
+
+@lru_cache(maxsize=32)
+def _bandpass_coefficients(lowcut, highcut, fs, order):
+    nyquist = 0.5 * fs
+    return butter(order, [lowcut / nyquist, highcut / nyquist], btype='band')
+
+
+# A detrended signal whose peak-to-peak is below this fraction of the raw signal's magnitude is
+# only float rounding left over from a constant or linear input; it has no pulse to measure.
+FLAT_SIGNAL_TOLERANCE = 1e-9
+
+
+def _flat_rows(raw, detrended):
+    scale = np.maximum(np.max(np.abs(raw), axis=-1), 1.0)
+    return np.ptp(detrended, axis=-1) <= FLAT_SIGNAL_TOLERANCE * scale
+
+
 class HeartMetricsCalculator:
 
     def __init__(self, fps=30, window_length_multiplier=2, step_size_multiplier=1):
@@ -21,6 +41,8 @@ class HeartMetricsCalculator:
 
     @staticmethod
     def bandpass_filter(data, lowcut, highcut, fs, order=5):
+        # Filters along the last axis, so a 2-D array is filtered row by row.
+        # butter() coefficients are cached per (band, fs, order).
         if fs <= 0: 
             logger.error("Bandpass filter: fs must be positive.")
             return data
@@ -30,8 +52,8 @@ class HeartMetricsCalculator:
         if low >= high or low <= 0 or high >= 1: 
             logger.warning(f"Bandpass filter: Invalid cutoffs {lowcut, highcut} for fs {fs}. Low: {low}, High: {high}")
             return data 
-        b, a = butter(order, [low, high], btype='band')
-        return filtfilt(b, a, data)
+        b, a = _bandpass_coefficients(lowcut, highcut, fs, order)
+        return filtfilt(b, a, data, axis=-1)
 
     @staticmethod
     def calculate_heart_rate(peaks, fs):
@@ -52,47 +74,80 @@ class HeartMetricsCalculator:
         return np.diff(peaks) / fs
 
     def estimate_heart_rate(self, roi_frames):
-        heart_rates_list = [] 
         if len(roi_frames) <= 2: 
             logger.warning(f"HeartMetricsCalculator: Insufficient roi_frames ({len(roi_frames)}), need > 2.")
             return 0, 0, 0, 0, 0
 
         intensity_over_time = [np.mean(frame) for frame in roi_frames if frame.size > 0] # Ensure frames are not empty
+        return self.estimate_from_signal(intensity_over_time)
+
+    def estimate_from_signal(self, intensity_over_time):
+        # intensity_over_time: 1-D per-frame forehead green means
         if len(intensity_over_time) <= 2: 
             logger.warning(f"HeartMetricsCalculator: Insufficient intensity_over_time ({len(intensity_over_time)}), need > 2 for detrend.")
             return 0,0,0,0,0
 
+        intensity_over_time = np.asarray(intensity_over_time, dtype=float)
         detrended_intensity = detrend(intensity_over_time)
-        
+        if _flat_rows(intensity_over_time, detrended_intensity):
+            logger.warning("HeartMetricsCalculator: Signal is flat after detrending. Metrics will be 0.")
+            return 0,0,0,0,0
         filtered_signal = self.bandpass_filter(detrended_intensity, 0.5, 3, self.fps)
+        return self._metrics_from_filtered(filtered_signal)
 
-        ma_window_size = max(1, int(self.fps / 3.0))
-        if len(filtered_signal) < ma_window_size: 
-            logger.warning(f"HeartMetricsCalculator: Filtered signal length ({len(filtered_signal)}) is less than MA window size ({ma_window_size}). Using original filtered signal for smoothing.")
-            smoothed_signal = filtered_signal
-        else:
-            smoothed_signal = self.moving_average(filtered_signal, ma_window_size)
+    def estimate_batch(self, signals):
+        # signals: 2-D array, one row per session, all sampled at self.fps. Detrend and
+        # bandpass run once over the whole array; returns one metrics tuple per row.
+        signals = np.asarray(signals, dtype=float)
+        if signals.ndim != 2:
+            raise ValueError(f"estimate_batch expects a 2-D array of signals, got shape {signals.shape}")
+        if signals.shape[1] <= 2:
+            logger.warning(f"HeartMetricsCalculator: Insufficient samples per signal ({signals.shape[1]}), need > 2 for detrend.")
+            return [(0, 0, 0, 0, 0)] * signals.shape[0]
+
+        detrended_signals = detrend(signals, axis=-1)
+        flat = _flat_rows(signals, detrended_signals)
+        filtered_signals = self.bandpass_filter(detrended_signals, 0.5, 3, self.fps)
+        return [(0, 0, 0, 0, 0) if is_flat else self._metrics_from_filtered(filtered_signal)
+                for filtered_signal, is_flat in zip(filtered_signals, flat)]
 
+    def _windowed_heart_rates(self, smoothed_signal):
         if len(smoothed_signal) < self.window_length:
             logger.warning(f"HeartMetricsCalculator: Smoothed signal length ({len(smoothed_signal)}) is less than window_length ({self.window_length}). HR might be 0.")
+            return []
 
-        for start in range(0, len(smoothed_signal) - self.window_length + 1, self.step_size):
-            segment = smoothed_signal[start:start+self.window_length] 
-            if len(segment) == 0: continue
-            
-            if np.max(segment) == np.min(segment) and np.max(segment) == 0 : continue 
-            if np.max(segment) == np.min(segment) and np.max(segment) != 0 : 
-                 peaks, _ = find_peaks(segment, distance=max(1, int(self.fps/3.0))) 
-            else:
-                 peaks, _ = find_peaks(segment, distance=max(1, int(self.fps/3.0)), height=np.max(segment)*0.6)
+        windows = sliding_window_view(smoothed_signal, self.window_length)[::self.step_size]
+        window_max = windows.max(axis=1)
+        window_min = windows.min(axis=1)
+        distance = max(1, int(self.fps/3.0))
 
+        heart_rates_list = []
+        for segment, seg_max, seg_min in zip(windows, window_max, window_min):
+            if seg_max == seg_min and seg_max == 0: continue
+            if seg_max == seg_min:
+                peaks, _ = find_peaks(segment, distance=distance)
+            else:
+                peaks, _ = find_peaks(segment, distance=distance, height=seg_max*0.6)
 
             if len(peaks) > 1:
                 heart_rate = self.calculate_heart_rate(peaks, self.fps)
                 if heart_rate > 0: 
                     heart_rates_list.append(heart_rate)
+        return heart_rates_list
+
+    def _average_heart_rate(self, filtered_signal):
+        ma_window_size = max(1, int(self.fps / 3.0))
+        if len(filtered_signal) < ma_window_size: 
+            logger.warning(f"HeartMetricsCalculator: Filtered signal length ({len(filtered_signal)}) is less than MA window size ({ma_window_size}). Using original filtered signal for smoothing.")
+            smoothed_signal = filtered_signal
+        else:
+            smoothed_signal = self.moving_average(filtered_signal, ma_window_size)
+
+        heart_rates_list = self._windowed_heart_rates(smoothed_signal)
+        return sum(heart_rates_list) / len(heart_rates_list) if heart_rates_list else 0
 
-        avg_heart_rate = sum(heart_rates_list) / len(heart_rates_list) if heart_rates_list else 0
+    def _metrics_from_filtered(self, filtered_signal):
+        avg_heart_rate = self._average_heart_rate(filtered_signal)
         
         all_peaks_height = np.max(filtered_signal) * 0.6 if np.max(filtered_signal) > 0 else 0
         all_peaks, _ = find_peaks(filtered_signal, distance=max(1, int(self.fps/3.0)), height=all_peaks_height)
@@ -133,3 +188,120 @@ class HeartMetricsCalculator:
                 lf_hf_ratio = (lf_power / hf_power) if hf_power > 0 else 0
 
         return avg_heart_rate, sdnn, rmssd, bsi, lf_hf_ratio
+
+
+class SpectralHeartMetricsCalculator(HeartMetricsCalculator):
+    # Average HR from the Welch PSD peak inside the pulse band, refined to sub-bin resolution
+    # with parabolic interpolation. HRV metrics still come from time-domain peaks.
+
+    def __init__(self, fps=30, segment_seconds=8, band=(0.7, 3.0), zero_pad=2, **kwargs):
+        super().__init__(fps=fps, **kwargs)
+        self.segment_length = max(8, int(segment_seconds * self.fps))
+        self.band = band
+        self.zero_pad = max(1, zero_pad)
+
+    def _average_heart_rate(self, filtered_signal):
+        nperseg = min(len(filtered_signal), self.segment_length)
+        if nperseg < 8:
+            logger.warning(f"SpectralHeartMetricsCalculator: Signal length ({len(filtered_signal)}) too short for Welch PSD. HR will be 0.")
+            return 0
+
+        freqs, psd = welch(filtered_signal, fs=self.fps, nperseg=nperseg, noverlap=nperseg // 2,
+                           nfft=nperseg * self.zero_pad, detrend=False)
+        in_band = np.flatnonzero((freqs >= self.band[0]) & (freqs <= self.band[1]))
+        if len(in_band) == 0 or not np.any(psd[in_band] > 0):
+            return 0
+
+        k = in_band[np.argmax(psd[in_band])]
+        peak_freq = freqs[k]
+        if 0 < k < len(psd) - 1:
+            left, centre, right = psd[k - 1], psd[k], psd[k + 1]
+            denominator = left - 2 * centre + right
+            if denominator != 0:
+                peak_freq += 0.5 * (left - right) / denominator * (freqs[1] - freqs[0])
+        return peak_freq * 60
+
+
+def chrom_pulse(rgb_means, fps):
+    # de Haan & Jeanne (2013): chrominance signals from normalised RGB, combined with a
+    # std-ratio weight so specular/motion components cancel.
+    normalised = rgb_means / np.mean(rgb_means, axis=0)
+    x = 3 * normalised[:, 0] - 2 * normalised[:, 1]
+    y = 1.5 * normalised[:, 0] + normalised[:, 1] - 1.5 * normalised[:, 2]
+    x_filtered = HeartMetricsCalculator.bandpass_filter(x, 0.5, 3, fps)
+    y_filtered = HeartMetricsCalculator.bandpass_filter(y, 0.5, 3, fps)
+    y_std = np.std(y_filtered)
+    alpha = np.std(x_filtered) / y_std if y_std > 0 else 0
+    return x_filtered - alpha * y_filtered
+
+
+def pos_pulse(rgb_means, fps, window_seconds=1.6):
+    # Wang et al. (2017) plane-orthogonal-to-skin, overlap-added over ~1.6 s windows.
+    n = len(rgb_means)
+    window = min(n, max(2, int(window_seconds * fps)))
+    windows = sliding_window_view(rgb_means, window, axis=0)  # (n - window + 1, 3, window)
+    normalised = windows / windows.mean(axis=2, keepdims=True)
+    s1 = normalised[:, 1] - normalised[:, 2]
+    s2 = normalised[:, 1] + normalised[:, 2] - 2 * normalised[:, 0]
+    s2_std = s2.std(axis=1, keepdims=True)
+    alpha = np.divide(s1.std(axis=1, keepdims=True), s2_std, out=np.zeros_like(s2_std), where=s2_std > 0)
+    h = s1 + alpha * s2
+    h -= h.mean(axis=1, keepdims=True)
+
+    # Overlap-add: loop over the short window axis rather than the long time axis
+    pulse = np.zeros(n)
+    for offset in range(window):
+        pulse[offset:offset + len(h)] += h[:, offset]
+    return pulse
+
+
+ESTIMATORS = {
+    "peaks": HeartMetricsCalculator,
+    "welch": SpectralHeartMetricsCalculator,
+}
+RPPG_METHODS = ("green", "chrom", "pos")
+
+
+def make_calculator(estimator="peaks", fps=30):
+    if estimator not in ESTIMATORS:
+        raise ValueError(f"Unknown HR estimator '{estimator}'. Choose one of: {', '.join(ESTIMATORS)}")
+    return ESTIMATORS[estimator](fps=fps)
+
+
+def pulse_signal(rgb_means, method="green", fps=30):
+    # rgb_means: (n, 3) per-frame forehead channel means -> 1-D pulse signal
+    rgb_means = np.asarray(rgb_means, dtype=float).reshape(-1, 3)
+    if method == "green":
+        return rgb_means[:, 1]
+    if len(rgb_means) <= 2:
+        return rgb_means[:, 1]
+    if method == "chrom":
+        return chrom_pulse(rgb_means, fps)
+    if method == "pos":
+        return pos_pulse(rgb_means, fps)
+    raise ValueError(f"Unknown rPPG method '{method}'. Choose one of: {', '.join(RPPG_METHODS)}")
+
+
+class StreamingHeartMetrics:
+    # Online wrapper: keeps the last `window_seconds` of per-frame forehead RGB means in a
+    # ring buffer and re-estimates over that window every `emit_every` samples, so memory and
+    # per-update cost stay constant however long the session runs.
+
+    def __init__(self, fps=30, window_seconds=30, min_seconds=5, emit_every=None, estimator="peaks", rppg="green"):
+        if rppg not in RPPG_METHODS:
+            raise ValueError(f"Unknown rPPG method '{rppg}'. Choose one of: {', '.join(RPPG_METHODS)}")
+        self.calculator = make_calculator(estimator, fps)
+        self.rppg = rppg
+        self.fps = self.calculator.fps
+        self.buffer = deque(maxlen=max(3, int(window_seconds * self.fps)))
+        # filtfilt needs more samples than its edge padding (3 * number of order-5 bandpass taps)
+        self.min_samples = max(3 * 11 + 1, int(min_seconds * self.fps))
+        self.emit_every = max(1, emit_every or self.calculator.step_size)
+        self.samples_seen = 0
+
+    def push(self, rgb_mean):
+        self.buffer.append(rgb_mean)
+        self.samples_seen += 1
+        if len(self.buffer) < self.min_samples or self.samples_seen % self.emit_every:
+            return None
+        return self.calculator.estimate_from_signal(pulse_signal(np.array(self.buffer), self.rppg, self.fps))
@@ -0,0 +1,222 @@
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from pymongo.errors import PyMongoError
+
+from app.core.config import LECTURE_CACHE_TTL, LECTURE_CACHE_STALE_TTL, LECTURE_CACHE_MAX_ENTRIES
+from app.db.repositories import lecture_topic_cache
+from app.services.cache import TTLCache, SingleFlight, StreamFlight
+from app.utils.helpers import normalize_topic
+
+logger = logging.getLogger(__name__)
+
+
+class TopicResultCache:
+    # Two tiers for /api/generate-lecture results, keyed by normalised topic:
+    #   1. in-process LRU (per worker, no I/O)
+    #   2. Mongo collection shared by all workers, expired by a TTL index on `expires_at`
+    #      (declared in app.db.migrations)
+    # Fresh entries are served directly. Stale ones (older than `ttl`, younger than
+    # `ttl + stale_ttl`) are served immediately while one background fetch refreshes them.
+    # Concurrent misses for the same topic share a single upstream fetch, whether they come
+    # through get() or stream(). `collection` returns the Mongo collection when called.
+
+    def __init__(self, collection=lecture_topic_cache, ttl=LECTURE_CACHE_TTL,
+                 stale_ttl=LECTURE_CACHE_STALE_TTL, max_entries=LECTURE_CACHE_MAX_ENTRIES):
+        self.collection = collection
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.memory = TTLCache(maxsize=max_entries, ttl=ttl, stale_ttl=stale_ttl)
+        self.flights = SingleFlight()
+        self.streams = {}  # key -> {limit: StreamFlight} for streaming fetches in progress
+        self.counters = {
+            "memory_hits": 0,
+            "mongo_hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "refreshes": 0,
+            "quota_units_spent": 0,
+            "quota_units_saved": 0,  # estimated from what the cached result cost to fetch
+        }
+
+    async def _load(self, key):
+        try:
+            doc = await self.collection().find_one({"_id": key})
+        except PyMongoError as e:
+            logger.warning(f"Lecture cache read failed for '{key}': {str(e)}")
+            return None
+        if not doc:
+            return None
+        fetched_at = doc["fetched_at"]
+        if fetched_at.tzinfo is None:  # pymongo returns naive UTC datetimes by default
+            fetched_at = fetched_at.replace(tzinfo=timezone.utc)
+        entry = {"videos": doc.get("videos", []), "quota_cost": doc.get("quota_cost", 0)}
+        return entry, fetched_at.timestamp()
+
+    async def _store(self, key, topic, entry, stored_at):
+        fetched_at = datetime.fromtimestamp(stored_at, tz=timezone.utc)
+        doc = {
+            "topic": topic,
+            "videos": entry["videos"],
+            "quota_cost": entry["quota_cost"],
+            "fetched_at": fetched_at,
+            "expires_at": fetched_at + timedelta(seconds=self.ttl + self.stale_ttl),
+        }
+        try:
+            await self.collection().replace_one({"_id": key}, doc, upsert=True)
+        except PyMongoError as e:
+            logger.warning(f"Lecture cache write failed for '{key}': {str(e)}")
+
+    async def _put(self, key, topic, videos, quota_cost):
+        if videos:  # empty results are not cached so a later search can still find something
+            entry = {"videos": videos, "quota_cost": quota_cost}
+            stored_at = time.time()
+            self.memory.set(key, entry, stored_at)
+            await self._store(key, topic, entry, stored_at)
+
+    async def _fetch(self, key, topic, fetch):
+        usage = {}
+        try:
+            videos = await fetch(topic, usage)
+        finally:
+            self.counters["quota_units_spent"] += usage.get("quota_units", 0)
+        await self._put(key, topic, videos, usage.get("quota_units", 0))
+        return videos
+
+    def _refresh(self, key, topic, fetch):
+        self.counters["refreshes"] += 1
+        self.flights.spawn(key, lambda: self._fetch(key, topic, fetch))
+
+    async def lookup(self, topic, fetch):
+        # Cached videos for the topic or None on a miss; stale hits schedule a refresh via `fetch`
+        key = normalize_topic(topic)
+        state, entry, _ = self.memory.get(key)
+        source = "memory"
+        if state == "miss":
+            loaded = await self._load(key)
+            if loaded:
+                self.memory.set(key, loaded[0], loaded[1])
+                state, entry, _ = self.memory.get(key)
+                source = "mongo"
+        if state == "miss":
+            return None
+
+        self.counters[f"{source}_hits"] += 1
+        self.counters["quota_units_saved"] += entry["quota_cost"]
+        if state == "stale":
+            self.counters["stale_hits"] += 1
+            if not self.flights.in_flight(key):
+                self._refresh(key, topic, fetch)
+        return entry["videos"]
+
+    def _stream_flight(self, key, limit=None):
+        # An in-progress stream that covers `limit` videos (limit None: only complete ones)
+        for flight_limit, flight in self.streams.get(key, {}).items():
+            if flight.complete or (limit is not None and flight_limit >= limit):
+                return flight
+        return None
+
+    async def _stream_fetch(self, key, topic, limit, fetch_stream, complete):
+        usage = {}
+        collected = []
+        try:
+            async for batch in fetch_stream(topic, limit, usage):
+                collected.extend(batch)
+                yield batch
+        finally:
+            self.counters["quota_units_spent"] += usage.get("quota_units", 0)
+        # A result cut short by `limit` is not a complete cache entry
+        if complete or len(collected) < limit:
+            await self._put(key, topic, collected, usage.get("quota_units", 0))
+
+    def _start_stream(self, key, topic, limit, fetch_stream, complete):
+        flight = StreamFlight(self._stream_fetch(key, topic, limit, fetch_stream, complete))
+        flight.complete = complete
+        self.streams.setdefault(key, {})[limit] = flight
+
+        def _done(_):
+            flights = self.streams.get(key, {})
+            if flights.get(limit) is flight:
+                del flights[limit]
+            if not flights:
+                self.streams.pop(key, None)
+
+        flight.task.add_done_callback(_done)
+        return flight
+
+    async def _truncated(self, batches, limit):
+        emitted = 0
+        async for batch in batches:
+            batch = batch[:limit - emitted]
+            emitted += len(batch)
+            if batch:
+                yield batch
+            if emitted >= limit:
+                break
+
+    async def _joined_fetch(self, key, limit):
+        videos = await self.flights.wait(key)
+        if videos[:limit]:
+            yield videos[:limit]
+
+    def stream(self, topic, limit, fetch_stream, full_limit):
+        # Streaming counterpart of get(), for after lookup() missed. Returns (source, batches)
+        # where batches is an async generator of video lists and source is "youtube" for the
+        # request that starts the fetch or "coalesced" for one that joins a fetch in progress.
+        # `fetch_stream(topic, limit, usage)` yields batches; a stream for `full_limit` or more
+        # is a complete result that get() callers can join too.
+        key = normalize_topic(topic)
+        flight = self._stream_flight(key, limit)
+        if flight is not None:
+            self.counters["coalesced"] += 1
+            return "coalesced", self._truncated(flight.read(), limit)
+        if self.flights.in_flight(key):
+            self.counters["coalesced"] += 1
+            return "coalesced", self._joined_fetch(key, limit)
+        self.counters["misses"] += 1
+        flight = self._start_stream(key, topic, limit, fetch_stream, limit >= full_limit)
+        return "youtube", flight.read()
+
+    async def get(self, topic, fetch):
+        # `fetch(topic, usage)` is awaited on a miss and must return the list of videos
+        videos = await self.lookup(topic, fetch)
+        if videos is not None:
+            return videos
+
+        key = normalize_topic(topic)
+        flight = self._stream_flight(key)
+        if flight is not None:
+            self.counters["coalesced"] += 1
+            videos = []
+            async for batch in flight.read():
+                videos.extend(batch)
+            return videos
+        if self.flights.in_flight(key):
+            self.counters["coalesced"] += 1
+        else:
+            self.counters["misses"] += 1
+        return await self.flights.do(key, lambda: self._fetch(key, topic, fetch))
+
+    async def recent_topics(self, limit):
+        # Topics most recently fetched by any worker, for warming dependent caches
+        try:
+            cursor = self.collection().find({}, {"topic": 1}).sort("fetched_at", -1).limit(limit)
+            return [doc["topic"] for doc in await cursor.to_list(length=limit)]
+        except PyMongoError as e:
+            logger.warning(f"Could not read recent lecture topics: {str(e)}")
+            return []
+
+    def stats(self):
+        hits = self.counters["memory_hits"] + self.counters["mongo_hits"]
+        lookups = hits + self.counters["misses"] + self.counters["coalesced"]
+        return {
+            **self.counters,
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "ttl_seconds": self.ttl,
+            "stale_ttl_seconds": self.stale_ttl,
+        }
+
+
+topic_cache = TopicResultCache()
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from app.core.config import FACE_DETECTOR_BACKEND
+from app.services.face_localizer import get_face_localizer
+from app.services.frame_pipeline import frame_pipeline
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    # Loads and warms the configured models once per process and reports readiness.
+    #
+    # Pre-fork sharing: with PRELOAD_BEFORE_FORK=true, main.py calls load() at import time, so
+    #   gunicorn --preload -w 4 -k uvicorn.workers.UvicornWorker main:app
+    # loads the weights once in the master and the workers share them copy-on-write.
+    # The same applies to the stress frame pool with STRESS_POOL_START_METHOD=fork; with the
+    # default spawn each pool worker loads its own copy. TensorFlow-backed detectors (DeepFace)
+    # are not always fork-safe; prefer yunet/haar when forking.
+    #
+    # status() only claims pre-fork sharing when this process really was forked after load():
+    # an at-fork hook records it, which covers gunicorn's os.fork() and multiprocessing's fork.
+
+    def __init__(self):
+        self.ready = False
+        self.error = None
+        self.models = {}
+        self.loaded_pid = None
+        self.forked_after_load = False
+        self._lock = threading.Lock()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self.forked_after_load = bool(self.models)
+
+    def load(self):
+        # Synchronous model load + warm-up in this process; safe to call more than once.
+        with self._lock:
+            if self.models:
+                return
+            start = time.perf_counter()
+            localizer = get_face_localizer(FACE_DETECTOR_BACKEND)
+            localizer.warm_up()
+            elapsed = time.perf_counter() - start
+            self.models["face_localizer"] = {"backend": localizer.name, "load_seconds": round(elapsed, 2)}
+            self.loaded_pid = os.getpid()
+            logger.info(f"Models loaded in {elapsed:.2f}s: {self.models}")
+
+    async def warm_up(self):
+        # Called from the app lifespan: models in this process, then the frame pool workers.
+        try:
+            await asyncio.to_thread(self.load)
+            start = time.perf_counter()
+            await frame_pipeline.warm_up()
+            if frame_pipeline.pool_size:
+                self.models["frame_pool"] = {"workers": frame_pipeline.pool_size, "load_seconds": round(time.perf_counter() - start, 2)}
+            self.error = None
+            self.ready = True
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Model warm-up failed: {str(e)}", exc_info=True)
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "models": self.models,
+            "error": self.error,
+            "pid": os.getpid(),
+            "loaded_pid": self.loaded_pid,
+            "preloaded_before_fork": self.ready and self.forked_after_load,
+            "frame_pool": {
+                "workers": frame_pipeline.pool_size,
+                "start_method": frame_pipeline.start_method,
+                # Only forked pool workers inherit this process's loaded models
+                "shares_models": frame_pipeline.pool_size > 0 and frame_pipeline.start_method == "fork",
+            },
+        }
+
+
+model_registry = ModelRegistry()
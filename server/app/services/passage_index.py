@@ -0,0 +1,124 @@
+import asyncio
+import math
+import re
+from collections import Counter, defaultdict
+
+from app.core.config import (
+    PASSAGE_CHUNK_CHARS,
+    PASSAGE_INDEX_MAX_ENTRIES,
+    TRANSCRIPT_CACHE_TTL,
+    QA_CONTEXT_TOKEN_BUDGET,
+    QA_TOP_K_PASSAGES,
+)
+from app.services.cache import TTLCache
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a an and are as at be but by can could did do does for from had has have how i if in into is it its
+just like me my of on or so such than that the their them then there these they this to was we were
+what when where which who why will with would you your um uh yeah okay gonna going know right
+""".split())
+CHARS_PER_TOKEN = 4  # rough estimate for English prose; good enough for a prompt budget
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS and len(token) > 1]
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def chunk_segments(segments, target_chars=PASSAGE_CHUNK_CHARS):
+    # Groups consecutive transcript segments into passages of about `target_chars`, keeping
+    # the start of the first segment and the end of the last one for seeking.
+    passages = []
+    texts, start, end, size = [], None, 0.0, 0
+    for segment in segments:
+        text = segment["text"].replace("\n", " ").strip()
+        if not text:
+            continue
+        if start is None:
+            start = segment["start"]
+        texts.append(text)
+        end = segment["start"] + segment.get("duration", 0)
+        size += len(text) + 1
+        if size >= target_chars:
+            passages.append({"start": start, "end": end, "text": " ".join(texts)})
+            texts, start, size = [], None, 0
+    if texts:
+        passages.append({"start": start, "end": end, "text": " ".join(texts)})
+    return passages
+
+
+class BM25Index:
+    # Okapi BM25 over a video's passages with an inverted index, so scoring a question only
+    # touches passages that share a term with it.
+
+    def __init__(self, passages, k1=1.5, b=0.75):
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)  # term -> [(passage index, term frequency)]
+        self.lengths = []
+        for i, passage in enumerate(passages):
+            terms = tokenize(passage["text"])
+            self.lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                self.postings[term].append((i, tf))
+        n = len(passages)
+        self.avg_length = (sum(self.lengths) / n) if n else 0.0
+        self.idf = {term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for term, p in self.postings.items()}
+
+    def search(self, query, k=None):
+        # [(score, passage index)] best first; passages without a query term are not returned
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for i, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / self.avg_length)
+                scores[i] += idf * tf * (self.k1 + 1) / (tf + norm)
+        ranked = sorted(((score, i) for i, score in scores.items()), reverse=True)
+        return ranked[:k] if k else ranked
+
+
+def select_passages(index, query, token_budget=QA_CONTEXT_TOKEN_BUDGET, top_k=QA_TOP_K_PASSAGES):
+    # Highest-scoring passages that fit the budget, returned in playback order. With no term
+    # overlap at all, falls back to the opening passages, as the old truncation did.
+    candidates = [i for _, i in index.search(query, top_k)] or list(range(len(index.passages)))
+    chosen, used = [], 0
+    for i in candidates:
+        cost = estimate_tokens(index.passages[i]["text"])
+        if used + cost > token_budget:
+            if chosen:
+                continue
+            cost = token_budget  # a single oversized passage is trimmed below rather than dropped
+        chosen.append(i)
+        used += cost
+        if used >= token_budget or len(chosen) >= top_k:
+            break
+    selected = []
+    for i in sorted(chosen):
+        passage = dict(index.passages[i])
+        passage["text"] = passage["text"][:token_budget * CHARS_PER_TOKEN]
+        selected.append(passage)
+    return selected
+
+
+class PassageIndexCache:
+    # Built once per video (off the event loop) and kept in an LRU next to the transcript store.
+
+    def __init__(self, max_entries=PASSAGE_INDEX_MAX_ENTRIES, ttl=TRANSCRIPT_CACHE_TTL):
+        self.memory = TTLCache(maxsize=max_entries, ttl=ttl)
+
+    async def get(self, video_id, segments):
+        state, index, _ = self.memory.get(video_id)
+        if state == "miss":
+            index = await asyncio.to_thread(lambda: BM25Index(chunk_segments(segments)))
+            self.memory.set(video_id, index)
+        return index
+
+
+passage_indexes = PassageIndexCache()
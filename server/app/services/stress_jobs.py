@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import math
+import time
+import uuid
+from collections import deque, OrderedDict
+
+import numpy as np
+
+from app.core.config import (
+    STRESS_JOB_WORKERS,
+    STRESS_JOB_MAX_QUEUE,
+    STRESS_JOB_MAX_PER_USER,
+    STRESS_JOB_RESULT_TTL,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class StressJob:
+
+    def __init__(self, user_id, work):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.work = work  # zero-arg callable returning an awaitable result
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+        self.done = asyncio.Event()
+
+    def to_dict(self):
+        data = {"job_id": self.id, "status": self.status}
+        if self.status == "done":
+            data["result"] = self.result
+        elif self.status == "failed":
+            data["error"] = self.error
+        if self.started_at is not None:
+            data["queue_wait_ms"] = round((self.started_at - self.submitted_at) * 1000, 1)
+        if self.finished_at is not None:
+            data["run_time_ms"] = round((self.finished_at - self.started_at) * 1000, 1)
+        return data
+
+
+class StressJobQueue:
+    # Bounded worker pool with per-user round-robin: each user has their own FIFO and workers
+    # take the next job from the next user in turn, so one user's burst cannot starve others.
+
+    def __init__(self, workers=STRESS_JOB_WORKERS, max_queue=STRESS_JOB_MAX_QUEUE,
+                 max_per_user=STRESS_JOB_MAX_PER_USER, result_ttl=STRESS_JOB_RESULT_TTL):
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.max_per_user = max(1, max_per_user)
+        self.result_ttl = result_ttl
+
+        self._user_queues = OrderedDict()  # user_id -> deque of queued jobs, in round-robin order
+        self._active_per_user = {}
+        self._jobs = {}
+        self._queued = 0
+        self._running = 0
+        self._available = asyncio.Condition()
+        self._tasks = []
+
+        self._queue_waits = deque(maxlen=500)
+        self._run_times = deque(maxlen=500)
+        self._counters = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0}
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+        logger.info(f"Stress job queue started with {self.workers} workers, max queue {self.max_queue}.")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _retry_after(self):
+        run_time = np.mean(self._run_times) if self._run_times else 5.0
+        return max(1, math.ceil(run_time * (self._queued + self._running) / self.workers))
+
+    async def submit(self, user_id, work):
+        self._evict_expired()
+        active = self._active_per_user.get(user_id, 0)
+        if active >= self.max_per_user:
+            self._counters["rejected"] += 1
+            raise QueueFullError(f"Too many stress analyses in progress for this user ({active}).", self._retry_after())
+        if self._queued >= self.max_queue:
+            self._counters["rejected"] += 1
+            raise QueueFullError("Stress analysis queue is full.", self._retry_after())
+
+        job = StressJob(user_id, work)
+        self._jobs[job.id] = job
+        self._user_queues.setdefault(user_id, deque()).append(job)
+        self._active_per_user[user_id] = active + 1
+        self._queued += 1
+        self._counters["submitted"] += 1
+        async with self._available:
+            self._available.notify()
+        return job
+
+    def get(self, job_id):
+        self._evict_expired()
+        return self._jobs.get(job_id)
+
+    def queue_position(self, job):
+        if job.status != "queued":
+            return 0
+        user_queue = self._user_queues.get(job.user_id, ())
+        turns = next((n for n, queued in enumerate(user_queue) if queued is job), 0)
+        # Round-robin: by the time our job runs, users ahead of ours in the rotation have had
+        # turns + 1 jobs taken and users behind it turns jobs (as far as each has work queued)
+        position, ahead = 0, True
+        for user_id, queued in self._user_queues.items():
+            if user_id == job.user_id:
+                ahead = False
+                position += turns + 1
+            else:
+                position += min(len(queued), turns + 1 if ahead else turns)
+        return position
+
+    def _next_job(self):
+        user_id, user_queue = next(iter(self._user_queues.items()))
+        job = user_queue.popleft()
+        del self._user_queues[user_id]
+        if user_queue:
+            self._user_queues[user_id] = user_queue  # back of the rotation
+        self._queued -= 1
+        return job
+
+    async def _worker(self, n):
+        while True:
+            async with self._available:
+                await self._available.wait_for(lambda: self._queued > 0)
+                job = self._next_job()
+            await self._run(job)
+
+    async def _run(self, job):
+        job.status = "running"
+        job.started_at = time.monotonic()
+        self._running += 1
+        self._queue_waits.append(job.started_at - job.submitted_at)
+        try:
+            job.result = await job.work()
+            job.status = "done"
+            self._counters["completed"] += 1
+        except asyncio.CancelledError:
+            job.status = "failed"
+            job.error = "Server shutting down."
+            raise
+        except Exception as e:
+            logger.error(f"Stress job {job.id} failed: {str(e)}", exc_info=True)
+            job.status = "failed"
+            job.error = "Failed to process stress analysis due to an unexpected internal server error."
+            self._counters["failed"] += 1
+        finally:
+            job.finished_at = time.monotonic()
+            job.work = None  # drop frame payload as soon as the job is finished
+            self._running -= 1
+            self._run_times.append(job.finished_at - job.started_at)
+            remaining = self._active_per_user.get(job.user_id, 1) - 1
+            if remaining > 0:
+                self._active_per_user[job.user_id] = remaining
+            else:
+                self._active_per_user.pop(job.user_id, None)
+            job.done.set()
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and now - job.finished_at > self.result_ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def metrics(self):
+        def stats(samples):
+            if not samples:
+                return {"p50_ms": 0, "p95_ms": 0, "max_ms": 0}
+            values = np.array(samples) * 1000
+            return {
+                "p50_ms": round(float(np.percentile(values, 50)), 1),
+                "p95_ms": round(float(np.percentile(values, 95)), 1),
+                "max_ms": round(float(values.max()), 1),
+            }
+
+        return {
+            "workers": self.workers,
+            "queued": self._queued,
+            "running": self._running,
+            "users_waiting": len(self._user_queues),
+            "max_queue": self.max_queue,
+            **self._counters,
+            "queue_wait": stats(self._queue_waits),
+            "run_time": stats(self._run_times),
+        }
+
+
+stress_job_queue = StressJobQueue()
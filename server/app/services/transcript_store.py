@@ -0,0 +1,179 @@
+import asyncio
+import hashlib
+import json
+import logging
+import zlib
+from datetime import datetime, timedelta, timezone
+from bson.binary import Binary
+from pymongo.errors import PyMongoError
+from youtube_transcript_api import YouTubeTranscriptApi, CouldNotRetrieveTranscript, TooManyRequests, YouTubeRequestFailed
+
+from app.core.config import (
+    TRANSCRIPT_CACHE_MAX_ENTRIES,
+    TRANSCRIPT_CACHE_TTL,
+    TRANSCRIPT_NEGATIVE_TTL,
+    TRANSCRIPT_PREFETCH_MAX_VIDEOS,
+    TRANSCRIPT_PREFETCH_CONCURRENCY,
+)
+from app.db.repositories import transcripts
+from app.services.cache import TTLCache, SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Rate limiting / request failures say nothing about the video, so they are not cached
+TRANSIENT_ERRORS = (TooManyRequests, YouTubeRequestFailed)
+
+
+class TranscriptUnavailable(Exception):
+    def __init__(self, video_id, reason):
+        super().__init__(f"Transcript not available for video {video_id}: {reason}")
+        self.video_id = video_id
+        self.reason = reason
+
+
+def compress_segments(segments):
+    # [{"text", "start", "duration"}] -> zlib'd JSON rows; transcripts shrink roughly 4-6x
+    rows = [[round(s["start"], 2), round(s.get("duration", 0), 2), s["text"]] for s in segments]
+    return zlib.compress(json.dumps(rows, separators=(",", ":")).encode(), 6)
+
+
+def decompress_segments(blob):
+    return [{"start": start, "duration": duration, "text": text} for start, duration, text in json.loads(zlib.decompress(blob))]
+
+
+def segments_version(blob):
+    # Content hash of the compressed segments; answers record it so they can be invalidated
+    return hashlib.sha1(blob).hexdigest()[:12]
+
+
+def transcript_text(segments):
+    return " ".join(s["text"] for s in segments)
+
+
+class TranscriptStore:
+    # Transcripts keyed by videoId: decoded segments in an in-process LRU, compressed copies in
+    # Mongo shared by all workers (expired by a TTL index). Videos without a transcript are
+    # cached too, for a shorter time, so repeated questions do not re-request them.
+
+    def __init__(self, collection=transcripts, max_entries=TRANSCRIPT_CACHE_MAX_ENTRIES,
+                 ttl=TRANSCRIPT_CACHE_TTL, negative_ttl=TRANSCRIPT_NEGATIVE_TTL):
+        self.collection = collection
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.memory = TTLCache(maxsize=max_entries, ttl=ttl)
+        self.flights = SingleFlight()
+        self.counters = {"memory_hits": 0, "mongo_hits": 0, "negative_hits": 0, "fetches": 0, "prefetched": 0}
+        self._prefetch_tasks = set()
+        self._prefetch_semaphore = None
+
+    def _remember(self, video_id, value, ttl):
+        self.memory.set(video_id, value, ttl=ttl)
+
+    async def _load(self, video_id):
+        try:
+            doc = await self.collection().find_one({"_id": video_id})
+        except PyMongoError as e:
+            logger.warning(f"Transcript store read failed for {video_id}: {str(e)}")
+            return None
+        if not doc:
+            return None
+        expires_at = doc["expires_at"]
+        if expires_at.tzinfo is None:  # pymongo returns naive UTC datetimes by default
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        remaining = (expires_at - datetime.now(timezone.utc)).total_seconds()
+        if remaining <= 0:  # the TTL monitor only runs once a minute
+            return None
+        if doc.get("available", True):
+            blob = bytes(doc["segments"])
+            value = {"segments": decompress_segments(blob), "version": doc.get("version") or segments_version(blob)}
+        else:
+            value = {"unavailable": doc.get("reason", "unknown")}
+        self._remember(video_id, value, remaining)
+        return value
+
+    async def _save(self, video_id, value, ttl, blob=None):
+        now = datetime.now(timezone.utc)
+        doc = {"fetched_at": now, "expires_at": now + timedelta(seconds=ttl)}
+        if "unavailable" in value:
+            doc.update(available=False, reason=value["unavailable"])
+        else:
+            blob = blob or compress_segments(value["segments"])
+            doc.update(available=True, segments=Binary(blob), version=value["version"])
+        try:
+            await self.collection().replace_one({"_id": video_id}, doc, upsert=True)
+        except PyMongoError as e:
+            logger.warning(f"Transcript store write failed for {video_id}: {str(e)}")
+
+    async def _fetch(self, video_id):
+        self.counters["fetches"] += 1
+        try:
+            segments = await asyncio.to_thread(YouTubeTranscriptApi.get_transcript, video_id)
+            blob = await asyncio.to_thread(compress_segments, segments)
+            value, ttl = {"segments": segments, "version": segments_version(blob)}, self.ttl
+        except TRANSIENT_ERRORS:
+            raise
+        except CouldNotRetrieveTranscript as e:
+            blob = None
+            value, ttl = {"unavailable": type(e).__name__}, self.negative_ttl
+        self._remember(video_id, value, ttl)
+        await self._save(video_id, value, ttl, blob)
+        return value
+
+    async def get(self, video_id):
+        # Transcript segments for the video; raises TranscriptUnavailable if it has none
+        state, value, _ = self.memory.get(video_id)
+        cached = state != "miss"
+        if cached:
+            self.counters["memory_hits"] += 1
+        else:
+            value = await self._load(video_id)
+            cached = value is not None
+            if cached:
+                self.counters["mongo_hits"] += 1
+            else:
+                value = await self.flights.do(video_id, lambda: self._fetch(video_id))
+        if "unavailable" in value:
+            if cached:
+                self.counters["negative_hits"] += 1
+            # A fresh exception per call: a cached instance would pile up tracebacks (and the
+            # frames they reference) for as long as the negative entry lives
+            raise TranscriptUnavailable(video_id, value["unavailable"])
+        return value["segments"]
+
+    def version(self, video_id):
+        # Version of the transcript currently held in memory, or None if not loaded here
+        state, value, _ = self.memory.get(video_id)
+        if state == "miss" or "unavailable" in value:
+            return None
+        return value["version"]
+
+    async def _prefetch_one(self, video_id):
+        async with self._prefetch_semaphore:
+            if self.memory.get(video_id)[0] != "miss":
+                return
+            try:
+                await self.get(video_id)
+                self.counters["prefetched"] += 1
+            except TranscriptUnavailable:
+                pass
+            except Exception as e:
+                logger.info(f"Transcript prefetch for {video_id} failed: {str(e)}")
+
+    def prefetch(self, video_ids, limit=TRANSCRIPT_PREFETCH_MAX_VIDEOS):
+        # Fire-and-forget warm-up, e.g. for every video of a lecture just generated
+        if self._prefetch_semaphore is None:
+            self._prefetch_semaphore = asyncio.Semaphore(TRANSCRIPT_PREFETCH_CONCURRENCY)
+        for video_id in video_ids[:limit]:
+            task = asyncio.create_task(self._prefetch_one(video_id))
+            self._prefetch_tasks.add(task)
+            task.add_done_callback(self._prefetch_tasks.discard)
+
+    def cancel_prefetch(self):
+        for task in list(self._prefetch_tasks):
+            task.cancel()
+
+    def stats(self):
+        return {**self.counters, "memory_entries": len(self.memory), "prefetch_pending": len(self._prefetch_tasks)}
+
+
+transcript_store = TranscriptStore()
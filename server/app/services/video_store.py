@@ -0,0 +1,111 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from pymongo import ReplaceOne
+from pymongo.errors import PyMongoError
+
+from app.core.config import VIDEO_METADATA_TTL
+from app.db.repositories import video_metadata
+from app.services.youtube_client import youtube_client
+from app.utils.helpers import parse_duration, MIN_LECTURE_DURATION_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+def _pick_thumbnail(snippet):
+    thumbnails = snippet.get("thumbnails", {})
+    return (thumbnails.get("high", {}).get("url") or
+            thumbnails.get("medium", {}).get("url") or
+            thumbnails.get("default", {}).get("url"))
+
+
+def metadata_from_item(item, fetched_at):
+    # Reduces a videos.list item to what lecture generation needs; duration is parsed once here
+    snippet = item.get("snippet", {})
+    iso_duration = item.get("contentDetails", {}).get("duration")
+    duration_seconds = parse_duration(iso_duration)[1] if iso_duration else None
+    return {
+        "_id": item["id"],
+        "title": snippet.get("title", "Untitled Video"),
+        "description": snippet.get("description", ""),
+        "channel": snippet.get("channelTitle", "Unknown Channel"),
+        "thumbnail": _pick_thumbnail(snippet),
+        "duration_seconds": duration_seconds,
+        "fetched_at": fetched_at,
+    }
+
+
+def _is_lecture(doc):
+    return not doc.get("unavailable") and (doc.get("duration_seconds") or 0) >= MIN_LECTURE_DURATION_SECONDS and bool(doc.get("thumbnail"))
+
+
+class VideoMetadataStore:
+    # Persistent per-video details keyed by videoId. Topics overlap heavily, so only ids that
+    # are missing or older than `ttl` are sent to the videos endpoint. Ids YouTube no longer
+    # returns (private/deleted) are stored as unavailable so they are not re-requested either.
+
+    def __init__(self, collection=video_metadata, client=youtube_client, ttl=VIDEO_METADATA_TTL):
+        self.collection = collection
+        self.client = client
+        self.ttl = ttl
+        self.counters = {"store_hits": 0, "api_lookups": 0}
+
+    async def _fresh_ids(self, video_ids):
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl)
+        cursor = self.collection().find({"_id": {"$in": video_ids}, "fetched_at": {"$gte": cutoff}}, {"_id": 1})
+        return {doc["_id"] async for doc in cursor}
+
+    async def _save(self, docs):
+        # Whole-document replace: a video gone unavailable loses its old metadata, and one that
+        # comes back loses its "unavailable" flag
+        await self.collection().bulk_write([ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in docs], ordered=False)
+
+    async def _query_lectures(self, video_ids):
+        # The duration/thumbnail filter runs in Mongo over the stored metadata
+        cursor = self.collection().find({
+            "_id": {"$in": video_ids},
+            "unavailable": {"$ne": True},
+            "duration_seconds": {"$gte": MIN_LECTURE_DURATION_SECONDS},
+            "thumbnail": {"$nin": [None, ""]},
+        })
+        return await cursor.to_list(length=None)
+
+    async def lecture_videos(self, video_ids, usage=None):
+        # Returns the metadata of the ids that qualify as lectures, in the order given
+        if not video_ids:
+            return []
+        try:
+            fresh = await self._fresh_ids(video_ids)
+        except PyMongoError as e:
+            logger.warning(f"Video metadata read failed, fetching all {len(video_ids)} ids: {str(e)}")
+            fresh = set()
+
+        missing = [video_id for video_id in video_ids if video_id not in fresh]
+        fetched = []
+        if missing:
+            now = datetime.now(timezone.utc)
+            items = await self.client.video_details(missing, usage)  # chunked by 50 in the client
+            fetched = [metadata_from_item(item, now) for item in items if item.get("id")]
+            returned = {doc["_id"] for doc in fetched}
+            unavailable = [{"_id": video_id, "unavailable": True, "fetched_at": now}
+                           for video_id in missing if video_id not in returned]
+            self.counters["api_lookups"] += len(missing)
+            try:
+                await self._save(fetched + unavailable)
+            except PyMongoError as e:
+                logger.warning(f"Video metadata write failed for {len(missing)} ids: {str(e)}")
+        self.counters["store_hits"] += len(fresh)
+
+        try:
+            docs = await self._query_lectures(video_ids)
+        except PyMongoError as e:
+            logger.warning(f"Video metadata query failed, filtering fetched details only: {str(e)}")
+            docs = [doc for doc in fetched if _is_lecture(doc)]
+
+        by_id = {doc["_id"]: doc for doc in docs}
+        return [by_id[video_id] for video_id in video_ids if video_id in by_id]
+
+    def stats(self):
+        return {**self.counters, "ttl_seconds": self.ttl}
+
+
+video_store = VideoMetadataStore()
@@ -0,0 +1,153 @@
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+import wikipedia
+from pymongo.errors import PyMongoError
+
+from app.core.config import (
+    WIKIPEDIA_CACHE_TTL,
+    WIKIPEDIA_NEGATIVE_TTL,
+    WIKIPEDIA_DISAMBIGUATION_TTL,
+    WIKIPEDIA_CACHE_MAX_ENTRIES,
+)
+from app.db.repositories import wikipedia_summaries
+from app.services.cache import TTLCache, SingleFlight
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "IntellectAi/1.0 (Intellect@Ai.com; IntellectAi.com)"
+SUMMARY_SENTENCES = 5
+WARM_UP_CONCURRENCY = 4
+
+wikipedia.set_user_agent(USER_AGENT)
+
+
+def lookup_summary(topic):
+    # Blocking lookup -> (kind, text). kind is "summary", "missing", "disambiguation" or
+    # "error"; the text is what the prompt has always used for that outcome.
+    try:
+        return "summary", wikipedia.summary(topic, sentences=SUMMARY_SENTENCES, auto_suggest=False)
+    except wikipedia.exceptions.PageError:
+        logger.info(f"Wikipedia page not found for topic: {topic}")
+        return "missing", "No relevant Wikipedia page found for the topic."
+    except wikipedia.exceptions.DisambiguationError as e:
+        options = e.options[:3]
+        logger.info(f"Wikipedia topic '{topic}' is ambiguous. Options: {options}")
+        return "disambiguation", f"The topic '{topic}' is ambiguous. Possible matches: {', '.join(options)}. Please be more specific."
+    except wikipedia.exceptions.WikipediaException as e:
+        logger.warning(f"Wikipedia lookup error for topic '{topic}': {str(e)}")
+        return "error", "Could not retrieve information from Wikipedia due to an error."
+    except Exception as e:
+        logger.error(f"Unexpected error during Wikipedia lookup for topic '{topic}': {str(e)}", exc_info=True)
+        return "error", "An unexpected error occurred while fetching Wikipedia content."
+
+
+def summary_version(text):
+    return hashlib.sha1(text.encode()).hexdigest()[:12]
+
+
+def topic_key(topic):
+    # Titles are case-sensitive past the first letter with auto_suggest off, so only spacing is normalised
+    return " ".join(topic.split())
+
+
+class WikipediaSummaryCache:
+    # Summaries keyed by topic, in an in-process LRU over a Mongo collection with a TTL index.
+    # Found pages, missing pages and disambiguation pages each have their own TTL; errors are
+    # never cached.
+
+    def __init__(self, collection=wikipedia_summaries, max_entries=WIKIPEDIA_CACHE_MAX_ENTRIES, ttls=None):
+        self.collection = collection
+        self.ttls = ttls or {
+            "summary": WIKIPEDIA_CACHE_TTL,
+            "missing": WIKIPEDIA_NEGATIVE_TTL,
+            "disambiguation": WIKIPEDIA_DISAMBIGUATION_TTL,
+        }
+        self.memory = TTLCache(maxsize=max_entries, ttl=self.ttls["summary"])
+        self.flights = SingleFlight()
+        self.counters = {"memory_hits": 0, "mongo_hits": 0, "lookups": 0, "errors": 0, "warmed": 0}
+        self._warm_tasks = set()
+
+    async def _load(self, key):
+        try:
+            doc = await self.collection().find_one({"_id": key})
+        except PyMongoError as e:
+            logger.warning(f"Wikipedia cache read failed for '{key}': {str(e)}")
+            return None
+        if not doc:
+            return None
+        expires_at = doc["expires_at"]
+        if expires_at.tzinfo is None:  # pymongo returns naive UTC datetimes by default
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        remaining = (expires_at - datetime.now(timezone.utc)).total_seconds()
+        if remaining <= 0:
+            return None
+        entry = {"kind": doc["kind"], "text": doc["text"], "version": summary_version(doc["text"])}
+        self.memory.set(key, entry, ttl=remaining)
+        return entry
+
+    async def _fetch(self, key):
+        self.counters["lookups"] += 1
+        kind, text = await asyncio.to_thread(lookup_summary, key)
+        entry = {"kind": kind, "text": text, "version": summary_version(text)}
+        if kind == "error":
+            self.counters["errors"] += 1
+            return entry
+        ttl = self.ttls[kind]
+        self.memory.set(key, entry, ttl=ttl)
+        now = datetime.now(timezone.utc)
+        doc = {"kind": kind, "text": text, "fetched_at": now, "expires_at": now + timedelta(seconds=ttl)}
+        try:
+            await self.collection().replace_one({"_id": key}, doc, upsert=True)
+        except PyMongoError as e:
+            logger.warning(f"Wikipedia cache write failed for '{key}': {str(e)}")
+        return entry
+
+    async def get(self, topic):
+        key = topic_key(topic)
+        state, entry, _ = self.memory.get(key)
+        if state != "miss":
+            self.counters["memory_hits"] += 1
+            return entry
+        entry = await self._load(key)
+        if entry is not None:
+            self.counters["mongo_hits"] += 1
+            return entry
+        return await self.flights.do(key, lambda: self._fetch(key))
+
+    def version(self, topic):
+        # Version of the summary currently held in memory, or None if not loaded here
+        state, entry, _ = self.memory.get(topic_key(topic))
+        return entry["version"] if state != "miss" else None
+
+    async def warm_up(self, topics):
+        # Loads each topic not already cached, a few at a time
+        semaphore = asyncio.Semaphore(WARM_UP_CONCURRENCY)
+
+        async def warm(topic):
+            async with semaphore:
+                if self.memory.get(topic_key(topic))[0] == "miss":
+                    await self.get(topic)
+                    self.counters["warmed"] += 1
+
+        topics = list(dict.fromkeys(topic_key(topic) for topic in topics if topic and topic.strip()))
+        await asyncio.gather(*(warm(topic) for topic in topics), return_exceptions=True)
+        return len(topics)
+
+    def prefetch(self, topics):
+        # Fire-and-forget warm_up, e.g. for the topic of a lecture just generated
+        task = asyncio.create_task(self.warm_up(topics))
+        self._warm_tasks.add(task)
+        task.add_done_callback(self._warm_tasks.discard)
+        return task
+
+    def cancel_prefetch(self):
+        for task in list(self._warm_tasks):
+            task.cancel()
+
+    def stats(self):
+        return {**self.counters, "memory_entries": len(self.memory)}
+
+
+wikipedia_cache = WikipediaSummaryCache()
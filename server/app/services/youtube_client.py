@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import random
+import httpx
+
+from app.core.config import (
+    YOUTUBE_API_KEY,
+    YOUTUBE_API_BASE_URL,
+    YOUTUBE_TIMEOUT_SECONDS,
+    YOUTUBE_MAX_RETRIES,
+    YOUTUBE_MAX_CONNECTIONS,
+)
+
+logger = logging.getLogger(__name__)
+
+SEARCH_PAGE_SIZE = 50
+DETAILS_CHUNK_SIZE = 50  # videos endpoint accepts at most 50 ids per call
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+QUOTA_COST = {"search": 100, "videos": 1}  # Data API v3 units per call
+
+
+class YouTubeAPIError(Exception):
+    def __init__(self, message, status_code=None, reason=None, body=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.reason = reason
+        self.body = body
+
+
+class YouTubeClient:
+    # One pooled HTTP/2 client per process, shared by all requests.
+
+    def __init__(self, api_key=YOUTUBE_API_KEY, base_url=YOUTUBE_API_BASE_URL, timeout=YOUTUBE_TIMEOUT_SECONDS,
+                 max_retries=YOUTUBE_MAX_RETRIES, max_connections=YOUTUBE_MAX_CONNECTIONS,
+                 backoff_base=0.25, backoff_max=4.0, transport=None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max(1, max_retries)
+        self.max_connections = max_connections
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.transport = transport  # e.g. httpx.ASGITransport(app=fake_youtube.app) in tests
+        self._client = None
+        self.quota_used = 0
+
+    def _get_client(self):
+        if self._client is None:
+            try:
+                import h2  # noqa: F401
+                http2 = True
+            except ImportError:
+                http2 = False
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=http2,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+                transport=self.transport,
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _backoff(self, attempt):
+        # Exponential backoff with full jitter
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    @staticmethod
+    def _error_from_response(response):
+        reason = None
+        try:
+            body = response.json()
+            reason = body.get("error", {}).get("errors", [{}])[0].get("reason")
+        except ValueError:
+            body = response.text
+        return YouTubeAPIError(
+            f"YouTube API returned HTTP {response.status_code} ({reason or 'no reason'})",
+            status_code=response.status_code, reason=reason, body=body,
+        )
+
+    def _charge(self, endpoint, usage):
+        # Failed calls are charged too: YouTube bills quota for requests that reach the API
+        cost = QUOTA_COST.get(endpoint, 1)
+        self.quota_used += cost
+        if usage is not None:
+            usage["quota_units"] = usage.get("quota_units", 0) + cost
+
+    async def _get(self, endpoint, params, usage=None):
+        params = {**params, "key": self.api_key}
+        last_error = None
+        for attempt in range(self.max_retries):
+            try:
+                response = await self._get_client().get(f"/{endpoint}", params=params)
+                self._charge(endpoint, usage)
+                if response.status_code == 200:
+                    return response.json()
+                last_error = self._error_from_response(response)
+                if response.status_code not in RETRYABLE_STATUS:
+                    raise last_error
+            except httpx.TransportError as e:  # includes timeouts
+                last_error = YouTubeAPIError(f"YouTube API transport error: {type(e).__name__}: {e}")
+
+            if attempt < self.max_retries - 1:
+                delay = self._backoff(attempt)
+                logger.warning(f"YouTube {endpoint} attempt {attempt+1} failed ({last_error}); retrying in {delay:.2f}s.")
+                await asyncio.sleep(delay)
+        raise last_error
+
+    async def search_page(self, query, page_token=None, usage=None):
+        data = await self._get("search", {
+            "part": "snippet",
+            "q": query,
+            "type": "video",
+            "maxResults": SEARCH_PAGE_SIZE,
+            "pageToken": page_token or "",
+            "relevanceLanguage": "en",
+            "videoEmbeddable": "true",
+        }, usage)
+        video_ids = [item["id"]["videoId"] for item in data.get("items", []) if item.get("id", {}).get("videoId")]
+        return video_ids, data.get("nextPageToken")
+
+    async def search_pages(self, query, max_pages, usage=None):
+        # Async generator of video id lists, one per search page
+        page_token = None
+        for _ in range(max_pages):
+            video_ids, page_token = await self.search_page(query, page_token, usage)
+            yield video_ids
+            if not page_token:
+                break
+
+    async def video_details(self, video_ids, usage=None):
+        items = []
+        for i in range(0, len(video_ids), DETAILS_CHUNK_SIZE):
+            chunk = video_ids[i:i + DETAILS_CHUNK_SIZE]
+            data = await self._get("videos", {"part": "contentDetails,snippet", "id": ",".join(chunk)}, usage)
+            items.extend(data.get("items", []))
+        return items
+
+    async def _safe_video_details(self, details, video_ids, page, usage=None):
+        try:
+            return await details(video_ids, usage)
+        except YouTubeAPIError as e:
+            logger.error(f"All attempts failed to fetch video details for search page {page}: {str(e)}")
+            return []
+
+    async def search_with_details(self, query, max_pages=4, usage=None, details=None):
+        # Detail lookups for a page start as soon as that page arrives, overlapping the next
+        # search call. Search errors propagate; a failed detail chunk is logged and skipped.
+        # Pass a dict as `usage` to have the quota units spent on this call added to it.
+        # `details(video_ids, usage)` replaces the plain videos lookup, e.g. with a cached one.
+        details = details or self.video_details
+        detail_tasks = []
+        try:
+            page = 0
+            async for video_ids in self.search_pages(query, max_pages, usage):
+                if video_ids:
+                    detail_tasks.append(asyncio.create_task(self._safe_video_details(details, video_ids, page, usage)))
+                page += 1
+        except BaseException:
+            for task in detail_tasks:
+                task.cancel()
+            raise
+
+        items = []
+        for page_items in await asyncio.gather(*detail_tasks):
+            items.extend(page_items)
+        return items
+
+
+youtube_client = YouTubeClient()
@@ -1,8 +1,30 @@
 import re
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+MIN_LECTURE_DURATION_SECONDS = 240  # shorter videos are not offered as lectures
+
+def normalize_topic(topic: str) -> str:
+    # Cache key for a topic: case, punctuation and spacing differences map to the same key
+    return " ".join(re.sub(r"[^\w\s+#]", " ", topic.lower()).split())
+
+def ndjson_event(event, data) -> str:
+    return json.dumps({"event": event, "data": data}) + "\n"
+
+def sse_event(event, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def format_duration(total_seconds: int) -> str:
+    h_disp = total_seconds // 3600
+    m_disp = (total_seconds % 3600) // 60
+    s_disp = total_seconds % 60
+    
+    if h_disp > 0:
+        return f"{h_disp}:{m_disp:02d}:{s_disp:02d}"
+    return f"{m_disp:02d}:{s_disp:02d}"
+
 def parse_duration(iso_str: str) -> tuple:
     try:
         hours = minutes = seconds = 0
@@ -26,20 +48,10 @@ def parse_duration(iso_str: str) -> tuple:
              if not (time_part_match.group(2) or time_part_match.group(4) or time_part_match.group(6)):
                 logger.debug(f"ISO duration string {iso_str} seems to be zero or unparseable for H,M,S time parts.")
 
-        min_duration_seconds = 240 
-        if total_seconds < min_duration_seconds:
+        if total_seconds < MIN_LECTURE_DURATION_SECONDS:
             return None, total_seconds
         
-        h_disp = total_seconds // 3600
-        m_disp = (total_seconds % 3600) // 60
-        s_disp = total_seconds % 60
-        
-        if h_disp > 0:
-            readable_duration = f"{h_disp}:{m_disp:02d}:{s_disp:02d}"
-        else:
-            readable_duration = f"{m_disp:02d}:{s_disp:02d}"
-            
-        return readable_duration, total_seconds
+        return format_duration(total_seconds), total_seconds
     except Exception as e:
         logger.error(f"Duration parsing failed for '{iso_str}': {str(e)}", exc_info=True)
         return None, 0
\ No newline at end of file
@@ -0,0 +1,89 @@
+# Per-frame latency of the face localiser backends vs the old DeepFace.analyze(emotion) path.
+#
+#   cd server
+#   python -m benchmarks.bench_face_localizer --images path/to/frames --backends deepface haar yunet
+#
+# Without --images a synthetic 640x480 frame set is used; detector cost is still representative,
+# but detection hit-rate is meaningless there.
+import argparse
+import glob
+import os
+import time
+import numpy as np
+from PIL import Image
+
+from app.core.config import DEEPFACE_DETECTOR
+from app.services.face_localizer import LOCALIZER_BACKENDS, get_face_localizer
+
+
+def load_frames(images_dir, count, size):
+    if images_dir:
+        paths = sorted(glob.glob(os.path.join(images_dir, "*.jp*g")) + glob.glob(os.path.join(images_dir, "*.png")))
+        if not paths:
+            raise SystemExit(f"No .jpg/.png frames found in {images_dir}")
+        return [np.array(Image.open(p).convert("RGB")) for p in paths[:count]]
+    rng = np.random.default_rng(0)
+    w, h = size
+    return [rng.integers(0, 255, (h, w, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def time_per_frame(fn, frames, warmup):
+    for frame in frames[:warmup]:
+        fn(frame)
+    timings = []
+    hits = 0
+    for frame in frames:
+        start = time.perf_counter()
+        found = fn(frame)
+        timings.append((time.perf_counter() - start) * 1000)
+        hits += 1 if found else 0
+    timings = np.array(timings)
+    return np.mean(timings), np.percentile(timings, 50), np.percentile(timings, 99), hits
+
+
+def legacy_analyze(frame):
+    from deepface import DeepFace
+    results = DeepFace.analyze(
+        img_path=frame,
+        actions=['emotion'],
+        detector_backend=DEEPFACE_DETECTOR,
+        silent=True,
+        enforce_detection=False
+    )
+    return results and results[0].get('region')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark face localiser backends")
+    parser.add_argument("--images", help="Directory of captured frames (jpg/png)")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--backends", nargs="+", default=list(LOCALIZER_BACKENDS))
+    parser.add_argument("--skip-legacy", action="store_true", help="Do not time DeepFace.analyze(actions=['emotion'])")
+    args = parser.parse_args()
+
+    frames = load_frames(args.images, args.frames, (args.width, args.height))
+    print(f"{len(frames)} frames, {frames[0].shape[1]}x{frames[0].shape[0]}")
+    print(f"{'path':<28}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'faces':>8}")
+
+    rows = {}
+    if not args.skip_legacy:
+        rows[f"analyze(emotion,{DEEPFACE_DETECTOR})"] = time_per_frame(legacy_analyze, frames, args.warmup)
+    for backend in args.backends:
+        try:
+            localizer = get_face_localizer(backend)
+        except Exception as e:
+            print(f"{backend:<28}unavailable: {e}")
+            continue
+        rows[backend] = time_per_frame(localizer.detect, frames, args.warmup)
+
+    legacy_mean = None if args.skip_legacy else next(iter(rows.values()))[0]
+    for name, (mean, p50, p99, hits) in rows.items():
+        saved = f"  (-{legacy_mean - mean:.1f} ms/frame)" if legacy_mean and not name.startswith("analyze") else ""
+        print(f"{name:<28}{mean:>10.1f}{p50:>10.1f}{p99:>10.1f}{hits:>8}{saved}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# End-to-end YouTube fan-out latency for lecture generation against the fake YouTube server,
+# comparing the old serial search-then-details order with the overlapped async client.
+#
+#   cd server
+#   FAKE_YOUTUBE_LATENCY_MS=150 python -m benchmarks.bench_generate_lecture --runs 5
+import argparse
+import asyncio
+import time
+import httpx
+import numpy as np
+
+from app.services.youtube_client import YouTubeClient
+from benchmarks import fake_youtube
+
+
+async def serial_fetch(client, query, max_pages=4):
+    video_ids = []
+    page_token = None
+    for _ in range(max_pages):
+        page_ids, page_token = await client.search_page(query, page_token)
+        video_ids.extend(page_ids)
+        if not page_token:
+            break
+    return await client.video_details(video_ids)
+
+
+async def run(args):
+    client = YouTubeClient(api_key="fake", base_url="http://fake-youtube/youtube/v3",
+                           transport=httpx.ASGITransport(app=fake_youtube.app))
+    modes = {
+        "serial": lambda q: serial_fetch(client, q),
+        "overlapped": lambda q: client.search_with_details(q, max_pages=4),
+    }
+    print(f"fake latency {fake_youtube.LATENCY_MS:.0f} ms/call, {fake_youtube.RESULTS_PER_QUERY} results/query")
+    for name, fetch in modes.items():
+        timings = []
+        for n in range(args.runs):
+            start = time.perf_counter()
+            items = await fetch(f"topic {n} lecture")
+            timings.append(time.perf_counter() - start)
+        print(f"{name:<11} p50 {np.percentile(timings, 50) * 1000:8.1f} ms   items {len(items)}")
+    await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark YouTube fan-out for lecture generation")
+    parser.add_argument("--runs", type=int, default=5)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# Login throughput under concurrency, hashing on the event loop (the old inline bcrypt) versus
+# the bounded bcrypt executor. Runs the real auth router against the in-memory Mongo backend and
+# also reports the worst event-loop stall seen by a 10 ms ticker while the logins run.
+#
+#   cd server
+#   python -m benchmarks.bench_login --users 20 --logins 200 --concurrency 50 --rounds 10
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("MONGO_BACKEND", "memory")
+os.environ.setdefault("DB_NAME", "bench_login")
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+
+import httpx
+import numpy as np
+from fastapi import FastAPI
+
+from app.api import auth
+from app.core.security import PasswordHasher, pwd_context
+from app.db.mongo import mongo
+from app.db.repositories import users
+
+TICK_SECONDS = 0.01
+
+
+class InlineHasher(PasswordHasher):
+    # Baseline: bcrypt straight on the event loop, as the handlers used to do
+    async def _run(self, fn, *args):
+        return fn(*args)
+
+
+async def watch_loop(stalls, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        stalls.append(time.perf_counter() - start - TICK_SECONDS)
+
+
+async def run_mode(client, hasher, args):
+    auth.password_hasher = hasher
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def login(n):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/login", json={"email": f"user{n % args.users}@example.com", "password": "correct horse"})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    stalls, stop = [], asyncio.Event()
+    watcher = asyncio.create_task(watch_loop(stalls, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(login(n) for n in range(args.logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await watcher
+    hasher.shutdown()
+    return elapsed, latencies, stalls
+
+
+async def run(args):
+    pwd_context.update(bcrypt__rounds=args.rounds)
+    await mongo.connect()
+    app = FastAPI()
+    app.include_router(auth.router)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for n in range(args.users):
+            response = await client.post("/signup", json={"username": f"user{n}", "email": f"user{n}@example.com", "password": "correct horse"})
+            response.raise_for_status()
+        print(f"bcrypt cost {args.rounds}, {args.users} users, {args.logins} logins, concurrency {args.concurrency}")
+        modes = {"inline": InlineHasher(workers=1), f"executor x{args.workers}": PasswordHasher(workers=args.workers)}
+        for name, hasher in modes.items():
+            elapsed, latencies, stalls = await run_mode(client, hasher, args)
+            print(f"{name:<12} {args.logins / elapsed:7.1f} logins/s   p50 {np.percentile(latencies, 50) * 1000:7.1f} ms   "
+                  f"p95 {np.percentile(latencies, 95) * 1000:7.1f} ms   max loop stall {max(stalls, default=0) * 1000:7.1f} ms")
+    # Rehash on login: raise the cost and check a login upgrades the stored hash
+    pwd_context.update(bcrypt__rounds=args.rounds + 1)
+    auth.password_hasher = PasswordHasher(workers=1)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await client.post("/login", json={"email": "user0@example.com", "password": "correct horse"})
+    stored = (await users().find_one({"email": "user0@example.com"}))["password"]
+    print(f"after raising the cost to {args.rounds + 1}: stored hash is {stored[:7]}")
+    auth.password_hasher.shutdown()
+    mongo.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark login throughput with inline vs executor bcrypt")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=10, help="bcrypt cost factor")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="bcrypt executor threads")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+# Throughput / latency / memory / accuracy suite for the stress pipeline on synthetic data,
+# with a saved baseline that later runs are checked against.
+#
+#   cd server
+#   python -m benchmarks.bench_stress_pipeline --compare benchmarks/baseline.json
+#   python -m benchmarks.bench_stress_pipeline --save-baseline benchmarks/baseline.json
+#
+# benchmarks/baseline.json is committed, recorded with the default arguments. Timings only mean
+# something on the machine that recorded them, so re-record it (second command) on the machine
+# that runs the comparison. --compare exits 1 when any metric in CHECKS regresses past its
+# tolerance (--strict also fails on changed numeric outputs).
+#
+# "calculator" drives HeartMetricsCalculator on forehead RGB traces; "endpoint" renders full
+# JPEG face frames and POSTs them to /analyze-stress through FastAPI's TestClient. Synthetic
+# frames are localised with a thresholding detector unless --detector names a real backend
+# (then the detector cost is real but HR error is meaningless).
+import argparse
+import hashlib
+import json
+import logging
+import os
+import platform
+import resource
+import sys
+import time
+import numpy as np
+
+
+def percentile_ms(timings, q):
+    return float(np.percentile(timings, q) * 1000) if len(timings) else 0.0
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS; children covers the frame pool workers
+    scale = 1 / 1024 if sys.platform != "darwin" else 1 / (1024 * 1024)
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return round(own + children, 1)
+
+
+def summarise(timings, frames, errors, outputs):
+    timings = np.array(timings)
+    errors = np.array(errors)
+    return {
+        "runs": len(timings),
+        "frames_per_sec": round(frames / timings.sum(), 1) if timings.sum() > 0 else 0.0,
+        "p50_ms": round(percentile_ms(timings, 50), 2),
+        "p99_ms": round(percentile_ms(timings, 99), 2),
+        "hr_mae_bpm": round(float(np.mean(errors)), 2) if len(errors) else None,
+        "hr_within_5bpm": round(float(np.mean(errors < 5)), 3) if len(errors) else None,
+        "peak_rss_mb": peak_rss_mb(),
+        # Changes whenever numeric outputs change at all; used to flag silent behaviour changes
+        "outputs_digest": hashlib.sha256(json.dumps(np.round(outputs, 6).tolist()).encode()).hexdigest()[:16],
+    }
+
+
+def run_calculator(args):
+    from app.services.heart_metrics import make_calculator, pulse_signal
+    from benchmarks.synthetic import synthetic_rgb_trace
+
+    rng = np.random.default_rng(args.seed)
+    timings, errors, outputs = [], [], []
+    frames = 0
+    for _ in range(args.trials):
+        bpm = rng.uniform(55, 120)
+        trace = synthetic_rgb_trace(rng, args.fps, args.duration, bpm)
+        calculator = make_calculator(args.estimator, args.fps)
+        start = time.perf_counter()
+        result = calculator.estimate_from_signal(pulse_signal(trace, args.rppg, args.fps))
+        timings.append(time.perf_counter() - start)
+        frames += len(trace)
+        errors.append(abs(result[0] - bpm))
+        outputs.append([float(v) for v in result])
+    return summarise(timings, frames, errors, outputs)
+
+
+def configure_endpoint_env(args):
+    # Must run before app.core.config is first imported. main pulls in the auth/lecture routers,
+    # so give it the in-memory Mongo backend unless a real one is configured.
+    os.environ.setdefault("MONGO_BACKEND", "memory")
+    os.environ.setdefault("DB_NAME", "bench_stress")
+    os.environ.setdefault("JWT_SECRET", "bench-secret")
+    if not args.detector:
+        # Thresholding stand-in detector must live in this process
+        os.environ["STRESS_POOL_SIZE"] = "0"
+        os.environ["FACE_DETECTOR_BACKEND"] = "synthetic"
+        os.environ["FACE_TRACKING_ENABLED"] = "false"
+    else:
+        os.environ["FACE_DETECTOR_BACKEND"] = args.detector
+
+
+def run_endpoint(args):
+    from fastapi.testclient import TestClient
+    from app.services.face_localizer import LOCALIZER_BACKENDS
+    from benchmarks.synthetic import SyntheticFaceLocalizer, synthetic_face_frames, encode_jpeg, to_data_url
+    LOCALIZER_BACKENDS[SyntheticFaceLocalizer.name] = SyntheticFaceLocalizer
+    from main import app
+
+    rng = np.random.default_rng(args.seed)
+    timings, errors, outputs = [], [], []
+    frames = 0
+    with TestClient(app) as client:
+        for _ in range(args.requests):
+            bpm = rng.uniform(55, 120)
+            data_urls = [
+                to_data_url(encode_jpeg(frame, args.jpeg_quality))
+                for frame in synthetic_face_frames(rng, args.fps, args.duration, bpm, size=(args.width, args.height))
+            ]
+            payload = {"frames": data_urls, "fps": args.fps, "estimator": args.estimator, "rppg": args.rppg}
+            start = time.perf_counter()
+            response = client.post("/analyze-stress", json=payload)
+            timings.append(time.perf_counter() - start)
+            frames += len(data_urls)
+
+            body = response.json()
+            if response.status_code != 200 or "error" in body:
+                print(f"endpoint request failed ({response.status_code}): {body}", file=sys.stderr)
+                outputs.append([0.0] * 5)
+                continue
+            keys = ("avg_heart_rate", "sdnn", "rmssd", "bsi", "lf_hf_ratio")
+            outputs.append([float(body[k]) for k in keys])
+            if not args.detector:
+                errors.append(abs(body["avg_heart_rate"] - bpm))
+    return summarise(timings, frames, errors, outputs)
+
+
+# (metric, higher_is_better, relative tolerance or absolute for MAE)
+CHECKS = [
+    ("frames_per_sec", True, 0.20),
+    ("p50_ms", False, 0.20),
+    ("p99_ms", False, 0.30),
+    ("peak_rss_mb", False, 0.20),
+    ("hr_mae_bpm", False, 1.0),
+]
+
+
+def compare(results, baseline, strict=False):
+    failures = []
+    for mode, current in results.items():
+        previous = baseline.get("results", {}).get(mode)
+        if not previous:
+            print(f"[{mode}] no baseline entry, skipping comparison")
+            continue
+        for metric, higher_is_better, tolerance in CHECKS:
+            old, new = previous.get(metric), current.get(metric)
+            if old is None or new is None:
+                continue
+            if metric == "hr_mae_bpm":
+                regressed = new > old + tolerance
+            elif higher_is_better:
+                regressed = new < old * (1 - tolerance)
+            else:
+                regressed = new > old * (1 + tolerance)
+            status = "REGRESSED" if regressed else "ok"
+            print(f"[{mode}] {metric:<15} baseline {old:>10} now {new:>10}  {status}")
+            if regressed:
+                failures.append(f"{mode}.{metric}")
+        if previous.get("outputs_digest") != current.get("outputs_digest"):
+            print(f"[{mode}] outputs changed vs baseline (digest {previous.get('outputs_digest')} -> {current.get('outputs_digest')})")
+            if strict:
+                failures.append(f"{mode}.outputs_digest")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic benchmark and regression suite for stress analysis")
+    parser.add_argument("--modes", nargs="+", choices=["calculator", "endpoint"], default=["calculator", "endpoint"])
+    parser.add_argument("--fps", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=15, help="Seconds of capture per request/signal")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--jpeg-quality", type=int, default=90)
+    parser.add_argument("--trials", type=int, default=200, help="Signals for calculator mode")
+    parser.add_argument("--requests", type=int, default=5, help="Requests for endpoint mode")
+    parser.add_argument("--estimator", default="peaks")
+    parser.add_argument("--rppg", default="green")
+    parser.add_argument("--detector", help="Real face localiser backend for endpoint mode")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH")
+    parser.add_argument("--strict", action="store_true", help="Also fail when numeric outputs change")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    if "endpoint" in args.modes:
+        configure_endpoint_env(args)
+
+    runners = {"calculator": run_calculator, "endpoint": run_endpoint}
+    results = {}
+    for mode in args.modes:
+        results[mode] = runners[mode](args)
+        print(f"[{mode}] " + ", ".join(f"{k}={v}" for k, v in results[mode].items()))
+
+    config = {k: v for k, v in vars(args).items() if k not in ("save_baseline", "compare", "strict")}
+    report = {"config": config, "python": platform.python_version(), "machine": platform.machine(), "results": results}
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != config:
+            print("Warning: benchmark configuration differs from the baseline run.")
+        if (baseline.get("python"), baseline.get("machine")) != (report["python"], report["machine"]):
+            print(f"Warning: baseline was recorded on Python {baseline.get('python')} / {baseline.get('machine')}; timings may not be comparable.")
+        failures = compare(results, baseline, strict=args.strict)
+        if failures:
+            print(f"Regressions: {', '.join(failures)}")
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
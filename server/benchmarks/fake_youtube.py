@@ -0,0 +1,99 @@
+# Local stand-in for the YouTube Data API v3 search/videos endpoints, with configurable
+# latency, failure injection and quota accounting.
+#
+#   cd server
+#   FAKE_YOUTUBE_LATENCY_MS=150 uvicorn benchmarks.fake_youtube:app --port 8765
+#   YOUTUBE_API_BASE_URL=http://127.0.0.1:8765/youtube/v3 YOUTUBE_API_KEY=fake uvicorn main:app
+#
+# or in-process: YouTubeClient(base_url="http://fake/youtube/v3", transport=httpx.ASGITransport(app=app))
+import asyncio
+import hashlib
+import os
+import random
+from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse
+
+LATENCY_MS = float(os.getenv("FAKE_YOUTUBE_LATENCY_MS", 100))
+FAILURE_RATE = float(os.getenv("FAKE_YOUTUBE_FAILURE_RATE", 0))  # fraction of calls answered with 503
+QUOTA = int(os.getenv("FAKE_YOUTUBE_QUOTA", 1_000_000))
+RESULTS_PER_QUERY = int(os.getenv("FAKE_YOUTUBE_RESULTS", 200))
+
+app = FastAPI(title="Fake YouTube Data API")
+stats = {"search": 0, "videos": 0, "quota_used": 0, "failures": 0, "in_flight": 0, "max_in_flight": 0}
+pending_failures = {"search": 0, "videos": 0}  # deterministic 503s for the next N calls, set via fail_next()
+
+
+def fail_next(endpoint, count=1):
+    pending_failures[endpoint] += count
+
+
+def reset():
+    for key in stats:
+        stats[key] = 0
+    for key in pending_failures:
+        pending_failures[key] = 0
+
+
+def _video_id(query, n):
+    return hashlib.sha1(f"{query}:{n}".encode()).hexdigest()[:11]
+
+
+def _duration(video_id):
+    # Deterministic mix of short and long videos so the 4-minute filter has work to do
+    seconds = int(video_id[:4], 16) % 3600
+    return f"PT{seconds // 60}M{seconds % 60}S"
+
+
+async def _call(endpoint, cost):
+    stats[endpoint] += 1
+    stats["in_flight"] += 1
+    stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+    try:
+        await asyncio.sleep(LATENCY_MS / 1000)
+    finally:
+        stats["in_flight"] -= 1
+    if stats["quota_used"] + cost > QUOTA:
+        return JSONResponse(status_code=403, content={"error": {"code": 403, "errors": [{"reason": "quotaExceeded"}]}})
+    if pending_failures[endpoint] or (FAILURE_RATE and random.random() < FAILURE_RATE):
+        pending_failures[endpoint] = max(0, pending_failures[endpoint] - 1)
+        stats["failures"] += 1
+        return JSONResponse(status_code=503, content={"error": {"code": 503, "errors": [{"reason": "backendError"}]}})
+    stats["quota_used"] += cost
+    return None
+
+
+@app.get("/youtube/v3/search")
+async def search(q: str, maxResults: int = 50, pageToken: str = ""):
+    if error := await _call("search", 100):
+        return error
+    start = int(pageToken or 0)
+    end = min(start + maxResults, RESULTS_PER_QUERY)
+    items = [{"id": {"kind": "youtube#video", "videoId": _video_id(q, n)}} for n in range(start, end)]
+    body = {"items": items}
+    if end < RESULTS_PER_QUERY:
+        body["nextPageToken"] = str(end)
+    return body
+
+
+@app.get("/youtube/v3/videos")
+async def videos(id: str = Query(...)):
+    if error := await _call("videos", 1):
+        return error
+    items = []
+    for video_id in id.split(",")[:50]:
+        items.append({
+            "id": video_id,
+            "snippet": {
+                "title": f"Lecture {video_id}",
+                "description": f"Synthetic description for {video_id}",
+                "channelTitle": "Fake Channel",
+                "thumbnails": {"high": {"url": f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg"}},
+            },
+            "contentDetails": {"duration": _duration(video_id)},
+        })
+    return {"items": items}
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
@@ -0,0 +1,75 @@
+# Synthetic rPPG data: forehead RGB traces and full face frames modulated by a known pulse.
+import base64
+from io import BytesIO
+import numpy as np
+from PIL import Image
+
+from app.services.face_localizer import FaceLocalizer
+
+# Skin pulsatility is strongest in green, weaker in red/blue (relative amplitudes from rPPG literature)
+PULSATILITY = np.array([0.33, 0.77, 0.53])
+SKIN_RGB = np.array([200.0, 150.0, 120.0])
+
+
+def pulse_wave(rng, fps, duration, bpm):
+    t = np.arange(int(round(fps * duration))) / fps
+    return t, np.sin(2 * np.pi * bpm / 60 * t + rng.uniform(0, 2 * np.pi))
+
+
+def synthetic_rgb_trace(rng, fps, duration, bpm, noise=0.3, motion=0.02, amplitude=0.005):
+    # Per-frame forehead channel means, shape (n, 3)
+    t, pulse = pulse_wave(rng, fps, duration, bpm)
+    base = np.array([150.0, 110.0, 90.0])
+    # Illumination/motion changes scale all channels together, which CHROM/POS are meant to cancel
+    intensity = 1 + motion * np.sin(2 * np.pi * rng.uniform(0.1, 0.4) * t) + 0.002 * t
+    trace = base * intensity[:, None] * (1 + amplitude * pulse[:, None] * PULSATILITY)
+    return trace + rng.normal(0, noise, trace.shape)
+
+
+def synthetic_face_frames(rng, fps, duration, bpm, size=(640, 480), noise=2.0, motion_px=6.0, amplitude=0.01, texture=0.0):
+    # Yields RGB uint8 frames: a skin-coloured face block on a dark textured background whose
+    # pixels carry the pulse, drifting by up to `motion_px` pixels. `texture` > 0 gives the face
+    # a fixed pattern that moves with it (a flat block leaves template matching nothing to lock on).
+    width, height = size
+    t, pulse = pulse_wave(rng, fps, duration, bpm)
+    face_w, face_h = width // 4, int(height * 0.45)
+    x0, y0 = (width - face_w) // 2, (height - face_h) // 3
+    drift_hz = rng.uniform(0.1, 0.3)
+    background = rng.normal(40, 8, (height, width, 3))
+    pattern = 1 + texture * rng.normal(0, 1, (face_h, face_w, 1)) if texture else 1
+
+    for i in range(len(t)):
+        dx = int(round(motion_px * np.sin(2 * np.pi * drift_hz * t[i])))
+        dy = int(round(0.5 * motion_px * np.cos(2 * np.pi * drift_hz * t[i])))
+        frame = background.copy()
+        skin = SKIN_RGB * (1 + amplitude * pulse[i] * PULSATILITY)
+        frame[y0 + dy:y0 + dy + face_h, x0 + dx:x0 + dx + face_w] = skin * pattern
+        frame += rng.normal(0, noise, frame.shape)
+        yield np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def encode_jpeg(rgb_frame, quality=90):
+    buffer = BytesIO()
+    Image.fromarray(rgb_frame).save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def to_data_url(jpeg_bytes):
+    return "data:image/jpeg;base64," + base64.b64encode(jpeg_bytes).decode("ascii")
+
+
+class SyntheticFaceLocalizer(FaceLocalizer):
+    # Finds the synthetic face block by thresholding; stands in for a real detector, which
+    # will not fire on synthetic frames.
+    name = "synthetic"
+
+    def __init__(self, threshold=120):
+        self.threshold = threshold
+
+    def detect(self, rgb_frame):
+        mask = rgb_frame[..., 0] > self.threshold
+        rows = np.flatnonzero(mask.any(axis=1))
+        cols = np.flatnonzero(mask.any(axis=0))
+        if len(rows) == 0 or len(cols) == 0:
+            return []
+        return [(int(cols[0]), int(rows[0]), int(cols[-1] - cols[0] + 1), int(rows[-1] - rows[0] + 1))]
@@ -1,19 +1,69 @@
+import asyncio
 import logging
 import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
-from app.core.config import PORT
+from app.core.config import (
+    PORT,
+    PRELOAD_MODELS,
+    PRELOAD_BEFORE_FORK,
+    WIKIPEDIA_WARM_TOPICS,
+    MONGO_ENSURE_INDEXES,
+    MONGO_CHECK_QUERY_PLANS,
+)
 from app.api import auth, lectures, qa, stress
+from app.db.mongo import mongo
+from app.db.migrations import migrate
+from app.core.security import password_hasher
+from app.services.frame_pipeline import frame_pipeline
+from app.services.stress_jobs import stress_job_queue
+from app.services.model_registry import model_registry
+from app.services.youtube_client import youtube_client
+from app.services.lecture_cache import topic_cache
+from app.services.transcript_store import transcript_store
+from app.services.gemini_client import gemini_client
+from app.services.wikipedia_source import wikipedia_cache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+if PRELOAD_BEFORE_FORK:
+    # Load weights in the parent so forked workers share them copy-on-write (gunicorn --preload)
+    model_registry.load()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await mongo.connect()
+    warm_up_task = asyncio.create_task(model_registry.warm_up()) if PRELOAD_MODELS else None
+    await stress_job_queue.start()
+    if MONGO_ENSURE_INDEXES:
+        try:
+            await migrate(check_plans=MONGO_CHECK_QUERY_PLANS)
+        except Exception as e:
+            logger.error(f"Database migrations failed: {str(e)}")
+    if WIKIPEDIA_WARM_TOPICS:
+        wikipedia_cache.prefetch(await topic_cache.recent_topics(WIKIPEDIA_WARM_TOPICS))
+    gemini_client.start()
+    yield
+    if warm_up_task:
+        warm_up_task.cancel()
+    transcript_store.cancel_prefetch()
+    wikipedia_cache.cancel_prefetch()
+    await stress_job_queue.stop()
+    await youtube_client.close()
+    frame_pipeline.shutdown()
+    password_hasher.shutdown()
+    mongo.close()
+
 app = FastAPI(
     title="EduFocus API",
     description="API for EduFocus application, providing lecture generation, Q&A, and stress analysis.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -35,6 +85,17 @@ app.include_router(stress.router, tags=["Stress Analysis"])
 async def root():
     return {"message": "Welcome to the EduFocus API!"}
 
+@app.get("/health/live", summary="Liveness probe", tags=["General"])
+async def liveness():
+    return {"status": "ok"}
+
+@app.get("/health/ready", summary="Readiness probe: models loaded and warmed", tags=["General"])
+async def readiness():
+    status = model_registry.status()
+    if PRELOAD_MODELS and not status["ready"]:
+        return JSONResponse(status_code=503, content=status)
+    return status
+
 if __name__ == "__main__":
     logger.info(f"Starting Uvicorn server on port {PORT}")
     uvicorn.run("app.main:app", host="0.0.0.0", port=PORT, reload=True)
\ No newline at end of file
@@ -0,0 +1,20 @@
+import asyncio
+import os
+
+# Before any app import: config is read at import time. Tests always use the in-memory backend.
+os.environ["MONGO_BACKEND"] = "memory"
+os.environ.setdefault("DB_NAME", "edufocus_test")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import pytest
+
+from app.db.mongo import mongo
+
+
+@pytest.fixture
+def db():
+    # The memory backend starts from an empty store on every connect()
+    asyncio.run(mongo.connect())
+    yield mongo.db
+    mongo.close()
@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+from app.services import answer_cache as answer_cache_module
+from app.services.answer_cache import AnswerCache, cosine, question_vector
+
+QUESTION = "What is an eigenvalue of a matrix?"
+
+
+class Versions:
+    # What this process currently has loaded for each source; None means not loaded here
+    def __init__(self):
+        self.current = None
+
+    def version(self, key):
+        return self.current
+
+
+@pytest.fixture
+def versions(monkeypatch):
+    transcript, wikipedia = Versions(), Versions()
+    monkeypatch.setattr(answer_cache_module, "transcript_store", transcript)
+    monkeypatch.setattr(answer_cache_module, "wikipedia_cache", wikipedia)
+    return transcript, wikipedia
+
+
+def result(answer="It is the scale factor.", sources=None, transcript="t1", wikipedia="w1"):
+    return {
+        "answer": answer,
+        "passages": [],
+        "sources": sources or {"transcript": "ok", "wikipedia": "ok"},
+        "versions": {"transcript": transcript, "wikipedia": wikipedia},
+    }
+
+
+def test_identical_questions_hit_after_normalisation(versions):
+    cache = AnswerCache(similarity=0)
+    cache.store("v1", "Eigenvalues", QUESTION, result())
+    entry, status = cache.lookup("v1", "  eigenvalues ", "what is an EIGENVALUE of a matrix")
+    assert status == "hit"
+    assert entry["answer"] == "It is the scale factor."
+    assert cache.lookup("v2", "Eigenvalues", QUESTION) == (None, "miss")
+
+
+def test_a_newer_source_version_invalidates_the_answer(versions):
+    transcript, wikipedia = versions
+    cache = AnswerCache(similarity=0)
+    cache.store("v1", "Eigenvalues", QUESTION, result())
+
+    # Unknown here (None) or unchanged versions keep the answer
+    assert cache.lookup("v1", "Eigenvalues", QUESTION)[1] == "hit"
+    transcript.current, wikipedia.current = "t1", "w1"
+    assert cache.lookup("v1", "Eigenvalues", QUESTION)[1] == "hit"
+
+    wikipedia.current = "w2"
+    assert cache.lookup("v1", "Eigenvalues", QUESTION) == (None, "miss")
+    assert cache.counters["invalidated"] == 1
+    # Dropped, not just skipped: it stays gone once the old version is back
+    wikipedia.current = "w1"
+    assert cache.lookup("v1", "Eigenvalues", QUESTION) == (None, "miss")
+    assert len(cache.memory) == 0
+
+
+def test_answers_built_without_a_source_expire_sooner(versions):
+    cache = AnswerCache(ttl=3600, degraded_ttl=0.05, similarity=0)
+    cache.store("v1", "Eigenvalues", QUESTION, result(sources={"transcript": "ok", "wikipedia": "timeout"}, wikipedia=None))
+    cache.store("v1", "Eigenvalues", "why are eigenvalues useful", result())
+
+    asyncio.run(asyncio.sleep(0.1))
+
+    assert cache.lookup("v1", "Eigenvalues", QUESTION) == (None, "miss")
+    assert cache.lookup("v1", "Eigenvalues", "why are eigenvalues useful")[1] == "hit"
+
+
+def test_similar_questions_match_only_above_the_threshold(versions):
+    cache = AnswerCache(similarity=0.8)
+    cache.store("v1", "Eigenvalues", QUESTION, result())
+
+    # Same content terms (eigenvalue, matrix), different wording
+    assert cache.lookup("v1", "Eigenvalues", "So what's the eigenvalue of the matrix?")[1] == "similar"
+    # cosine 0.5: shares "matrix" only
+    assert cosine(question_vector("eigenvector of a matrix"), question_vector(QUESTION.lower())) == pytest.approx(0.5)
+    assert cache.lookup("v1", "Eigenvalues", "What is an eigenvector of a matrix?") == (None, "miss")
+    # Never across videos or topics
+    assert cache.lookup("v2", "Eigenvalues", "So what's the eigenvalue of the matrix?") == (None, "miss")
+    assert cache.lookup("v1", "Matrices", "So what's the eigenvalue of the matrix?") == (None, "miss")
+    assert cache.counters["similar_hits"] == 1
+
+
+def test_similarity_zero_disables_near_matches(versions):
+    cache = AnswerCache(similarity=0)
+    cache.store("v1", "Eigenvalues", QUESTION, result())
+    assert cache.lookup("v1", "Eigenvalues", "So what's the eigenvalue of the matrix?") == (None, "miss")
+    assert cache._questions == {}
+
+
+def test_the_similar_question_index_is_bounded_by_the_cache(versions):
+    cache = AnswerCache(max_entries=4, similarity=0.8)
+    largest = 0
+    for n in range(200):
+        cache.store(f"video{n}", "Eigenvalues", QUESTION, result())
+        largest = max(largest, len(cache._questions))
+
+    # Scopes whose answers were evicted are pruned before a new scope is added
+    assert largest <= cache.memory.maxsize + 1
+    assert set(cache._questions) >= {(key[0], key[1]) for key in cache.memory.keys()}
+
+
+def test_evicted_answers_leave_the_similar_index_on_lookup(versions):
+    cache = AnswerCache(max_entries=1, similarity=0.8)
+    cache.store("v1", "Eigenvalues", QUESTION, result())
+    cache.store("v1", "Eigenvalues", "how do I find eigenvectors", result())
+
+    assert cache.lookup("v1", "Eigenvalues", "So what's the eigenvalue of the matrix?") == (None, "miss")
+    assert list(cache._questions[("v1", "eigenvalues")]) == ["how do i find eigenvectors"]
+
+
+def test_concurrent_misses_share_one_computation(versions):
+    cache = AnswerCache(similarity=0)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return result()
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_compute("v1", "Eigenvalues", QUESTION, compute) for _ in range(5)))
+
+    statuses = sorted(status for _, status in asyncio.run(run()))
+    assert calls == [1]
+    assert statuses == ["coalesced"] * 4 + ["miss"]
+    assert cache.lookup("v1", "Eigenvalues", QUESTION)[1] == "hit"
@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services import answer_context
+from app.services.answer_context import TRANSCRIPT_FALLBACK, WIKIPEDIA_FALLBACK, gather_context
+from app.services.passage_index import PassageIndexCache
+from app.services.transcript_store import TranscriptUnavailable
+from app.services.wikipedia_source import summary_version
+
+SEGMENTS = [{"text": "An eigenvalue is the factor an eigenvector is stretched by.", "start": 75.0, "duration": 5.0}]
+SUMMARY = "In linear algebra, an eigenvector is a vector that only changes by a scalar factor."
+DEADLINE = 0.1
+
+
+@pytest.fixture
+def sources(monkeypatch):
+    # Per-source delay (seconds) or exception; each fake records whether it was cancelled
+    behaviour = {"transcript": 0, "wikipedia": 0}
+    cancelled = []
+
+    async def respond(source, value):
+        outcome = behaviour[source]
+        try:
+            if isinstance(outcome, BaseException):
+                raise outcome
+            await asyncio.sleep(outcome)
+        except asyncio.CancelledError:
+            cancelled.append(source)
+            raise
+        return value
+
+    async def transcript(video_id):
+        return await respond("transcript", SEGMENTS)
+
+    async def wikipedia(topic):
+        return await respond("wikipedia", {"kind": "summary", "text": SUMMARY})
+
+    monkeypatch.setattr(answer_context.transcript_store, "get", transcript)
+    monkeypatch.setattr(answer_context.transcript_store, "version", lambda video_id: "t-version")
+    monkeypatch.setattr(answer_context.wikipedia_cache, "get", wikipedia)
+    monkeypatch.setattr(answer_context, "passage_indexes", PassageIndexCache())
+    monkeypatch.setattr(answer_context, "QA_TRANSCRIPT_TIMEOUT", DEADLINE)
+    monkeypatch.setattr(answer_context, "QA_WIKIPEDIA_TIMEOUT", DEADLINE)
+    return behaviour, cancelled
+
+
+def timed_gather():
+    async def run():
+        start = time.perf_counter()
+        context = await gather_context("v1", "Eigenvalues", "what is an eigenvalue")
+        return context, time.perf_counter() - start
+
+    return asyncio.run(run())
+
+
+def test_both_sources_in_time(sources):
+    context, _ = timed_gather()
+    assert context["sources"] == {"transcript": "ok", "wikipedia": "ok"}
+    assert context["transcript"] == f"[01:15] {SEGMENTS[0]['text']}"
+    assert context["wikipedia"] == SUMMARY
+    assert context["versions"] == {"transcript": "t-version", "wikipedia": summary_version(SUMMARY)}
+
+
+def test_slow_wikipedia_times_out_while_the_transcript_returns(sources):
+    behaviour, cancelled = sources
+    behaviour["wikipedia"] = 5
+
+    context, elapsed = timed_gather()
+
+    assert context["sources"] == {"transcript": "ok", "wikipedia": "timeout"}
+    assert context["passages"][0]["text"] == SEGMENTS[0]["text"]
+    assert context["wikipedia"] == WIKIPEDIA_FALLBACK
+    assert context["versions"] == {"transcript": "t-version", "wikipedia": None}
+    assert elapsed < 1
+    assert cancelled == ["wikipedia"]
+
+
+def test_slow_transcript_times_out_while_wikipedia_returns(sources):
+    behaviour, _ = sources
+    behaviour["transcript"] = 5
+
+    context, elapsed = timed_gather()
+
+    assert context["sources"] == {"transcript": "timeout", "wikipedia": "ok"}
+    assert context["passages"] == []
+    assert context["transcript"] == TRANSCRIPT_FALLBACK
+    assert context["wikipedia"] == SUMMARY
+    assert context["versions"]["transcript"] is None
+    assert elapsed < 1
+
+
+def test_deadlines_run_concurrently(sources):
+    behaviour, _ = sources
+    behaviour["transcript"] = behaviour["wikipedia"] = 5
+
+    context, elapsed = timed_gather()
+
+    assert context["sources"] == {"transcript": "timeout", "wikipedia": "timeout"}
+    # One deadline's worth of waiting, not two
+    assert elapsed < DEADLINE * 1.8
+
+
+def test_a_failing_source_is_reported_as_an_error(sources):
+    behaviour, _ = sources
+    behaviour["wikipedia"] = RuntimeError("connection reset")
+
+    context, _ = timed_gather()
+
+    assert context["sources"] == {"transcript": "ok", "wikipedia": "error"}
+    assert context["wikipedia"] == WIKIPEDIA_FALLBACK
+
+
+def test_a_video_without_a_transcript_propagates_and_cancels_wikipedia(sources):
+    behaviour, cancelled = sources
+    behaviour["transcript"] = TranscriptUnavailable("v1", "TranscriptsDisabled")
+    behaviour["wikipedia"] = 5
+
+    with pytest.raises(TranscriptUnavailable):
+        timed_gather()
+    assert cancelled == ["wikipedia"]
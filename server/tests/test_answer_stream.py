@@ -0,0 +1,200 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from google.api_core.exceptions import ResourceExhausted
+
+from app.api import qa
+from app.services.answer_cache import AnswerCache
+from app.services.transcript_store import TranscriptUnavailable
+
+TOKENS = ["Eigen", "values ", "scale ", "eigenvectors."]
+PARAMS = {"videoId": "v1", "topic": "Eigenvalues", "question": "What is an eigenvalue?"}
+CONTEXT = {
+    "passages": [{"start": 75.0, "end": 80.0, "text": "An eigenvalue is the factor an eigenvector is stretched by."}],
+    "transcript": "[01:15] An eigenvalue is the factor an eigenvector is stretched by.",
+    "wikipedia": "In linear algebra, an eigenvector ...",
+    "sources": {"transcript": "ok", "wikipedia": "ok"},
+    "versions": {"transcript": None, "wikipedia": None},
+}
+
+
+class FakeGemini:
+    # Streams TOKENS with a pause between chunks; `fail_after` raises once that many were sent
+    configured = True
+
+    def __init__(self):
+        self.streams = 0
+        self.closed = 0
+        self.delay = 0.02
+        self.fail_after = None
+        self.error = None
+
+    async def stream(self, prompt):
+        self.streams += 1
+        try:
+            for n, text in enumerate(TOKENS):
+                if n == self.fail_after:
+                    raise self.error
+                await asyncio.sleep(self.delay)
+                yield text
+        finally:
+            self.closed += 1
+
+    async def generate(self, prompt):
+        raise AssertionError("non-streaming calls must join the stream in these tests")
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    fake = FakeGemini()
+    monkeypatch.setattr(qa, "gemini_client", fake)
+    monkeypatch.setattr(qa, "answer_cache", AnswerCache(similarity=0))
+    return fake
+
+
+@pytest.fixture
+def context(monkeypatch):
+    calls = {"count": 0, "delay": 0, "error": None}
+
+    async def gather_context(video_id, topic, question):
+        calls["count"] += 1
+        await asyncio.sleep(calls["delay"])
+        if calls["error"]:
+            raise calls["error"]
+        return CONTEXT
+
+    monkeypatch.setattr(qa, "gather_context", gather_context)
+    return calls
+
+
+def make_client():
+    app = FastAPI()
+    app.include_router(qa.router)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def parse_sse(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+async def stream(client, params=PARAMS):
+    response = await client.get("/generate-answer/stream", params=params)
+    return response, parse_sse(response.text) if response.status_code == 200 else None
+
+
+def run(*requests):
+    async def go():
+        async with make_client() as client:
+            return await asyncio.gather(*(request(client) for request in requests))
+    return asyncio.run(go())
+
+
+def test_events_arrive_as_context_tokens_then_done(gemini, context):
+    (response, events), = run(stream)
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert [name for name, _ in events] == ["context"] + ["token"] * len(TOKENS) + ["done"]
+    assert events[0][1] == {"passages": [{"start": 75.0, "end": 80.0}], "sources": CONTEXT["sources"], "cache": "miss"}
+    assert "".join(data["text"] for name, data in events if name == "token") == "".join(TOKENS)
+    assert set(events[-1][1]) == {"context_ms", "ttft_ms", "total_ms"}
+
+
+def test_ttft_is_measured_from_the_model_call(gemini, context):
+    context["delay"] = 0.3
+    (_, events), = run(stream)
+
+    done = events[-1][1]
+    assert done["context_ms"] >= 300
+    assert done["ttft_ms"] < 300
+    assert done["total_ms"] >= done["context_ms"] + done["ttft_ms"]
+
+
+def test_a_finished_answer_is_replayed_from_the_cache(gemini, context):
+    async def twice(client):
+        return [await stream(client) for _ in range(2)]
+
+    (first, second), = run(twice)
+    events = second[1]
+
+    assert gemini.streams == 1
+    assert context["count"] == 1
+    assert [name for name, _ in events] == ["context", "token", "done"]
+    assert events[0][1]["cache"] == "hit"
+    assert events[1][1]["text"] == "".join(TOKENS).strip()
+    assert events[2][1]["ttft_ms"] is None
+
+
+def test_concurrent_identical_questions_share_one_model_stream(gemini, context):
+    results = run(*[stream] * 4)
+
+    assert gemini.streams == 1
+    assert context["count"] == 1
+    statuses = sorted(events[0][1]["cache"] for _, events in results)
+    assert statuses == ["coalesced"] * 3 + ["miss"]
+    tokens = [[data["text"] for name, data in events if name == "token"] for _, events in results]
+    assert tokens == [TOKENS] * 4
+
+
+def test_a_plain_request_joins_a_stream_in_progress(gemini, context):
+    async def plain(client):
+        await asyncio.sleep(0.03)  # after the stream has started
+        return await client.get("/generate-answer", params=PARAMS)
+
+    (_, events), answer = run(stream, plain)
+
+    assert gemini.streams == 1
+    assert answer.status_code == 200
+    assert answer.json()["answer"] == "".join(TOKENS).strip()
+    assert answer.json()["cache"] == "coalesced"
+
+
+def test_a_failed_stream_ends_with_an_error_and_is_not_cached(gemini, context):
+    gemini.fail_after, gemini.error = 2, ResourceExhausted("quota")
+
+    async def twice(client):
+        return [await stream(client) for _ in range(2)]
+
+    (first, second), = run(twice)
+
+    assert [name for name, _ in first[1]] == ["context", "token", "token", "error"]
+    assert first[1][-1][1]["status"] == 429
+    # The partial answer was not cached: the next request calls the model again
+    assert second[1][0][1]["cache"] == "miss"
+    assert gemini.streams == 2
+    assert gemini.closed == 2
+
+
+def test_a_partial_answer_is_not_cached_when_the_reader_leaves(gemini, context):
+    cache = qa.answer_cache
+
+    async def go():
+        status, events = cache.stream(*PARAMS.values(), lambda: qa._stream_answer(*PARAMS.values()), qa._replay_answer)
+        flight = next(iter(cache.streams.values()))
+        received = [await events.__anext__() for _ in range(2)]
+        await events.aclose()  # what a client disconnect does to the response body
+        await asyncio.gather(flight.task, return_exceptions=True)
+        return status, received, flight
+
+    status, received, flight = asyncio.run(go())
+
+    assert status == "miss"
+    assert [name for name, _ in received] == ["context", "token"]
+    assert flight.task.cancelled()
+    assert gemini.closed == 1
+    assert cache.lookup(*PARAMS.values()) == (None, "miss")
+    assert cache.streams == {}
+
+
+def test_missing_transcript_is_a_404_before_streaming(gemini, context):
+    context["error"] = TranscriptUnavailable("v1", "TranscriptsDisabled")
+    (response, _), = run(stream)
+
+    assert response.status_code == 404
+    assert gemini.streams == 0
@@ -0,0 +1,48 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import auth, lectures
+from app.db.repositories import save_user_lecture
+
+
+def make_client():
+    app = FastAPI()
+    app.include_router(auth.router)
+    app.include_router(lectures.router)
+    return TestClient(app)
+
+
+def signup(client, username="ada", email="ada@example.com", password="secret"):
+    return client.post("/signup", json={"username": username, "email": email, "password": password})
+
+
+def test_signup_then_login(db):
+    client = make_client()
+    response = signup(client)
+    assert response.status_code == 200
+    assert response.json()["token"]
+
+    response = client.post("/login", json={"email": "ada@example.com", "password": "secret"})
+    assert response.status_code == 200
+    assert client.post("/login", json={"email": "ada@example.com", "password": "wrong"}).status_code == 401
+
+
+def test_duplicate_signup_is_rejected(db):
+    client = make_client()
+    signup(client)
+    assert signup(client, username="other").status_code == 400
+
+
+def test_user_lectures_requires_a_valid_token(db):
+    client = make_client()
+    user = signup(client).json()
+    assert client.get("/user/lectures").status_code == 401
+    assert client.get("/user/lectures", headers={"Authorization": "Bearer junk"}).status_code == 401
+
+    asyncio.run(save_user_lecture(user["user_id"], "algebra", [{"videoId": "a", "status": "todo"}]))
+    asyncio.run(save_user_lecture("someone-else", "private", []))
+    response = client.get("/user/lectures", headers={"Authorization": f"Bearer {user['token']}"})
+    assert response.status_code == 200
+    assert [lecture["topic"] for lecture in response.json()["lectures"]] == ["algebra"]
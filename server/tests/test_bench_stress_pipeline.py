@@ -0,0 +1,55 @@
+import json
+import os
+import sys
+
+import pytest
+
+from benchmarks import bench_stress_pipeline as bench
+
+
+def run_bench(monkeypatch, *argv):
+    monkeypatch.setattr(sys, "argv", ["bench_stress_pipeline", "--modes", "calculator", "--trials", "5", *argv])
+    bench.main()
+
+
+@pytest.fixture
+def baseline(tmp_path, monkeypatch):
+    path = tmp_path / "baseline.json"
+    run_bench(monkeypatch, "--save-baseline", str(path))
+    return path
+
+
+def rewrite(path, **metrics):
+    report = json.loads(path.read_text())
+    report["results"]["calculator"].update(metrics)
+    path.write_text(json.dumps(report))
+
+
+def test_compare_passes_within_tolerance(baseline, monkeypatch):
+    # Timings from a 5-signal run are noisy; widen the baseline so only the exit path is tested
+    rewrite(baseline, frames_per_sec=1, p50_ms=1e9, p99_ms=1e9, peak_rss_mb=1e9)
+    run_bench(monkeypatch, "--compare", str(baseline))
+
+
+def test_compare_exits_non_zero_on_throughput_regression(baseline, monkeypatch, capsys):
+    rewrite(baseline, frames_per_sec=1e12, p50_ms=1e9, p99_ms=1e9, peak_rss_mb=1e9)
+    with pytest.raises(SystemExit) as exc:
+        run_bench(monkeypatch, "--compare", str(baseline))
+    assert exc.value.code == 1
+    assert "calculator.frames_per_sec" in capsys.readouterr().out
+
+
+def test_strict_compare_fails_on_changed_outputs(baseline, monkeypatch):
+    rewrite(baseline, frames_per_sec=1, p50_ms=1e9, p99_ms=1e9, peak_rss_mb=1e9, outputs_digest="0" * 16)
+    run_bench(monkeypatch, "--compare", str(baseline))
+    with pytest.raises(SystemExit) as exc:
+        run_bench(monkeypatch, "--compare", str(baseline), "--strict")
+    assert exc.value.code == 1
+
+
+def test_committed_baseline_covers_the_checked_metrics():
+    with open(os.path.join(os.path.dirname(bench.__file__), "baseline.json")) as f:
+        report = json.load(f)
+    for mode in ("calculator", "endpoint"):
+        for metric, _, _ in bench.CHECKS:
+            assert report["results"][mode][metric] is not None
@@ -0,0 +1,51 @@
+import inspect
+
+import numpy as np
+import pytest
+
+from app.core.config import FACE_DETECTION_MIN_CONFIDENCE
+from app.services import face_localizer
+from app.services.face_localizer import (
+    DeepFaceLocalizer,
+    HaarCascadeLocalizer,
+    YuNetLocalizer,
+    get_face_localizer,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_localizers(monkeypatch):
+    monkeypatch.setattr(face_localizer, "_localizers", {})
+
+
+def test_selects_and_reuses_the_requested_backend():
+    localizer = get_face_localizer("HAAR")
+    assert isinstance(localizer, HaarCascadeLocalizer)
+    assert get_face_localizer("haar") is localizer
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="Unknown face detector backend"):
+        get_face_localizer("mtcnn")
+
+
+def test_yunet_without_its_model_names_the_setting():
+    with pytest.raises(FileNotFoundError, match="YUNET_MODEL_PATH"):
+        YuNetLocalizer(model_path="/nonexistent/yunet.onnx")
+
+
+def test_yunet_without_its_model_falls_back_to_haar(monkeypatch):
+    monkeypatch.setitem(face_localizer.LOCALIZER_BACKENDS, "yunet", lambda: YuNetLocalizer(model_path="/nonexistent/yunet.onnx"))
+    localizer = get_face_localizer("yunet")
+    assert isinstance(localizer, HaarCascadeLocalizer)
+    assert get_face_localizer("yunet") is localizer  # the fallback is cached, warned about once
+
+
+def test_haar_finds_nothing_in_a_blank_frame():
+    assert get_face_localizer("haar").detect(np.zeros((240, 320, 3), dtype=np.uint8)) == []
+
+
+def test_deepface_uses_the_shared_confidence_threshold():
+    # Same default as YuNet, so switching backends keeps the filtering threshold
+    for localizer in (DeepFaceLocalizer, YuNetLocalizer):
+        assert inspect.signature(localizer).parameters["min_confidence"].default == FACE_DETECTION_MIN_CONFIDENCE
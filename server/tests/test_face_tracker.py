@@ -0,0 +1,60 @@
+import numpy as np
+
+from app.services.face_tracker import FaceTracker
+from benchmarks.synthetic import SyntheticFaceLocalizer, synthetic_face_frames
+
+
+class CountingLocalizer(SyntheticFaceLocalizer):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def detect(self, rgb_frame):
+        self.calls += 1
+        return super().detect(rgb_frame)
+
+
+def face_frames(seconds=2, fps=30, seed=0):
+    return list(synthetic_face_frames(np.random.default_rng(seed), fps, seconds, 72, size=(320, 240), texture=0.05))
+
+
+def test_tracks_between_keyframes_at_the_redetect_interval():
+    localizer = CountingLocalizer()
+    tracker = FaceTracker(localizer, redetect_interval=10, min_score=0.7, downscale=1.0)
+    frames = face_frames()
+    boxes = [tracker.detect(frame) for frame in frames]
+
+    # A keyframe, then 10 tracked frames, repeating
+    assert tracker.detections == localizer.calls == int(np.ceil(len(frames) / 11))
+    assert tracker.tracked == len(frames) - tracker.detections
+    truth = SyntheticFaceLocalizer()
+    assert all(found == truth.detect(frame)[:1] for found, frame in zip(boxes, frames))
+
+
+def test_downscaled_tracking_stays_close_to_the_face():
+    tracker = FaceTracker(SyntheticFaceLocalizer(), redetect_interval=15, min_score=0.7, downscale=0.5)
+    truth = SyntheticFaceLocalizer()
+    for frame in face_frames():
+        (x, y, w, h), = tracker.detect(frame)
+        tx, ty, tw, th = truth.detect(frame)[0]
+        assert abs(x - tx) <= 3 and abs(y - ty) <= 3 and (w, h) == (tw, th)
+    assert tracker.tracked > tracker.detections
+
+
+def test_recovers_after_losing_the_face():
+    rng = np.random.default_rng(1)
+    frames = face_frames(seconds=1)
+    blank = [np.clip(rng.normal(40, 8, frames[0].shape), 0, 255).astype(np.uint8) for _ in range(5)]
+    tracker = FaceTracker(SyntheticFaceLocalizer(), redetect_interval=30, min_score=0.7, downscale=1.0)
+
+    assert all(tracker.detect(frame) for frame in frames[:10])
+    # The template no longer matches, so the tracker re-detects, finds nothing and resets
+    assert all(tracker.detect(frame) == [] for frame in blank)
+    assert tracker.box is None
+    detections = tracker.detections
+    found = tracker.detect(frames[10])
+    assert found == SyntheticFaceLocalizer().detect(frames[10])[:1]
+    assert tracker.detections == detections + 1
+    tracked = tracker.tracked
+    assert tracker.detect(frames[11])
+    assert tracker.tracked == tracked + 1  # back to tracking from the new keyframe
@@ -0,0 +1,90 @@
+import json
+import struct
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import stress
+from app.services.frame_ingest import FrameStreamError, parse_frame_stream, parse_fps
+from benchmarks.synthetic import encode_jpeg
+
+
+def stream(header, *frames, prefixed=True):
+    raw_header = json.dumps(header).encode() if isinstance(header, dict) else header
+    body = struct.pack(">I", len(raw_header)) + raw_header
+    for frame in frames:
+        body += (struct.pack(">I", len(frame)) if prefixed else b"") + frame
+    return body
+
+
+def test_jpeg_frames_are_sliced_without_copying():
+    jpegs = [encode_jpeg(np.full((8, 8, 3), value, dtype=np.uint8)) for value in (10, 200)]
+    header, frames = parse_frame_stream(stream({"fps": 30}, *jpegs))
+    assert header == {"fps": 30, "format": "jpeg"}
+    assert [bytes(frame) for frame in frames] == jpegs
+    assert all(isinstance(frame, memoryview) for frame in frames)
+
+
+def test_rgb_frames_become_an_array_view():
+    pixels = np.arange(2 * 3 * 4 * 3, dtype=np.uint8).reshape(2, 3, 4, 3)
+    header, frames = parse_frame_stream(stream({"fps": 10, "format": "rgb", "width": 4, "height": 3}, pixels.tobytes(), prefixed=False))
+    assert frames.shape == (2, 3, 4, 3)
+    np.testing.assert_array_equal(frames, pixels)
+
+
+@pytest.mark.parametrize("body, message", [
+    (b"\x00\x00", "too short"),
+    (struct.pack(">I", 100) + b"{}", "exceeds stream size"),
+    (stream(b"{not json"), "Invalid JSON header"),
+    (stream(b"[1, 2]"), "must be a JSON object"),
+    (stream({"fps": 0}), "fps must be between"),
+    (stream({"fps": "ten"}), "fps must be an integer"),
+    (stream({"fps": 10, "format": "png"}), "Unknown frame format"),
+    (stream({"fps": 10, "format": "rgb"}), "requires integer 'width' and 'height'"),
+    (stream({"fps": 10, "format": "rgb", "width": 2, "height": 2}, b"\x00" * 13, prefixed=False), "not a whole number"),
+])
+def test_bad_headers_are_rejected(body, message):
+    with pytest.raises(FrameStreamError, match=message):
+        parse_frame_stream(body)
+
+
+def test_truncated_frames_are_rejected():
+    complete = stream({"fps": 10}, b"abcdef")
+    with pytest.raises(FrameStreamError, match="Frame 1 is truncated"):
+        parse_frame_stream(complete[:-2])
+    with pytest.raises(FrameStreamError, match="Truncated length prefix for frame 2"):
+        parse_frame_stream(complete + b"\x00\x00")
+
+
+def test_frame_count_is_capped():
+    body = stream({"fps": 10}, b"a", b"b", b"c")
+    assert len(parse_frame_stream(body, max_frames=3)[1]) == 3
+    with pytest.raises(FrameStreamError, match="Too many frames"):
+        parse_frame_stream(body, max_frames=2)
+
+
+def test_parse_fps_defaults_and_accepts_strings():
+    assert parse_fps(None) == 10
+    assert parse_fps("25") == 25
+
+
+def make_client():
+    app = FastAPI()
+    app.include_router(stress.router)
+    return TestClient(app)
+
+
+def test_upload_and_binary_reject_a_bad_fps_the_same_way():
+    client = make_client()
+    upload = client.post("/analyze-stress/upload", files=[("frames", ("f.jpg", b"x", "image/jpeg"))], data={"fps": "ten"})
+    binary = client.post("/analyze-stress/binary", content=stream({"fps": "ten"}, b"x"))
+    assert upload.status_code == binary.status_code == 400
+    assert upload.json() == binary.json()
+
+
+def test_binary_rejects_an_oversized_body_before_parsing(monkeypatch):
+    monkeypatch.setattr(stress, "STRESS_MAX_BODY_BYTES", 64)
+    response = make_client().post("/analyze-stress/binary", content=stream({"fps": 10}, b"x" * 100))
+    assert response.status_code == 413
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from app.services.heart_metrics import ESTIMATORS, make_calculator, pulse_signal
+from benchmarks.synthetic import synthetic_rgb_trace
+
+
+def session_signals(fps, seconds, count=6, method="green", seed=0):
+    rng = np.random.default_rng(seed)
+    return np.array([
+        pulse_signal(synthetic_rgb_trace(rng, fps, seconds, bpm), method, fps)
+        for bpm in rng.uniform(55, 110, count)
+    ])
+
+
+def assert_same_metrics(batched, single):
+    assert len(batched) == len(single)
+    for batch_row, single_row in zip(batched, single):
+        # (hr, sdnn, rmssd, bsi, lf_hf)
+        np.testing.assert_allclose(batch_row, single_row, rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize("estimator", sorted(ESTIMATORS))
+@pytest.mark.parametrize("fps,seconds,method", [(30, 20, "green"), (15, 12, "chrom"), (10, 30, "pos")])
+def test_batch_matches_per_signal_estimates(estimator, fps, seconds, method):
+    calculator = make_calculator(estimator, fps)
+    signals = session_signals(fps, seconds, method=method)
+
+    single = [calculator.estimate_from_signal(signal) for signal in signals]
+    batched = calculator.estimate_batch(signals)
+
+    assert_same_metrics(batched, single)
+    # The seeded traces carry a real pulse, so this isn't comparing zeros
+    assert all(row[0] > 0 for row in single)
+
+
+@pytest.mark.parametrize("estimator", sorted(ESTIMATORS))
+@pytest.mark.parametrize("samples", [0, 1, 2])
+def test_too_short_signals_are_all_zero_on_both_paths(estimator, samples):
+    calculator = make_calculator(estimator, 30)
+    signals = np.zeros((3, samples))
+
+    single = [calculator.estimate_from_signal(signal) for signal in signals]
+    batched = calculator.estimate_batch(signals)
+
+    assert single == batched == [(0, 0, 0, 0, 0)] * 3
+
+
+@pytest.mark.parametrize("estimator", sorted(ESTIMATORS))
+def test_flat_signals_match_alongside_real_ones(estimator):
+    calculator = make_calculator(estimator, 30)
+    signals = session_signals(30, 10, count=2)
+    # A constant row, a zero row and a linear ramp all detrend to float rounding noise
+    flat = np.array([np.full(signals.shape[1], 120.0), np.zeros(signals.shape[1]), np.linspace(100, 110, signals.shape[1])])
+    signals = np.vstack([signals, flat])
+
+    single = [calculator.estimate_from_signal(signal) for signal in signals]
+    batched = calculator.estimate_batch(signals)
+
+    assert_same_metrics(batched, single)
+    # Rounding residue from detrending must not be read as a pulse on either path
+    assert single[2:] == batched[2:] == [(0, 0, 0, 0, 0)] * 3
+
+
+def test_batch_rejects_one_dimensional_input():
+    with pytest.raises(ValueError):
+        make_calculator("peaks", 30).estimate_batch(np.zeros(100))
@@ -0,0 +1,124 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.services.lecture_cache import TopicResultCache
+
+VIDEOS = [{"videoId": "v1", "title": "Graph theory 1"}]
+FRESH_VIDEOS = [{"videoId": "v2", "title": "Graph theory 2"}]
+
+
+class Fetcher:
+    # Counts upstream fetches; blocks each one until released when `gate` is set
+    def __init__(self, videos, gate=None):
+        self.videos = videos
+        self.gate = gate
+        self.calls = 0
+
+    async def __call__(self, topic, usage):
+        self.calls += 1
+        usage["quota_units"] = 100
+        if self.gate is not None:
+            await self.gate.wait()
+        return self.videos
+
+
+def mongo_doc(videos, age_seconds):
+    fetched_at = datetime.now(timezone.utc) - timedelta(seconds=age_seconds)
+    return {"_id": "graph theory", "topic": "Graph Theory", "videos": videos, "quota_cost": 100,
+            "fetched_at": fetched_at, "expires_at": fetched_at + timedelta(hours=1)}
+
+
+def test_stale_entry_is_served_while_one_background_refresh_runs(db):
+    async def run():
+        cache = TopicResultCache(ttl=0.05, stale_ttl=60)
+        assert await cache.get("Graph Theory", Fetcher(VIDEOS)) == VIDEOS
+        await asyncio.sleep(0.1)
+
+        refresh = Fetcher(FRESH_VIDEOS, gate=asyncio.Event())
+        # Every caller gets the stale videos straight away while the refresh is held open
+        served = await asyncio.gather(*(cache.lookup(" graph  THEORY ", refresh) for _ in range(5)))
+        in_flight = cache.flights.in_flight("graph theory")
+        refresh.gate.set()
+        await cache.flights.wait("graph theory")
+        after = await cache.lookup("Graph Theory", refresh)
+        stored = await db.lecture_topic_cache.find_one({"_id": "graph theory"})
+        return cache, served, in_flight, refresh, after, stored
+
+    cache, served, in_flight, refresh, after, stored = asyncio.run(run())
+    assert served == [VIDEOS] * 5
+    assert in_flight
+    assert refresh.calls == 1
+    assert after == FRESH_VIDEOS
+    assert stored["videos"] == FRESH_VIDEOS
+    assert cache.counters["stale_hits"] == 5
+    assert cache.counters["refreshes"] == 1
+
+
+def test_entries_past_the_stale_window_are_misses(db):
+    async def run():
+        cache = TopicResultCache(ttl=0.02, stale_ttl=0.02)
+        await cache.get("Graph Theory", Fetcher(VIDEOS))
+        # Also age the Mongo copy out of the stale window, as the TTL index would
+        await db.lecture_topic_cache.update_one({"_id": "graph theory"}, {"$set": {"fetched_at": datetime.now(timezone.utc) - timedelta(seconds=1)}})
+        await asyncio.sleep(0.05)
+        return await cache.lookup("Graph Theory", Fetcher(FRESH_VIDEOS))
+
+    assert asyncio.run(run()) is None
+
+
+def test_mongo_hit_is_promoted_to_memory(db):
+    async def run():
+        await db.lecture_topic_cache.insert_one(mongo_doc(VIDEOS, age_seconds=10))
+        cache = TopicResultCache(ttl=3600, stale_ttl=60)
+        fetch = Fetcher(FRESH_VIDEOS)
+        first = await cache.lookup("Graph Theory", fetch)
+        in_memory = "graph theory" in cache.memory
+        # The second read must come from memory: the Mongo copy is gone
+        await db.lecture_topic_cache.delete_many({})
+        second = await cache.lookup("Graph Theory", fetch)
+        return cache, fetch, first, in_memory, second
+
+    cache, fetch, first, in_memory, second = asyncio.run(run())
+    assert first == second == VIDEOS
+    assert in_memory
+    assert cache.counters["mongo_hits"] == 1
+    assert cache.counters["memory_hits"] == 1
+    assert cache.counters["quota_units_saved"] == 200
+    assert fetch.calls == 0
+
+
+def test_promoted_entry_keeps_its_mongo_age(db):
+    async def run():
+        # Older than ttl but inside the stale window: promoted as stale, so it is refreshed
+        await db.lecture_topic_cache.insert_one(mongo_doc(VIDEOS, age_seconds=120))
+        cache = TopicResultCache(ttl=60, stale_ttl=3600)
+        fetch = Fetcher(FRESH_VIDEOS)
+        served = await cache.lookup("Graph Theory", fetch)
+        await cache.flights.wait("graph theory")
+        return cache, fetch, served, await cache.lookup("Graph Theory", fetch)
+
+    cache, fetch, served, refreshed = asyncio.run(run())
+    assert served == VIDEOS
+    assert refreshed == FRESH_VIDEOS
+    assert fetch.calls == 1
+    assert cache.counters["stale_hits"] == 1
+
+
+def test_one_workers_fetch_is_shared_with_another_through_mongo(db):
+    async def run():
+        worker_a = TopicResultCache(ttl=3600, stale_ttl=60)
+        worker_b = TopicResultCache(ttl=3600, stale_ttl=60)
+        fetch = Fetcher(VIDEOS)
+        await worker_a.get("Graph Theory", fetch)
+        stored_at = time.time()
+        videos = await worker_b.get("graph theory", fetch)
+        _, _, promoted_at = worker_b.memory.get("graph theory")
+        return fetch, videos, stored_at, promoted_at, worker_b
+
+    fetch, videos, stored_at, promoted_at, worker_b = asyncio.run(run())
+    assert videos == VIDEOS
+    assert fetch.calls == 1
+    assert worker_b.counters["mongo_hits"] == 1
+    # Promotion keeps the original fetch time rather than restarting the ttl
+    assert promoted_at <= stored_at
@@ -0,0 +1,69 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api import lectures
+from app.services.cache import TTLCache
+from app.services.lecture_cache import topic_cache
+from app.services.video_store import video_store
+from app.services.wikipedia_source import wikipedia_cache
+from benchmarks import fake_youtube
+from tests.test_youtube_client import make_client
+
+
+@pytest.fixture
+def youtube(db, monkeypatch):
+    monkeypatch.setattr(fake_youtube, "LATENCY_MS", 20)
+    monkeypatch.setattr(fake_youtube, "FAILURE_RATE", 0)
+    monkeypatch.setattr(fake_youtube, "RESULTS_PER_QUERY", 200)
+    fake_youtube.reset()
+    client = make_client()
+    monkeypatch.setattr(lectures, "youtube_client", client)
+    monkeypatch.setattr(lectures, "YOUTUBE_API_KEY", "fake")
+    monkeypatch.setattr(video_store, "client", client)
+    monkeypatch.setattr(topic_cache, "memory", TTLCache(maxsize=16, ttl=topic_cache.ttl, stale_ttl=topic_cache.stale_ttl))
+    monkeypatch.setattr(wikipedia_cache, "prefetch", lambda topics: None)
+    yield fake_youtube
+    fake_youtube.reset()
+
+
+def make_app():
+    app = FastAPI()
+    app.include_router(lectures.router)
+    return app
+
+
+async def stream(client, topic, limit=100):
+    response = await client.get("/api/generate-lecture/stream", params={"topic": topic, "limit": limit})
+    events = [json.loads(line) for line in response.text.splitlines()]
+    return [event["data"] for event in events if event["event"] == "video"], events[-1]
+
+
+def test_concurrent_streams_for_a_cold_topic_share_one_fetch(youtube):
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=make_app()), base_url="http://test") as client:
+            results = await asyncio.gather(*(stream(client, "graph theory") for _ in range(5)))
+            get_result = (await client.get("/api/generate-lecture", params={"topic": "graph theory"})).json()
+        return results, get_result
+
+    results, get_result = asyncio.run(go())
+    leader_videos = results[0][0]
+    assert leader_videos
+    assert all(videos == leader_videos for videos, _ in results)
+    assert sorted(done["data"]["source"] for _, done in results) == ["coalesced"] * 4 + ["youtube"]
+    assert youtube.stats["search"] <= lectures.MAX_SEARCH_PAGES  # one fetch, not five
+    assert [video["videoId"] for video in get_result["videos"]] == [video["videoId"] for video in leader_videos]
+
+
+def test_a_smaller_stream_joins_a_larger_one_in_flight(youtube):
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=make_app()), base_url="http://test") as client:
+            return await asyncio.gather(stream(client, "set theory", 100), stream(client, "set theory", 5))
+
+    (full, _), (limited, done) = asyncio.run(go())
+    assert limited == full[:5]
+    assert done["data"] == {"count": 5, "source": "coalesced"}
+    assert youtube.stats["search"] <= lectures.MAX_SEARCH_PAGES
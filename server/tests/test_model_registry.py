@@ -0,0 +1,62 @@
+import json
+import os
+
+import pytest
+
+from app.services import model_registry as registry_module
+from app.services.frame_pipeline import FramePipeline
+from app.services.model_registry import ModelRegistry
+
+
+def loaded_registry():
+    # Stands in for load(): the configured detector may not be installed here
+    registry = ModelRegistry()
+    registry.models = {"face_localizer": {"backend": "haar", "load_seconds": 0.0}}
+    registry.loaded_pid = os.getpid()
+    registry.ready = True
+    return registry
+
+
+def status_in_forked_child(registry):
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        with os.fdopen(write_fd, "w") as pipe:
+            json.dump(registry.status(), pipe)
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as pipe:
+        status = json.load(pipe)
+    os.waitpid(pid, 0)
+    return status
+
+
+def test_loading_in_this_process_is_not_reported_as_shared():
+    status = loaded_registry().status()
+    assert status["loaded_pid"] == status["pid"]
+    assert status["preloaded_before_fork"] is False
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_a_process_forked_after_load_reports_preloaded_models():
+    registry = loaded_registry()
+    status = status_in_forked_child(registry)
+    assert status["pid"] != status["loaded_pid"] == os.getpid()
+    assert status["preloaded_before_fork"] is True
+    # The parent itself was not forked
+    assert registry.status()["preloaded_before_fork"] is False
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_forking_before_load_is_not_reported_as_shared():
+    registry = ModelRegistry()
+    status = status_in_forked_child(registry)
+    assert status["preloaded_before_fork"] is False
+
+
+@pytest.mark.parametrize("start_method, workers, shares", [("spawn", 2, False), ("fork", 2, True), ("fork", 0, False)])
+def test_status_reports_the_frame_pool_start_method(monkeypatch, start_method, workers, shares):
+    monkeypatch.setattr(registry_module, "frame_pipeline", FramePipeline(pool_size=workers, start_method=start_method))
+    status = loaded_registry().status()
+    assert status["frame_pool"] == {"workers": workers, "start_method": start_method, "shares_models": shares}
@@ -0,0 +1,120 @@
+import asyncio
+from collections import Counter
+
+import pytest
+
+from app.services.passage_index import (
+    BM25Index,
+    PassageIndexCache,
+    chunk_segments,
+    estimate_tokens,
+    select_passages,
+    tokenize,
+)
+
+# One passage per line: a lecture that keeps coming back to "matrix", with each topic's
+# distinctive terms appearing once
+LECTURE = [
+    "Welcome back. Today we continue with the matrix, the matrix product and more matrix notation.",
+    "Remember a matrix is a grid of numbers; a matrix times a matrix is another matrix, matrix by matrix.",
+    "Row reduction turns a matrix into echelon form so we can read off pivot columns.",
+    "The determinant of a matrix measures how it scales volume; a zero determinant means the matrix is singular.",
+    "An eigenvector keeps its direction under the matrix; the eigenvalue is the factor it is stretched by.",
+    "To find eigenvalues solve the characteristic polynomial, the determinant of A minus lambda I.",
+    "Orthogonal matrices preserve length, and Gram-Schmidt builds an orthonormal basis.",
+    "Singular value decomposition factors any matrix into rotation, scaling and rotation.",
+]
+SEGMENTS = [{"text": text, "start": n * 30.0, "duration": 30.0} for n, text in enumerate(LECTURE)]
+
+# (question, the passage that answers it)
+QUESTIONS = [
+    ("what is an eigenvalue of a matrix", 4),
+    ("how do I compute eigenvalues with the characteristic polynomial", 5),
+    ("what does the matrix determinant tell me about volume", 3),
+    ("how does gram schmidt give an orthonormal basis", 6),
+    ("what is singular value decomposition of a matrix", 7),
+    ("what are pivot columns in echelon form", 2),
+]
+
+
+def index():
+    return BM25Index(chunk_segments(SEGMENTS, target_chars=1))
+
+
+def overlap_rank(passages, query):
+    # Naive baseline: rank by raw count of query-term occurrences, no idf or length norm
+    terms = set(tokenize(query))
+    counts = [sum(n for term, n in Counter(tokenize(p["text"])).items() if term in terms) for p in passages]
+    return sorted(range(len(passages)), key=lambda i: -counts[i])
+
+
+def test_chunks_keep_segment_times():
+    passages = chunk_segments(SEGMENTS, target_chars=200)
+    assert passages[0]["start"] == 0.0
+    assert passages[-1]["end"] == len(SEGMENTS) * 30.0
+    assert " ".join(p["text"] for p in passages) == " ".join(LECTURE)
+
+
+def test_bm25_beats_the_naive_baselines_on_a_fixed_corpus():
+    bm25 = index()
+    budget = estimate_tokens(LECTURE[0]) * 2
+
+    def hits(rank):
+        return sum(rank(question)[0] == answer for question, answer in QUESTIONS)
+
+    bm25_hits = hits(lambda q: [i for _, i in bm25.search(q)])
+    overlap_hits = hits(lambda q: overlap_rank(bm25.passages, q))
+    assert bm25_hits == len(QUESTIONS)
+    assert overlap_hits < bm25_hits
+
+    # Against the old truncation (the opening passages that fit the budget)
+    for question, answer in QUESTIONS:
+        selected = select_passages(bm25, question, token_budget=budget, top_k=2)
+        assert LECTURE[answer] in [p["text"] for p in selected]
+    assert sum(LECTURE[answer] in LECTURE[:2] for _, answer in QUESTIONS) == 0
+
+
+def test_selected_passages_are_in_playback_order_and_within_budget():
+    selected = select_passages(index(), "eigenvalue eigenvector determinant", token_budget=200, top_k=3)
+    starts = [p["start"] for p in selected]
+    assert starts == sorted(starts)
+    assert sum(estimate_tokens(p["text"]) for p in selected) <= 200
+
+
+@pytest.mark.parametrize("query", ["", "   ", "what is it and how do you know", "zzz qqq"])
+def test_queries_without_indexed_terms_fall_back_to_the_opening_passages(query):
+    bm25 = index()
+    assert bm25.search(query) == []
+    budget = estimate_tokens(LECTURE[0]) + estimate_tokens(LECTURE[1])
+    selected = select_passages(bm25, query, token_budget=budget, top_k=5)
+    assert [p["text"] for p in selected] == LECTURE[:2]
+
+
+@pytest.mark.parametrize("segments", [[], [{"text": "  \n ", "start": 0.0, "duration": 1.0}]])
+def test_empty_transcripts_give_no_passages(segments):
+    assert chunk_segments(segments) == []
+    bm25 = BM25Index(chunk_segments(segments))
+    assert bm25.search("eigenvalue") == []
+    assert select_passages(bm25, "eigenvalue") == []
+    assert select_passages(bm25, "") == []
+
+
+def test_oversized_single_passage_is_trimmed_to_the_budget():
+    bm25 = BM25Index([{"start": 0.0, "end": 60.0, "text": "eigenvalue " * 500}])
+    selected = select_passages(bm25, "eigenvalue", token_budget=50)
+    assert len(selected) == 1
+    assert len(selected[0]["text"]) <= 200
+
+
+def test_index_cache_builds_once_per_video():
+    cache = PassageIndexCache(max_entries=4, ttl=60)
+
+    async def run():
+        first = await cache.get("v1", SEGMENTS)
+        second = await cache.get("v1", [])
+        empty = await cache.get("v2", [])
+        return first, second, empty
+
+    first, second, empty = asyncio.run(run())
+    assert first is second
+    assert empty.passages == []
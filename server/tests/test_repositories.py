@@ -0,0 +1,57 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from app.db import repositories
+from app.db.migrations import ensure_indexes
+
+
+def test_create_and_find_user(db):
+    user_id = asyncio.run(repositories.create_user("ada", "ada@example.com", "hash"))
+    user = asyncio.run(repositories.find_user_by_email("ada@example.com"))
+    assert str(user["_id"]) == user_id
+    assert asyncio.run(repositories.find_user_by_email_or_username("other@example.com", "ada"))
+    assert asyncio.run(repositories.find_user_by_email_or_username("other@example.com", "other")) is None
+
+
+def test_unique_indexes_reject_duplicate_signup(db):
+    asyncio.run(ensure_indexes(db))
+    asyncio.run(repositories.create_user("ada", "ada@example.com", "hash"))
+    with pytest.raises(DuplicateKeyError):
+        asyncio.run(repositories.create_user("ada2", "ada@example.com", "hash"))
+
+
+def test_cache_ttl_indexes_land_on_the_cache_collections(db):
+    asyncio.run(ensure_indexes(db))
+    for collection in (repositories.lecture_topic_cache(), repositories.transcripts(), repositories.wikipedia_summaries()):
+        assert "expires_at_ttl" in asyncio.run(collection.index_information())
+
+
+def test_lecture_summaries_paginate_across_equal_timestamps(db):
+    created_at = datetime(2025, 1, 1)
+    for n in range(5):
+        videos = [{"videoId": str(i), "status": "done" if i < n else "todo"} for i in range(n + 1)]
+        asyncio.run(db["lectures"].insert_one({"user_id": "u1", "topic": f"t{n}", "created_at": created_at, "videos": videos}))
+    asyncio.run(repositories.save_user_lecture("u2", "not mine", []))
+
+    seen, before = [], None
+    while True:
+        page = asyncio.run(repositories.list_user_lecture_summaries("u1", limit=2, before=before))
+        if not page:
+            break
+        seen.extend(page)
+        before = (page[-1]["created_at"], page[-1]["_id"])
+    assert sorted(lecture["topic"] for lecture in seen) == [f"t{n}" for n in range(5)]
+    assert all("videos" not in lecture for lecture in seen)
+    t3 = next(lecture for lecture in seen if lecture["topic"] == "t3")
+    assert t3["video_count"] == 4 and t3["progress"] == {"todo": 1, "inprogress": 0, "done": 3}
+
+
+def test_lecture_summaries_skip_rows_without_a_date(db):
+    asyncio.run(repositories.save_user_lecture("u1", "dated", []))
+    asyncio.run(db["lectures"].insert_one({"user_id": "u1", "topic": "legacy", "created_at": "2024-05-01", "videos": []}))
+    asyncio.run(db["lectures"].insert_one({"user_id": "u1", "topic": "undated", "videos": []}))
+    page = asyncio.run(repositories.list_user_lecture_summaries("u1", limit=10))
+    assert [lecture["topic"] for lecture in page] == ["dated"]
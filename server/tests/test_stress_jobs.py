@@ -0,0 +1,162 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api import stress
+from app.core.security import create_token
+from app.services.stress_jobs import QueueFullError, StressJobQueue
+
+PAYLOAD = {"frames": ["data:image/jpeg;base64,AAAA"], "fps": 10}
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    # Created unstarted: jobs stay queued until a test starts the workers on its own loop
+    queue = StressJobQueue(workers=1, max_queue=10, max_per_user=2, result_ttl=60)
+    monkeypatch.setattr(stress, "stress_job_queue", queue)
+    return queue
+
+
+@pytest.fixture
+def analysis(monkeypatch):
+    calls = []
+
+    async def analyze(frames, fps, estimator, rppg):
+        calls.append(fps)
+        await asyncio.sleep(0.05)
+        return {"avg_heart_rate": 72.0}
+
+    monkeypatch.setattr(stress, "_analyze_encoded_frames", analyze)
+    return calls
+
+
+def make_client():
+    app = FastAPI()
+    app.include_router(stress.router)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def auth_header(user_id):
+    return {"Authorization": f"Bearer {create_token({'sub': user_id, 'email': f'{user_id}@example.com'})}"}
+
+
+def test_full_user_queue_returns_429_with_retry_after(queue):
+    async def run():
+        async with make_client() as client:
+            accepted = [await client.post("/analyze-stress/jobs", json=PAYLOAD, headers=auth_header("ada")) for _ in range(2)]
+            rejected = await client.post("/analyze-stress/jobs", json=PAYLOAD, headers=auth_header("ada"))
+            other_user = await client.post("/analyze-stress/jobs", json=PAYLOAD, headers=auth_header("bob"))
+            return accepted, rejected, other_user
+
+    accepted, rejected, other_user = asyncio.run(run())
+    assert [r.status_code for r in accepted] == [202, 202]
+    assert rejected.status_code == 429
+    assert int(rejected.headers["Retry-After"]) >= 1
+    # The cap is per user: someone else still gets in
+    assert other_user.status_code == 202
+    assert queue.metrics()["rejected"] == 1
+
+
+def test_full_global_queue_returns_429(queue):
+    queue.max_queue = 1
+
+    async def run():
+        async with make_client() as client:
+            first = await client.post("/analyze-stress/jobs", json=PAYLOAD, headers=auth_header("ada"))
+            second = await client.post("/analyze-stress/jobs", json=PAYLOAD, headers=auth_header("bob"))
+            return first, second
+
+    first, second = asyncio.run(run())
+    assert first.status_code == 202
+    assert second.status_code == 429
+    assert "Retry-After" in second.headers
+
+
+def test_workers_round_robin_between_users():
+    order = []
+
+    def work(name):
+        async def run():
+            order.append(name)
+        return run
+
+    async def run():
+        queue = StressJobQueue(workers=1, max_queue=10, max_per_user=10, result_ttl=60)
+        jobs = [await queue.submit("ada", work(f"ada{n}")) for n in range(4)]
+        jobs += [await queue.submit("bob", work(f"bob{n}")) for n in range(2)]
+        jobs.append(await queue.submit("cy", work("cy0")))
+        # Bob's first job is second in line despite ada's burst ahead of it; ada's last runs last
+        assert [queue.queue_position(job) for job in jobs] == [1, 4, 6, 7, 2, 5, 3]
+        await queue.start()
+        await asyncio.gather(*(job.done.wait() for job in jobs))
+        await queue.stop()
+
+    asyncio.run(run())
+    assert order == ["ada0", "bob0", "cy0", "ada1", "bob1", "ada2", "ada3"]
+
+
+def test_queue_rejects_over_the_per_user_cap_directly():
+    async def run():
+        queue = StressJobQueue(workers=1, max_queue=10, max_per_user=1, result_ttl=60)
+        await queue.submit("ada", lambda: asyncio.sleep(0))
+        with pytest.raises(QueueFullError) as exc:
+            await queue.submit("ada", lambda: asyncio.sleep(0))
+        return exc.value
+
+    assert asyncio.run(run()).retry_after >= 1
+
+
+def test_long_poll_returns_when_the_job_finishes(queue, analysis):
+    async def run():
+        await queue.start()
+        try:
+            async with make_client() as client:
+                submitted = (await client.post("/analyze-stress/jobs", json=PAYLOAD)).json()
+                start = time.monotonic()
+                polled = await client.get(f"/analyze-stress/jobs/{submitted['job_id']}", params={"wait": 30})
+                return submitted, polled, time.monotonic() - start
+        finally:
+            await queue.stop()
+
+    submitted, polled, elapsed = asyncio.run(run())
+    assert submitted["status"] == "queued"
+    assert polled.status_code == 200
+    assert polled.json()["status"] == "done"
+    assert polled.json()["result"] == {"avg_heart_rate": 72.0}
+    assert elapsed < 5
+    assert analysis == [10]
+
+
+def test_long_poll_times_out_with_the_queue_position(queue):
+    async def run():
+        async with make_client() as client:
+            job_id = (await client.post("/analyze-stress/jobs", json=PAYLOAD)).json()["job_id"]
+            return await client.get(f"/analyze-stress/jobs/{job_id}", params={"wait": 0.1})
+
+    polled = asyncio.run(run())
+    assert polled.status_code == 200
+    assert polled.json()["status"] == "queued"
+    assert polled.json()["queue_position"] == 1
+
+
+@pytest.mark.parametrize("wait", [30.5, 60, -1])
+def test_long_poll_wait_is_capped_at_30_seconds(queue, wait):
+    async def run():
+        async with make_client() as client:
+            job_id = (await client.post("/analyze-stress/jobs", json=PAYLOAD)).json()["job_id"]
+            return await client.get(f"/analyze-stress/jobs/{job_id}", params={"wait": wait})
+
+    assert asyncio.run(run()).status_code == 422
+
+
+def test_unknown_job_is_404(queue):
+    async def run():
+        async with make_client() as client:
+            return await client.get("/analyze-stress/jobs/does-not-exist", params={"wait": 1})
+
+    response = asyncio.run(run())
+    assert response.status_code == 404
+    assert "not found" in response.json()["detail"]
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from youtube_transcript_api import YouTubeTranscriptApi, TooManyRequests, TranscriptsDisabled
+
+from app.services.transcript_store import (
+    TranscriptStore,
+    TranscriptUnavailable,
+    compress_segments,
+    decompress_segments,
+    segments_version,
+)
+
+SEGMENTS = [{"text": f"line {n} about eigenvalues and eigenvectors", "start": n * 2.5, "duration": 2.5} for n in range(200)]
+
+
+@pytest.fixture
+def youtube(monkeypatch):
+    # get_transcript stand-in; `results` maps video id to segments or an exception to raise
+    calls = []
+    results = {}
+    lock = threading.Lock()
+
+    def get_transcript(video_id):
+        with lock:
+            calls.append(video_id)
+        time.sleep(0.02)  # keeps concurrent requests for one id overlapping
+        result = results.get(video_id, SEGMENTS)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(YouTubeTranscriptApi, "get_transcript", get_transcript)
+    return calls, results
+
+
+def test_segments_round_trip_through_zlib():
+    segments = SEGMENTS + [{"text": "unicode: é ∑ 字", "start": 1.23456, "duration": 0.5}]
+    blob = compress_segments(segments)
+    restored = decompress_segments(blob)
+
+    assert [s["text"] for s in restored] == [s["text"] for s in segments]
+    assert restored[-1]["start"] == 1.23  # times are stored to 10 ms
+    assert len(blob) * 4 < len(json.dumps(segments))
+    assert segments_version(blob) == segments_version(compress_segments(segments))
+
+
+def test_a_second_worker_reads_the_compressed_copy_from_mongo(db, youtube):
+    calls, _ = youtube
+
+    async def run():
+        first = await TranscriptStore().get("v1")
+        other_worker = TranscriptStore()
+        second = await other_worker.get("v1")
+        return first, second, other_worker, await db.transcripts.find_one({"_id": "v1"})
+
+    first, second, other_worker, doc = asyncio.run(run())
+    assert calls == ["v1"]
+    assert [s["text"] for s in second] == [s["text"] for s in first]
+    assert decompress_segments(bytes(doc["segments"])) == second
+    assert other_worker.version("v1") == doc["version"]
+    assert other_worker.counters["mongo_hits"] == 1
+
+
+def test_missing_transcripts_are_cached_until_the_negative_ttl(db, youtube):
+    calls, results = youtube
+    results["v1"] = TranscriptsDisabled("v1")
+
+    async def get(store):
+        with pytest.raises(TranscriptUnavailable) as exc:
+            await store.get("v1")
+        return exc.value
+
+    async def run():
+        store = TranscriptStore(ttl=3600, negative_ttl=0.1)
+        first = await get(store)
+        second = await get(store)
+        fetches_while_cached = len(calls)
+        # Expired in memory and in Mongo (before the TTL monitor would have removed it)
+        await asyncio.sleep(0.15)
+        await get(TranscriptStore(ttl=3600, negative_ttl=0.1))
+        return store, first, second, fetches_while_cached
+
+    store, first, second, fetches_while_cached = asyncio.run(run())
+    assert first.reason == second.reason == "TranscriptsDisabled"
+    assert first is not second
+    assert fetches_while_cached == 1
+    assert store.counters["negative_hits"] == 1
+    assert calls == ["v1", "v1"]
+
+
+def test_rate_limits_are_not_negatively_cached(db, youtube):
+    calls, results = youtube
+    results["v1"] = TooManyRequests("v1")
+
+    async def run():
+        store = TranscriptStore()
+        for _ in range(2):
+            with pytest.raises(TooManyRequests):
+                await store.get("v1")
+        return await db.transcripts.count_documents({})
+
+    assert asyncio.run(run()) == 0
+    assert calls == ["v1", "v1"]
+
+
+def test_prefetch_fetches_each_video_once(db, youtube):
+    calls, _ = youtube
+
+    async def run():
+        store = TranscriptStore()
+        store.prefetch(["a", "b", "a"])
+        store.prefetch(["b", "c"])
+        # A request arriving mid-prefetch joins the same fetch
+        segments = await store.get("a")
+        await asyncio.gather(*store._prefetch_tasks)
+        return store, segments
+
+    store, segments = asyncio.run(run())
+    assert segments == SEGMENTS
+    assert sorted(calls) == ["a", "b", "c"]
+    assert store.stats()["prefetch_pending"] == 0
@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app.services.video_store import VideoMetadataStore
+
+
+def item(video_id, title="Lecture", duration="PT20M", thumbnail="https://i.ytimg.com/x.jpg"):
+    return {
+        "id": video_id,
+        "snippet": {"title": title, "channelTitle": "MIT", "thumbnails": {"high": {"url": thumbnail}}},
+        "contentDetails": {"duration": duration},
+    }
+
+
+class FakeYouTube:
+    # videos.list stand-in: returns the items it knows about, records which ids were asked for
+    def __init__(self, *items):
+        self.items = {i["id"]: i for i in items}
+        self.requested = []
+
+    async def video_details(self, video_ids, usage=None):
+        self.requested.append(list(video_ids))
+        return [self.items[video_id] for video_id in video_ids if video_id in self.items]
+
+
+def lecture_ids(store, video_ids):
+    return [doc["_id"] for doc in asyncio.run(store.lecture_videos(video_ids))]
+
+
+def stored(db, video_id):
+    return asyncio.run(db.video_metadata.find_one({"_id": video_id}))
+
+
+def expire_all(db):
+    # Ages every stored entry past the store's ttl
+    old = datetime.now(timezone.utc) - timedelta(hours=2)
+    asyncio.run(db.video_metadata.update_many({}, {"$set": {"fetched_at": old}}))
+
+
+def test_details_are_upserted_and_fresh_ids_skip_the_api(db):
+    youtube = FakeYouTube(item("a"), item("b"), item("short", duration="PT2M"))
+    store = VideoMetadataStore(client=youtube, ttl=3600)
+
+    assert lecture_ids(store, ["b", "short", "a"]) == ["b", "a"]
+    assert lecture_ids(store, ["a", "b", "c"]) == ["a", "b"]
+    # Only the id not already stored went to the API the second time
+    assert youtube.requested == [["b", "short", "a"], ["c"]]
+    assert stored(db, "a")["duration_seconds"] == 1200
+    assert stored(db, "short")["duration_seconds"] == 120
+    assert store.stats()["store_hits"] == 2
+
+
+def test_expired_details_are_replaced_in_place(db):
+    youtube = FakeYouTube(item("a", title="Old title"))
+    store = VideoMetadataStore(client=youtube, ttl=3600)
+    lecture_ids(store, ["a"])
+    youtube.items["a"] = item("a", title="New title")
+    expire_all(db)
+
+    lecture_ids(store, ["a"])
+
+    assert youtube.requested == [["a"], ["a"]]
+    assert asyncio.run(db.video_metadata.count_documents({})) == 1
+    assert stored(db, "a")["title"] == "New title"
+
+
+def test_unavailable_ids_are_flagged_and_not_requested_again(db):
+    youtube = FakeYouTube(item("a"))
+    store = VideoMetadataStore(client=youtube, ttl=3600)
+
+    assert lecture_ids(store, ["gone", "a"]) == ["a"]
+    assert lecture_ids(store, ["gone", "a"]) == ["a"]
+
+    assert youtube.requested == [["gone", "a"]]
+    doc = stored(db, "gone")
+    assert doc["unavailable"] is True
+    assert "title" not in doc
+
+
+def test_a_video_that_goes_away_and_comes_back_is_replaced_whole(db):
+    youtube = FakeYouTube(item("a"))
+    store = VideoMetadataStore(client=youtube, ttl=3600)
+    lecture_ids(store, ["a"])
+
+    del youtube.items["a"]
+    expire_all(db)
+    assert lecture_ids(store, ["a"]) == []
+    assert set(stored(db, "a")) == {"_id", "unavailable", "fetched_at"}
+
+    youtube.items["a"] = item("a")
+    expire_all(db)
+    assert lecture_ids(store, ["a"]) == ["a"]
+    assert "unavailable" not in stored(db, "a")
@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import time
+
+import pytest
+import wikipedia
+
+from app.services import wikipedia_source
+from app.services.wikipedia_source import WikipediaSummaryCache, summary_version
+
+SUMMARY = "In linear algebra, an eigenvector is a vector that only changes by a scalar factor."
+TTLS = {"summary": 3600, "missing": 0.2, "disambiguation": 0.6}
+
+
+@pytest.fixture
+def wiki(monkeypatch):
+    # wikipedia.summary stand-in; records each lookup and the most run at once
+    calls = []
+    state = {"running": 0, "max_running": 0}
+    lock = threading.Lock()
+
+    def summary(topic, sentences=5, auto_suggest=True):
+        with lock:
+            calls.append(topic)
+            state["running"] += 1
+            state["max_running"] = max(state["max_running"], state["running"])
+        try:
+            time.sleep(0.02)
+            if topic == "Nowhere":
+                raise wikipedia.exceptions.PageError(None, topic)
+            if topic == "Mercury":
+                raise wikipedia.exceptions.DisambiguationError(topic, ["Mercury (planet)", "Mercury (element)", "Mercury (mythology)", "Freddie Mercury"])
+            if topic == "Broken":
+                raise wikipedia.exceptions.WikipediaException("HTTP 503")
+            return SUMMARY
+        finally:
+            with lock:
+                state["running"] -= 1
+
+    monkeypatch.setattr(wikipedia, "summary", summary)
+    return calls, state
+
+
+def test_each_outcome_is_stored_with_its_own_ttl(db, wiki):
+    calls, _ = wiki
+
+    async def run():
+        cache = WikipediaSummaryCache(ttls=TTLS)
+        entries = {topic: await cache.get(topic) for topic in ("Eigenvalues", "Nowhere", "Mercury", "Broken")}
+        docs = {doc["_id"]: doc async for doc in db.wikipedia_summaries.find({})}
+        return cache, entries, docs
+
+    cache, entries, docs = asyncio.run(run())
+    assert {topic: entry["kind"] for topic, entry in entries.items()} == {
+        "Eigenvalues": "summary", "Nowhere": "missing", "Mercury": "disambiguation", "Broken": "error",
+    }
+    assert entries["Eigenvalues"]["version"] == summary_version(SUMMARY)
+    assert "Mercury (planet), Mercury (element), Mercury (mythology)" in entries["Mercury"]["text"]
+    # Errors are never stored
+    assert set(docs) == {"Eigenvalues", "Nowhere", "Mercury"}
+    for topic, doc in docs.items():
+        ttl = (doc["expires_at"] - doc["fetched_at"]).total_seconds()
+        assert ttl == pytest.approx(TTLS[doc["kind"]], abs=1e-3)
+    assert cache.counters["errors"] == 1
+
+
+def test_outcomes_expire_on_their_own_schedule(db, wiki):
+    calls, _ = wiki
+    topics = ("Eigenvalues", "Nowhere", "Mercury", "Broken")
+
+    async def run():
+        cache = WikipediaSummaryCache(ttls=TTLS)
+        lookups = []
+        for wait in (0, 0, 0.3, 0.6):
+            await asyncio.sleep(wait)
+            before = len(calls)
+            for topic in topics:
+                await cache.get(topic)
+            lookups.append(sorted(calls[before:]))
+        return lookups
+
+    first, cached, missing_expired, disambiguation_expired = asyncio.run(run())
+    assert first == sorted(topics)
+    assert cached == ["Broken"]  # errors are retried every time
+    assert missing_expired == ["Broken", "Nowhere"]
+    assert disambiguation_expired == ["Broken", "Mercury", "Nowhere"]
+
+
+def test_another_worker_reads_the_summary_from_mongo(db, wiki):
+    calls, _ = wiki
+
+    async def run():
+        await WikipediaSummaryCache(ttls=TTLS).get("Eigenvalues")
+        other_worker = WikipediaSummaryCache(ttls=TTLS)
+        entry = await other_worker.get("  Eigenvalues ")
+        return other_worker, entry
+
+    other_worker, entry = asyncio.run(run())
+    assert entry["text"] == SUMMARY
+    assert calls == ["Eigenvalues"]
+    assert other_worker.counters["mongo_hits"] == 1
+    assert other_worker.version("Eigenvalues") == summary_version(SUMMARY)
+
+
+def test_warm_up_loads_each_new_topic_once_with_bounded_concurrency(db, wiki, monkeypatch):
+    calls, state = wiki
+    monkeypatch.setattr(wikipedia_source, "WARM_UP_CONCURRENCY", 2)
+    topics = ["Eigenvalues", " Eigenvalues ", "Matrix", "Vector", "Broken", "Nowhere", "", "   "]
+
+    async def run():
+        cache = WikipediaSummaryCache(ttls=TTLS)
+        warmed = await cache.warm_up(topics)
+        lookups_after_first = len(calls)
+        await cache.warm_up(["Eigenvalues", "Matrix"])
+        return cache, warmed, lookups_after_first
+
+    cache, warmed, lookups_after_first = asyncio.run(run())
+    assert warmed == 5
+    assert sorted(calls) == ["Broken", "Eigenvalues", "Matrix", "Nowhere", "Vector"]
+    assert lookups_after_first == len(calls)  # the second warm-up found everything cached
+    assert state["max_running"] <= 2
+    assert cache.counters["warmed"] == 5
+    assert cache.version("Matrix") == summary_version(SUMMARY)
+
+
+def test_prefetch_runs_in_the_background(db, wiki):
+    calls, _ = wiki
+
+    async def run():
+        cache = WikipediaSummaryCache(ttls=TTLS)
+        task = cache.prefetch(["Eigenvalues"])
+        pending = len(cache._warm_tasks)
+        await task
+        return cache, pending
+
+    cache, pending = asyncio.run(run())
+    assert pending == 1
+    assert calls == ["Eigenvalues"]
+    assert cache._warm_tasks == set()
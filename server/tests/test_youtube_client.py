@@ -0,0 +1,71 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.api.lectures import _youtube_http_exception
+from app.services.youtube_client import YouTubeClient, YouTubeAPIError
+from benchmarks import fake_youtube
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    monkeypatch.setattr(fake_youtube, "LATENCY_MS", 0)
+    monkeypatch.setattr(fake_youtube, "FAILURE_RATE", 0)
+    monkeypatch.setattr(fake_youtube, "RESULTS_PER_QUERY", 200)
+    fake_youtube.reset()
+    yield fake_youtube
+    fake_youtube.reset()
+
+
+def make_client(**kwargs):
+    return YouTubeClient(api_key="fake", base_url="http://fake-youtube/youtube/v3", backoff_base=0,
+                         transport=httpx.ASGITransport(app=fake_youtube.app), **kwargs)
+
+
+def run(client, coro):
+    async def go():
+        try:
+            return await coro
+        finally:
+            await client.close()
+    return asyncio.run(go())
+
+
+def test_retries_a_5xx_and_charges_both_attempts(fake):
+    fake.fail_next("search")
+    client = make_client(max_retries=3)
+    usage = {}
+    video_ids, next_token = run(client, client.search_page("algebra", usage=usage))
+    assert len(video_ids) == 50 and next_token == "50"
+    assert fake.stats["search"] == 2 and fake.stats["failures"] == 1
+    assert usage["quota_units"] == 200
+
+
+def test_gives_up_after_max_retries(fake):
+    fake.fail_next("search", 3)
+    client = make_client(max_retries=3)
+    with pytest.raises(YouTubeAPIError) as excinfo:
+        run(client, client.search_page("algebra"))
+    assert excinfo.value.status_code == 503
+    assert fake.stats["search"] == 3
+
+
+def test_quota_exceeded_is_not_retried_and_maps_to_429(fake, monkeypatch):
+    monkeypatch.setattr(fake_youtube, "QUOTA", 0)
+    client = make_client(max_retries=3)
+    with pytest.raises(YouTubeAPIError) as excinfo:
+        run(client, client.search_page("algebra"))
+    assert (excinfo.value.status_code, excinfo.value.reason) == (403, "quotaExceeded")
+    assert fake.stats["search"] == 1
+    assert _youtube_http_exception(excinfo.value, "algebra").status_code == 429
+
+
+def test_search_with_details_overlaps_detail_lookups(fake, monkeypatch):
+    monkeypatch.setattr(fake_youtube, "LATENCY_MS", 20)
+    client = make_client()
+    items = run(client, client.search_with_details("algebra", max_pages=4))
+    assert len(items) == 200
+    assert fake.stats["search"] == 4 and fake.stats["videos"] == 4
+    # A page's detail lookup runs while the next search call is in flight
+    assert fake.stats["max_in_flight"] >= 2